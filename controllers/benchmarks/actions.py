@@ -0,0 +1,261 @@
+from sys import exit
+from json import loads, dumps
+from pathlib import Path
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import List, Dict, Union, Callable
+import numpy as np
+from tdw.tdw_utils import TDWUtils
+from magnebot import Arm, ActionStatus
+from transport_challenge import Transport
+from transport_challenge.trace import record_or_replay
+
+
+"""
+Benchmark `pick_up()`, `put_in()`, `pour_out()`, and `reset_arm()`.
+
+This replays a recorded trace of a scripted episode without a build (see `transport_challenge/trace.py`); the replay build is a local socket stand-in that serves the recorded responses. By default, the trace and the baseline are the files in `controllers/benchmarks/data/` so that this can run in CI. To record a new trace, run this with `--record --update` and a build on the port, and commit the new trace and baseline files.
+
+For each action, this reports the p50 and p95 of:
+
+- Wall time (ms). When replaying, this is the controller-side cost of the action plus socket round trips.
+- The number of `communicate()` round trips.
+- The number of simulation frames advanced.
+- The number of bytes received from the build.
+
+Results are written to a JSON baseline file. If a baseline file already exists, the new results are compared to it and this script exits with code 1 if any p50 value regressed by more than the threshold.
+"""
+
+
+# The metrics of each sample.
+METRICS: List[str] = ["wall_time", "round_trips", "frames", "bytes"]
+# The directory of the default trace and baseline files.
+DATA_DIRECTORY: Path = Path(__file__).resolve().parent.joinpath("data")
+
+
+class ActionBenchmark(Transport):
+    """
+    Measure the cost of each call to a benchmarked action.
+    """
+
+    # The benchmarked actions.
+    ACTIONS: List[str] = ["pick_up", "put_in", "pour_out", "reset_arm"]
+
+    def __init__(self, port: int = 1071):
+        super().__init__(port=port, launch_build=False, random_seed=0, skip_frames=10)
+        # Key = The name of the action. Value = A list of samples. Each sample is a list of values in `METRICS` order.
+        self.samples: Dict[str, List[List[float]]] = {action: list() for action in ActionBenchmark.ACTIONS}
+        self._round_trips: int = 0
+        self._bytes: int = 0
+        self._frame: int = 0
+        # The number of benchmarked actions that are currently running.
+        self._depth: int = 0
+
+    def init_scene(self, scene: str = None, layout: int = None, room: int = None,
+                   goal_room: int = None) -> ActionStatus:
+        """
+        Create an empty room with a container and a circle of target objects.
+        """
+
+        origin = np.array([0, 0, 0])
+        commands = [{"$type": "load_scene",
+                     "scene_name": "ProcGenScene"},
+                    TDWUtils.create_empty_room(12, 12)]
+        self._add_container(model_name="basket_18inx18inx12iin",
+                            position={"x": 0.354, "y": 0, "z": 0.549},
+                            rotation={"x": 0, "y": -70, "z": 0})
+        num_objects = 8
+        d_theta = 360 / num_objects
+        theta = d_theta / 2
+        pos = np.array([2, 0, 0])
+        for j in range(num_objects):
+            object_position = TDWUtils.rotate_position_around(origin=origin, position=pos, angle=theta)
+            self._add_target_object("jug05", position=TDWUtils.array_to_vector3(object_position))
+            theta += d_theta
+        commands.extend(self._get_scene_init_commands())
+        resp = self.communicate(commands)
+        self._cache_static_data(resp=resp)
+        status = self._do_arm_motion()
+        self._end_action()
+        return status
+
+    def communicate(self, commands: Union[dict, List[dict]]) -> List[bytes]:
+        """
+        See `Magnebot.communicate()`.
+
+        Count round trips, bytes received, and the frame number.
+        """
+
+        resp = super().communicate(commands=commands)
+        self._round_trips += 1
+        self._bytes += sum([len(r) for r in resp])
+        self._frame = int.from_bytes(resp[-1], byteorder="little")
+        return resp
+
+    def pick_up(self, target: int, arm: Arm) -> ActionStatus:
+        return self._measure(action="pick_up", function=super().pick_up, target=target, arm=arm)
+
+    def put_in(self, fused: bool = False) -> ActionStatus:
+        return self._measure(action="put_in", function=super().put_in, fused=fused)
+
+    def pour_out(self) -> ActionStatus:
+        return self._measure(action="pour_out", function=super().pour_out)
+
+    def reset_arm(self, arm: Arm, reset_torso: bool = True) -> ActionStatus:
+        return self._measure(action="reset_arm", function=super().reset_arm, arm=arm, reset_torso=reset_torso)
+
+    def _measure(self, action: str, function: Callable[..., ActionStatus], **kwargs) -> ActionStatus:
+        """
+        Call an action and record a sample. Actions called within another benchmarked action (for example, the `reset_arm()` calls within `pick_up()`) aren't sampled.
+
+        :param action: The name of the action.
+        :param function: The action function.
+        :param kwargs: The action's parameters.
+
+        :return: The action's status.
+        """
+
+        round_trips = self._round_trips
+        num_bytes = self._bytes
+        frame = self._frame
+        t0 = perf_counter()
+        self._depth += 1
+        try:
+            status = function(**kwargs)
+        finally:
+            self._depth -= 1
+        if self._depth > 0:
+            return status
+        self.samples[action].append([(perf_counter() - t0) * 1000, self._round_trips - round_trips,
+                                     self._frame - frame, self._bytes - num_bytes])
+        return status
+
+
+def episode(port: int, fused: bool = False) -> Dict[str, List[List[float]]]:
+    """
+    Run the scripted episode. The actions must always be the same so that the trace can be replayed.
+
+    :param port: The socket port.
+    :param fused: If True, use `put_in(fused=True)`.
+
+    :return: The samples of each action.
+    """
+
+    m = ActionBenchmark(port=port)
+    m.init_scene()
+    m.pick_up(target=m.containers[0], arm=Arm.right)
+    for i, object_id in enumerate(m.target_objects):
+        if i > 0 and i % 4 == 0:
+            m.move_to({"x": 0, "y": 0, "z": 0})
+            m.pour_out()
+            m.reset_arm(arm=Arm.right)
+        m.move_to(target=object_id)
+        m.pick_up(target=object_id, arm=Arm.left)
+        m.put_in(fused=fused)
+        m.reset_arm(arm=Arm.left)
+    m.move_to({"x": 0, "y": 0, "z": 0})
+    m.pour_out()
+    m.reset_arm(arm=Arm.right)
+    m.end()
+    return m.samples
+
+
+def get_percentiles(samples: Dict[str, List[List[float]]]) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    :param samples: The samples of each action.
+
+    :return: The p50 and p95 of each metric of each action.
+    """
+
+    results = dict()
+    for action in samples:
+        if len(samples[action]) == 0:
+            continue
+        arr = np.array(samples[action], dtype=float)
+        results[action] = {"n": len(arr)}
+        for i, metric in enumerate(METRICS):
+            results[action][metric] = {"p50": float(np.percentile(arr[:, i], 50)),
+                                       "p95": float(np.percentile(arr[:, i], 95))}
+    return results
+
+
+def get_regressions(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """
+    :param results: The new results.
+    :param baseline: The baseline results.
+    :param threshold: The regression threshold as a fraction, for example 0.2 (20% slower).
+
+    :return: A list of regression messages. If empty, nothing regressed.
+    """
+
+    regressions = list()
+    for action in results:
+        if action not in baseline:
+            continue
+        for metric in METRICS:
+            old = baseline[action][metric]["p50"]
+            new = results[action][metric]["p50"]
+            if new > old * (1 + threshold):
+                regressions.append(f"{action} {metric} p50: {old:.3f} -> {new:.3f}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--trace", type=str, default=None,
+                        help="The path to the trace file. If not set, defaults to "
+                             "data/actions.trace or data/actions_fused.trace")
+    parser.add_argument("--baseline", type=str, default=None,
+                        help="The path to the baseline file. If not set, defaults to "
+                             "data/actions.json or data/actions_fused.json")
+    parser.add_argument("--fused", action="store_true", help="Benchmark put_in(fused=True).")
+    parser.add_argument("--port", type=int, default=1071, help="The socket port.")
+    parser.add_argument("--record", action="store_true", help="Record a new trace with a build on the port.")
+    parser.add_argument("--trials", type=int, default=5, help="The number of times to replay the trace.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Exit with code 1 if any p50 value is this much greater than the baseline (0.2 = 20%).")
+    parser.add_argument("--update", action="store_true", help="Overwrite the baseline file with the new results.")
+    args = parser.parse_args()
+    if args.trace is None:
+        trace_path = DATA_DIRECTORY.joinpath(f"actions{'_fused' if args.fused else ''}.trace")
+    else:
+        trace_path = Path(args.trace)
+    # Don't wait for a build that isn't there.
+    if not args.record and not trace_path.exists():
+        print(f"Trace not found: {trace_path.resolve()}\nRun this with --record and a build on the port.")
+        exit(1)
+    record_or_replay(path=trace_path, episode=lambda: episode(port=args.port, fused=args.fused), port=args.port,
+                     record=args.record, replay=False)
+    samples = {action: list() for action in ActionBenchmark.ACTIONS}
+    for trial in range(args.trials):
+        trial_samples, divergences = record_or_replay(path=trace_path,
+                                                      episode=lambda: episode(port=args.port, fused=args.fused),
+                                                      port=args.port)
+        assert len(divergences) == 0, str(divergences[0])
+        for action in trial_samples:
+            samples[action].extend(trial_samples[action])
+    results = get_percentiles(samples=samples)
+    print("| Action | n | Wall time p50 (ms) | Wall time p95 (ms) | Round trips p50 | Round trips p95 | "
+          "Frames p50 | Frames p95 | Bytes p50 | Bytes p95 |")
+    print("| --- | --- | --- | --- | --- | --- | --- | --- | --- | --- |")
+    for action in results:
+        r = results[action]
+        print(f"| `{action}()` | {r['n']} | " + " | ".join([f"{r[m]['p50']:.3f} | {r[m]['p95']:.3f}" for m in METRICS])
+              + " |")
+    if args.baseline is None:
+        baseline_path = DATA_DIRECTORY.joinpath(f"actions{'_fused' if args.fused else ''}.json")
+    else:
+        baseline_path = Path(args.baseline)
+    regressions = list()
+    if baseline_path.exists():
+        regressions = get_regressions(results=results, baseline=loads(baseline_path.read_text(encoding="utf-8")),
+                                      threshold=args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+    if args.update or not baseline_path.exists():
+        if not baseline_path.parent.exists():
+            baseline_path.parent.mkdir(parents=True)
+        baseline_path.write_text(dumps(results, indent=2), encoding="utf-8")
+        print(f"Baseline: {baseline_path.resolve()}")
+    if len(regressions) > 0:
+        exit(1)
@@ -0,0 +1,113 @@
+import asyncio
+from argparse import ArgumentParser
+from functools import partial
+from time import perf_counter, process_time
+from typing import List, Tuple
+from tdw.controller import Controller
+from transport_challenge.async_transport import AsyncTransport
+from transport_challenge.fake_build import FakeBuild
+
+
+"""
+Benchmark how many builds a single controller process can drive with `AsyncTransport`.
+
+Each build is a `FakeBuild` in its own process that replies to every frame with a fixed-size response. All of the controllers run in this process on one event loop. For each number of builds, this prints the frames per second and the controller-side CPU time per frame. "Builds per core" is the number of builds that one core of the controller process could drive at the target frame rate.
+
+The baseline is a single synchronous controller, i.e. one build per controller process.
+"""
+
+
+def get_response(commands: List[dict], frame: int, size: int) -> List[bytes]:
+    """
+    :param commands: The commands sent by the controller.
+    :param frame: The frame number.
+    :param size: The size of the response in bytes.
+
+    :return: A response of the given size.
+    """
+
+    return [bytes(size)]
+
+
+def launch_builds(ports: List[int], response_size: int) -> list:
+    """
+    :param ports: The socket ports.
+    :param response_size: The size of each response in bytes.
+
+    :return: The fake build processes.
+    """
+
+    return [FakeBuild(port=port, responses=partial(get_response, size=response_size)).launch() for port in ports]
+
+
+def run_sync(port: int, num_frames: int, response_size: int) -> Tuple[float, float]:
+    """
+    :param port: The socket port.
+    :param num_frames: The number of frames.
+    :param response_size: The size of each response in bytes.
+
+    :return: Tuple: The wall time, the controller CPU time.
+    """
+
+    builds = launch_builds(ports=[port], response_size=response_size)
+    c = Controller(port=port, check_version=False, launch_build=False)
+    t0 = perf_counter()
+    c0 = process_time()
+    for i in range(num_frames):
+        c.communicate([])
+    result = perf_counter() - t0, process_time() - c0
+    c.communicate({"$type": "terminate"})
+    for build in builds:
+        build.join()
+    return result
+
+
+async def run_async(ports: List[int], num_frames: int) -> Tuple[float, float]:
+    """
+    :param ports: The socket ports.
+    :param num_frames: The number of frames per build.
+
+    :return: Tuple: The wall time, the controller CPU time.
+    """
+
+    controllers = [await AsyncTransport.create(controller_type=Controller, port=port, check_version=False,
+                                               launch_build=False) for port in ports]
+
+    async def __run(c: AsyncTransport) -> None:
+        for i in range(num_frames):
+            await c.communicate([])
+
+    t0 = perf_counter()
+    c0 = process_time()
+    await asyncio.gather(*[__run(c) for c in controllers])
+    result = perf_counter() - t0, process_time() - c0
+    for c in controllers:
+        await c.communicate({"$type": "terminate"})
+    return result
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--num_builds", type=str, default="1,2,4,8,16",
+                        help="A comma-separated list of the number of builds.")
+    parser.add_argument("--num_frames", type=int, default=500, help="The number of frames per build.")
+    parser.add_argument("--response_size", type=int, default=4096, help="The size of each response in bytes.")
+    parser.add_argument("--fps", type=float, default=30, help="The target frame rate of each build.")
+    parser.add_argument("--port", type=int, default=1071, help="The first socket port.")
+    args = parser.parse_args()
+
+    print("| Builds | Frames per second | Controller CPU per frame (ms) | Builds per core |")
+    print("| --- | --- | --- | --- |")
+    wall, cpu = run_sync(port=args.port, num_frames=args.num_frames, response_size=args.response_size)
+    print(f"| 1 (sync) | {args.num_frames / wall:.0f} | {cpu / args.num_frames * 1000:.3f} | "
+          f"{args.num_frames / (cpu * args.fps):.0f} |")
+    loop = asyncio.get_event_loop()
+    for num_builds in [int(n) for n in args.num_builds.split(",")]:
+        ports = [args.port + i for i in range(num_builds)]
+        builds = launch_builds(ports=ports, response_size=args.response_size)
+        wall, cpu = loop.run_until_complete(run_async(ports=ports, num_frames=args.num_frames))
+        for build in builds:
+            build.join()
+        num_frames = num_builds * args.num_frames
+        print(f"| {num_builds} | {num_frames / wall:.0f} | {cpu / num_frames * 1000:.3f} | "
+              f"{num_frames / (cpu * args.fps):.0f} |")
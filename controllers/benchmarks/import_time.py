@@ -0,0 +1,65 @@
+import sys
+from subprocess import run, PIPE
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import List, Tuple
+
+
+"""
+Benchmark the cost of importing `transport_challenge` with `python -X importtime`.
+
+Each trial imports the module in a new Python process. This prints the median cumulative import time of the module and the modules with the highest cumulative import time in the median trial.
+
+Then, this benchmarks the first use of the lazily-loaded object data (`transport_challenge/object_data.py`).
+"""
+
+
+def get_import_times(module: str) -> List[Tuple[str, int, int]]:
+    """
+    :param module: The name of the module.
+
+    :return: A list of tuples, one per imported module: The name of the module, the self time in microseconds, the cumulative time in microseconds.
+    """
+
+    process = run([sys.executable, "-X", "importtime", "-c", f"import {module}"], stderr=PIPE,
+                  universal_newlines=True)
+    assert process.returncode == 0, process.stderr
+    times: List[Tuple[str, int, int]] = list()
+    for line in process.stderr.split("\n"):
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_time, cumulative_time, name = line[len("import time:"):].split("|")
+        times.append((name.strip(), int(self_time), int(cumulative_time)))
+    return times
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--module", type=str, default="transport_challenge", help="The module to import.")
+    parser.add_argument("--num_trials", type=int, default=5, help="The number of trials.")
+    parser.add_argument("--top", type=int, default=15, help="Print this many of the slowest modules.")
+    args = parser.parse_args()
+
+    trials = list()
+    for i in range(args.num_trials):
+        trial = get_import_times(module=args.module)
+        total = [t[2] for t in trial if t[0] == args.module][0]
+        trials.append((total, trial))
+    trials.sort(key=lambda t: t[0])
+    total, median = trials[len(trials) // 2]
+    print(f"`import {args.module}` (median of {args.num_trials}): {total / 1000:.1f} ms\n")
+    print("| Module | Self (ms) | Cumulative (ms) |")
+    print("| --- | --- | --- |")
+    for name, self_time, cumulative_time in sorted(median, key=lambda t: t[2], reverse=True)[:args.top]:
+        print(f"| `{name}` | {self_time / 1000:.1f} | {cumulative_time / 1000:.1f} |")
+
+    from transport_challenge.object_data import ObjectData
+
+    object_data = ObjectData()
+    print("\n| Object data | First use (ms) |")
+    print("| --- | --- |")
+    for function in [object_data.get_target_objects, object_data.get_target_object_materials,
+                     object_data.get_containers, object_data.get_librarian]:
+        t0 = perf_counter()
+        function()
+        print(f"| `{function.__name__}()` | {(perf_counter() - t0) * 1000:.1f} |")
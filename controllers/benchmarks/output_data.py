@@ -0,0 +1,75 @@
+from pathlib import Path
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import List, Tuple
+import numpy as np
+from tdw.output_data import OutputData, Transforms
+from magnebot import Arm
+from magnebot.scene_state import SceneState
+from transport_challenge import Transport
+from transport_challenge.trace import Trace, record_or_replay
+
+
+def episode(port: int, relevant_objects_only: bool) -> None:
+    """
+    Run a short episode with a fixed random seed.
+
+    :param port: The socket port.
+    :param relevant_objects_only: If True, the build sends per-frame transforms only for target objects and containers.
+    """
+
+    m = Transport(port=port, launch_build=False, random_seed=0, relevant_objects_only=relevant_objects_only)
+    m.init_scene(scene="2a", layout=1)
+    m.pick_up(target=m.containers[0], arm=Arm.right)
+    m.move_to(target=m.target_objects[0])
+    m.pick_up(target=m.target_objects[0], arm=Arm.left)
+    m.put_in()
+    m.pour_out()
+    m.reset_arm(arm=Arm.right)
+    m.end()
+
+
+def get_metrics(trace: Trace) -> Tuple[float, float, float]:
+    """
+    :param trace: The trace of an episode.
+
+    :return: Tuple: The mean number of bytes per frame; the mean number of object transforms per frame; the mean time in microseconds needed to parse a `SceneState` per frame.
+    """
+
+    # Ignore the first frames (the constructor and scene initialization).
+    responses: List[List[bytes]] = trace.responses[3:]
+    num_bytes = np.mean([sum(len(r) for r in resp) for resp in responses])
+    num_transforms = np.mean([sum(Transforms(r).get_num() for r in resp[:-1]
+                                  if OutputData.get_data_type_id(r) == "tran") for resp in responses])
+    t0 = perf_counter()
+    for resp in responses:
+        SceneState(resp=resp)
+    parse_time = (perf_counter() - t0) / len(responses) * 1000000
+    return float(num_bytes), float(num_transforms), parse_time
+
+
+"""
+Measure the response size and the time needed to parse each frame's output data with and without `relevant_objects_only`.
+
+The first time this runs, it requires a build on the port to record a trace of the same episode in each mode. The traces are saved to disk and every subsequent run measures them without a build.
+"""
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--directory", type=str,
+                        default=str(Path.home().joinpath("transport_challenge/traces/output_data")),
+                        help="The directory of the trace files.")
+    parser.add_argument("--port", type=int, default=1071, help="The socket port.")
+    parser.add_argument("--record", action="store_true", help="Record new traces even if the trace files exist.")
+    args = parser.parse_args()
+    directory = Path(args.directory)
+    print("| Mode | Frames | Bytes per frame | Transforms per frame | Parse time per frame (µs) |")
+    print("| --- | --- | --- | --- | --- |")
+    for relevant in [False, True]:
+        path = directory.joinpath(f"relevant_objects_only_{relevant}.trace")
+        record_or_replay(path=path, episode=lambda: episode(port=args.port, relevant_objects_only=relevant),
+                         port=args.port, record=args.record, replay=False)
+        trace = Trace.load(path)
+        b, n, t = get_metrics(trace=trace)
+        mode = "Relevant objects only" if relevant else "All objects"
+        print(f"| {mode} | {len(trace.responses)} | {b:.0f} | {n:.1f} | {t:.1f} |")
@@ -0,0 +1,46 @@
+from time import perf_counter
+import numpy as np
+from transport_challenge.scene_cache import SCENE_CACHE
+from transport_challenge.placement import get_occupancy_positions
+from transport_challenge.path_planner import PathPlanner
+
+
+"""
+Microbenchmark of the path planner.
+
+For each scene and layout, plan paths from random free cells to the spawn position of each room:
+
+- With A* (the first time the planner sees a destination).
+- By descending the cached distance field of the destination.
+"""
+
+
+if __name__ == "__main__":
+    num_paths = 50
+    print("| Scene | Layout | Distance fields (ms) | A* (ms per path) | Distance field (ms per path) |")
+    print("| --- | --- | --- | --- | --- |")
+    for scene in ["1a", "2a", "4a", "5a"]:
+        for layout in range(3):
+            assets = SCENE_CACHE.get(scene=scene, layout=layout)
+            rng = np.random.RandomState(0)
+            free_cells = assets.get_free_cells().cells
+            origins = get_occupancy_positions(cells=free_cells[rng.randint(0, len(free_cells), num_paths)],
+                                              scene_bounds=assets.scene_bounds)
+            origins = np.insert(origins, 1, 0, axis=1)
+            destinations = np.array([[p["x"], p["y"], p["z"]] for p in assets.spawn_positions.values()])
+            # Plan paths with A* on a new planner without any distance fields.
+            planner = PathPlanner(occupancy_map=assets.occupancy_map, scene_bounds=assets.scene_bounds)
+            t0 = perf_counter()
+            for origin in origins:
+                for destination in destinations:
+                    planner.get_path(origin=origin, destination=destination)
+            t_a_star = (perf_counter() - t0) / (num_paths * len(destinations))
+            t0 = perf_counter()
+            planner.precompute(destinations=destinations)
+            t_fields = perf_counter() - t0
+            t0 = perf_counter()
+            for origin in origins:
+                for destination in destinations:
+                    planner.get_path(origin=origin, destination=destination)
+            t_field = (perf_counter() - t0) / (num_paths * len(destinations))
+            print(f"| {scene} | {layout} | {t_fields * 1000:.3f} | {t_a_star * 1000:.3f} | {t_field * 1000:.3f} |")
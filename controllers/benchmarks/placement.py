@@ -0,0 +1,86 @@
+from time import perf_counter
+from typing import List, Tuple
+import numpy as np
+from transport_challenge.placement import FreeCells, get_placement, get_occupancy_positions
+
+
+"""
+Microbenchmark of target object and container placement.
+
+Compare the vectorized placement engine to the previous approach (a per-cell `np.ndindex` loop plus rejection sampling with a linear scan of used positions) as the number of target objects grows.
+
+This uses a synthetic room map and occupancy map so that object counts can exceed the size of a real room.
+"""
+
+
+def get_maps(size: int = 200, num_rooms: int = 4, seed: int = 0) -> Tuple[np.array, np.array]:
+    """
+    :param size: The width and length of the maps.
+    :param num_rooms: The number of rooms (vertical strips).
+    :param seed: The random seed.
+
+    :return: Tuple: A synthetic room map; a synthetic occupancy map with 20% occupied cells.
+    """
+
+    rng = np.random.RandomState(seed)
+    room_map = np.repeat(np.arange(num_rooms), size // num_rooms)[:, np.newaxis].repeat(size, axis=1)
+    occupancy_map = (rng.random_sample((size, size)) < 0.2).astype(int)
+    return room_map, occupancy_map
+
+
+def legacy(room_map: np.array, occupancy_map: np.array, rng: np.random.RandomState,
+           num_target_objects: int) -> List[Tuple[float, float]]:
+    """
+    The placement algorithm from `Transport.get_scene_init_commands()` in version 0.1.6.
+    """
+
+    bounds = {"x_min": 0, "z_min": 0}
+    rooms = dict()
+    for ix, iy in np.ndindex(room_map.shape):
+        room_index = room_map[ix][iy]
+        if room_index not in rooms:
+            rooms[room_index] = list()
+        if occupancy_map[ix][iy] == 0:
+            rooms[room_index].append((ix, iy))
+    target_room_index = rng.choice(np.array(list(rooms.keys())))
+    target_room_positions = np.array(rooms[target_room_index])
+    used = list()
+    positions = list()
+    for i in range(num_target_objects):
+        got_position = False
+        ix, iy = -1, -1
+        while not got_position:
+            ix, iy = target_room_positions[rng.randint(0, len(target_room_positions))]
+            got_position = True
+            for utop in used:
+                if utop[0] == ix and utop[1] == iy:
+                    got_position = False
+        used.append((ix, iy))
+        positions.append((bounds["x_min"] + ix * 0.49, bounds["z_min"] + iy * 0.49))
+    return positions
+
+
+if __name__ == "__main__":
+    room_map, occupancy_map = get_maps()
+    bounds = {"x_min": 0, "z_min": 0}
+    # The free cells are cached per scene and layout (see `SceneAssets.get_free_cells()`).
+    t0 = perf_counter()
+    free_cells = FreeCells(room_map=room_map, occupancy_map=occupancy_map)
+    print(f"FreeCells (once per scene and layout): {(perf_counter() - t0) * 1000:.3f} ms")
+    num_trials = 20
+    print("| Objects | Legacy (ms) | Vectorized (ms) |")
+    print("| --- | --- | --- |")
+    for num in [8, 32, 128, 512, 2048]:
+        rng = np.random.RandomState(0)
+        t0 = perf_counter()
+        for i in range(num_trials):
+            legacy(room_map=room_map, occupancy_map=occupancy_map, rng=rng, num_target_objects=num)
+        t_legacy = (perf_counter() - t0) / num_trials
+        rng = np.random.RandomState(0)
+        t0 = perf_counter()
+        for i in range(num_trials):
+            placement = get_placement(free_cells=free_cells, rng=rng, num_target_objects=(num, num + 1))
+            get_occupancy_positions(cells=placement.target_cells, scene_bounds=bounds)
+            get_occupancy_positions(cells=placement.container_cells, scene_bounds=bounds)
+        t_vectorized = (perf_counter() - t0) / num_trials
+        print(f"| {num} | {t_legacy * 1000:.3f} | {t_vectorized * 1000:.3f} |")
@@ -0,0 +1,78 @@
+from pathlib import Path
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import List
+from magnebot import Arm
+from magnebot.scene_state import SceneState
+from transport_challenge import Transport
+from transport_challenge.trace import Trace, record_or_replay
+from transport_challenge.lazy_scene_state import LazySceneState, get_object_positions
+
+
+def episode(port: int) -> None:
+    """
+    Run a short episode with a fixed random seed.
+
+    :param port: The socket port.
+    """
+
+    m = Transport(port=port, launch_build=False, random_seed=0)
+    m.init_scene(scene="2a", layout=1)
+    m.pick_up(target=m.containers[0], arm=Arm.right)
+    m.move_to(target=m.target_objects[0])
+    m.pick_up(target=m.target_objects[0], arm=Arm.left)
+    m.put_in()
+    m.pour_out()
+    m.end()
+
+
+def get_parse_time(responses: List[List[bytes]], lazy: bool, object_ids: List[int], joint_ids: List[int]) -> float:
+    """
+    Create a scene state per frame and read the data that an arm motion or settle loop reads.
+
+    :param responses: The responses per frame.
+    :param lazy: If True, create a `LazySceneState`. If False, create a `SceneState`.
+    :param object_ids: The IDs of the objects whose positions are read per frame.
+    :param joint_ids: The IDs of the joints whose angles are read per frame.
+
+    :return: The mean time in microseconds per frame.
+    """
+
+    t0 = perf_counter()
+    for resp in responses:
+        state = LazySceneState(resp=resp) if lazy else SceneState(resp=resp)
+        get_object_positions(state=state, object_ids=object_ids)
+        for joint_id in joint_ids:
+            _ = state.joint_angles[joint_id]
+    return (perf_counter() - t0) / len(responses) * 1000000
+
+
+"""
+Measure the time needed to create a scene state per frame during arm motion and while waiting for objects to stop moving: `SceneState` (decodes everything) vs. `LazySceneState` (decodes only what is read).
+
+The first time this runs, it requires a build on the port to record a trace. The trace is saved to disk and every subsequent run measures it without a build.
+"""
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--path", type=str,
+                        default=str(Path.home().joinpath("transport_challenge/traces/scene_state.trace")),
+                        help="The path to the trace file.")
+    parser.add_argument("--port", type=int, default=1071, help="The socket port.")
+    parser.add_argument("--record", action="store_true", help="Record a new trace even if the trace file exists.")
+    args = parser.parse_args()
+    path = Path(args.path)
+    record_or_replay(path=path, episode=lambda: episode(port=args.port), port=args.port, record=args.record,
+                     replay=False)
+    trace = Trace.load(path)
+    # Ignore the first frames (the constructor and scene initialization).
+    frames = trace.responses[3:]
+    # Read the state of one object and one arm's joints, as in `put_in()`.
+    state_0 = SceneState(resp=frames[0])
+    object_id = sorted(state_0.object_transforms.keys())[0]
+    joint_ids = [j_id for j_id in state_0.joint_angles][:3]
+    print("| Scene state | Frames | Time per frame (µs) |")
+    print("| --- | --- | --- |")
+    for lazy in [False, True]:
+        t = get_parse_time(responses=frames, lazy=lazy, object_ids=[object_id], joint_ids=joint_ids)
+        print(f"| {'LazySceneState' if lazy else 'SceneState'} | {len(frames)} | {t:.1f} |")
@@ -0,0 +1,38 @@
+from time import perf_counter
+import numpy as np
+from transport_challenge.spatial_index import SpatialIndex
+
+
+"""
+Microbenchmark of nearest target object queries.
+
+Compare the spatial index (`transport_challenge/spatial_index.py`) to the previous approach (sorting every object by `np.linalg.norm` to the Magnebot, as in `Demo.transport()`) as the number of objects grows.
+
+Each trial moves a few objects, updates the index, and queries the nearest object to a random position.
+"""
+
+
+if __name__ == "__main__":
+    num_trials = 200
+    print("| Objects | Sort (ms) | Spatial index (ms) |")
+    print("| --- | --- | --- |")
+    for num in [8, 32, 128, 512, 2048]:
+        rng = np.random.RandomState(0)
+        ids = np.arange(num)
+        positions = rng.uniform(-10, 10, size=(num, 3))
+        positions[:, 1] = 0
+        queries = rng.uniform(-10, 10, size=(num_trials, 3))
+        t0 = perf_counter()
+        for i in range(num_trials):
+            nearest = list(sorted(ids, key=lambda x: np.linalg.norm(positions[x] - queries[i])))[0]
+        t_sort = (perf_counter() - t0) / num_trials
+        index = SpatialIndex()
+        index.set_objects(object_ids=ids, positions=positions)
+        t0 = perf_counter()
+        for i in range(num_trials):
+            # Move a few objects.
+            positions[:4] += rng.uniform(-0.1, 0.1, size=(min(num, 4), 3))
+            index.update(positions=positions)
+            nearest = index.nearest(position=queries[i], k=1)[0]
+        t_index = (perf_counter() - t0) / num_trials
+        print(f"| {num} | {t_sort * 1000:.3f} | {t_index * 1000:.3f} |")
@@ -0,0 +1,95 @@
+from argparse import ArgumentParser
+from multiprocessing import Process, Pipe
+from multiprocessing.connection import Connection
+from time import perf_counter
+from typing import Dict
+import numpy as np
+from transport_challenge.vector_env import ObservationLayout
+
+
+def worker(index: int, num_envs: int, layout: ObservationLayout, buffers: Dict, shared: bool,
+           connection: Connection) -> None:
+    """
+    Reply to each message with an observation, either written to shared memory or pickled through the pipe.
+
+    :param index: The index of the environment.
+    :param num_envs: The number of environments.
+    :param layout: The observation layout.
+    :param buffers: The shared memory buffers.
+    :param shared: If True, write the observation to shared memory. If False, send it through the pipe.
+    :param connection: The worker's end of the pipe.
+    """
+
+    observation = {name: np.zeros(shape, dtype=dtype) for name, (shape, dtype) in layout.arrays.items()}
+    shared_observation = {name: array[index] for name, array in layout.get_arrays(buffers=buffers,
+                                                                                  num_envs=num_envs).items()}
+    while connection.recv():
+        if shared:
+            for name in observation:
+                shared_observation[name][:] = observation[name]
+            connection.send(None)
+        else:
+            connection.send(observation)
+
+
+def run(num_envs: int, num_steps: int, layout: ObservationLayout, shared: bool) -> float:
+    """
+    :param num_envs: The number of environments.
+    :param num_steps: The number of steps.
+    :param layout: The observation layout.
+    :param shared: If True, use shared memory. If False, pickle the observations.
+
+    :return: The average time per step in milliseconds.
+    """
+
+    buffers = layout.allocate(num_envs=num_envs)
+    observations = layout.get_arrays(buffers=buffers, num_envs=num_envs)
+    connections = list()
+    processes = list()
+    for i in range(num_envs):
+        parent_connection, child_connection = Pipe()
+        process = Process(target=worker, args=(i, num_envs, layout, buffers, shared, child_connection), daemon=True)
+        process.start()
+        connections.append(parent_connection)
+        processes.append(process)
+    t0 = perf_counter()
+    for step in range(num_steps):
+        for connection in connections:
+            connection.send(True)
+        if shared:
+            for connection in connections:
+                connection.recv()
+        else:
+            # Stack the pickled observations.
+            received = [connection.recv() for connection in connections]
+            for name in observations:
+                observations[name][:] = np.stack([r[name] for r in received])
+    t = (perf_counter() - t0) / num_steps * 1000
+    for connection in connections:
+        connection.send(False)
+    for process in processes:
+        process.join()
+    return t
+
+
+"""
+Benchmark the cost of returning stacked observations from `VectorEnv` worker processes: shared memory buffers vs. pickling the arrays through a pipe. There are no controllers or builds; each worker replies with an empty observation.
+"""
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--num_envs", type=str, default="1,4,8",
+                        help="A comma-separated list of the number of environments.")
+    parser.add_argument("--num_steps", type=int, default=500, help="The number of steps.")
+    parser.add_argument("--image_pass", type=str, default="img",
+                        help="The image pass. If \"none\", there is no image.")
+    parser.add_argument("--screen_size", type=int, default=256, help="The width and height of the image.")
+    args = parser.parse_args()
+    layout = ObservationLayout(image_pass=None if args.image_pass == "none" else args.image_pass,
+                               screen_width=args.screen_size, screen_height=args.screen_size)
+    print("| Environments | Pickled (ms per step) | Shared memory (ms per step) |")
+    print("| --- | --- | --- |")
+    for n in [int(n) for n in args.num_envs.split(",")]:
+        pickled = run(num_envs=n, num_steps=args.num_steps, layout=layout, shared=False)
+        shared = run(num_envs=n, num_steps=args.num_steps, layout=layout, shared=True)
+        print(f"| {n} | {pickled:.3f} | {shared:.3f} |")
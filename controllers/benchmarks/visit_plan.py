@@ -0,0 +1,68 @@
+from time import perf_counter
+from typing import List
+import numpy as np
+from transport_challenge.visit_plan import get_visit_plan
+
+
+"""
+Microbenchmark of visit order planning.
+
+Compare the total path distance of `get_visit_plan()` (nearest insertion + 2-opt with a capacity-aware split) to the greedy nearest-first approach in `Demo.transport()`: go to the nearest container, then repeatedly go to the nearest target object, and go to the goal after every `capacity` objects.
+
+This uses random straight-line distance matrices so that it doesn't need a build or an occupancy map.
+"""
+
+
+def greedy(distances: np.array, num_targets: int, num_containers: int, capacity: int) -> float:
+    """
+    :param distances: The distance matrix. The nodes are: the Magnebot; each target object; each container; the goal.
+    :param num_targets: The number of target objects.
+    :param num_containers: The number of containers.
+    :param capacity: The capacity of the container.
+
+    :return: The total path distance of the greedy nearest-first plan.
+    """
+
+    goal = len(distances) - 1
+    containers: List[int] = list(range(1 + num_targets, 1 + num_targets + num_containers))
+    current = min(containers, key=lambda c: distances[0][c])
+    distance = distances[0][current]
+    unvisited = set(range(1, 1 + num_targets))
+    num_in_container = 0
+    while len(unvisited) > 0:
+        target = min(unvisited, key=lambda t: distances[current][t])
+        distance += distances[current][target]
+        current = target
+        unvisited.remove(target)
+        num_in_container += 1
+        if num_in_container == capacity or len(unvisited) == 0:
+            distance += distances[current][goal]
+            current = goal
+            num_in_container = 0
+    return distance
+
+
+if __name__ == "__main__":
+    num_trials = 50
+    capacity = 4
+    num_containers = 3
+    print("| Target objects | Greedy distance | Plan distance | Plan time (ms) |")
+    print("| --- | --- | --- | --- |")
+    for num_targets in [4, 8, 12, 16]:
+        rng = np.random.RandomState(0)
+        d_greedy = 0
+        d_plan = 0
+        t = 0
+        for i in range(num_trials):
+            points = rng.uniform(0, 15, size=(2 + num_targets + num_containers, 2))
+            distances = np.linalg.norm(points[:, np.newaxis] - points[np.newaxis, :], axis=2)
+            d_greedy += greedy(distances=distances, num_targets=num_targets, num_containers=num_containers,
+                               capacity=capacity)
+            t0 = perf_counter()
+            plan = get_visit_plan(distances=distances, target_ids=np.arange(num_targets),
+                                  container_ids=np.arange(num_containers), holding_container=False,
+                                  capacity=capacity)
+            t += perf_counter() - t0
+            d_plan += plan.distance
+        print(f"| {num_targets} | {d_greedy / num_trials:.3f} | {d_plan / num_trials:.3f} | "
+              f"{t / num_trials * 1000:.3f} |")
@@ -7,7 +7,7 @@ from transport_challenge import Transport
 class SingleRoom(Transport):
     """
     This is an example of how to pick up target objects, put them in a container, and transport them to a goal zone.
-    This example does _not_ describe how to implement navigation in the Transport Challenge.
+    This example uses the built-in path planner (`get_path()`) to navigate to the goal zone but doesn't otherwise describe how to implement navigation in the Transport Challenge.
     """
 
     def get_container(self) -> int:
@@ -139,7 +139,8 @@ if __name__ == "__main__":
 
     # If the container is mostly full, bring it to the goal position and pour it out.
     print("Bringing target objects to the goal zone.")
-    m.move_to(target=TDWUtils.array_to_vector3(m.goal_position))
+    for waypoint in m.get_path(target=TDWUtils.array_to_vector3(m.goal_position)):
+        m.move_to(target=waypoint)
     m.pour_out()
     print("Poured out objects.")
     num_in_container = 0
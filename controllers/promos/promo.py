@@ -1,12 +1,54 @@
 from os import chdir
+from argparse import ArgumentParser
 from typing import Dict, List, Union
 from pathlib import Path
-from subprocess import call
+from subprocess import call, Popen, PIPE, DEVNULL
 import numpy as np
 from tdw.tdw_utils import TDWUtils
 from tdw.output_data import OutputData, Images
 from magnebot import ActionStatus, Arm
 from transport_challenge import Transport
+from transport_challenge.image_writer import ImageWriter
+
+
+class VideoEncoder:
+    """
+    A long-lived ffmpeg process that encodes a video from encoded image frames piped to its stdin.
+    """
+
+    def __init__(self, path: Path, fps: int, encoder: str = "ffmpeg"):
+        """
+        :param path: The path to the output video file.
+        :param fps: The frames per second of the video.
+        :param encoder: The path to the ffmpeg executable.
+        """
+
+        self.path: Path = path
+        self.num_frames: int = 0
+        self._process: Popen = Popen([encoder, "-y",
+                                      "-f", "image2pipe",
+                                      "-framerate", str(fps),
+                                      "-i", "-",
+                                      "-vcodec", "libx264",
+                                      "-pix_fmt", "yuv420p",
+                                      str(path.resolve())],
+                                     stdin=PIPE, stdout=DEVNULL, stderr=DEVNULL)
+
+    def write(self, image: np.array) -> None:
+        """
+        :param image: An encoded image (.jpg or .png) as a numpy array of bytes.
+        """
+
+        self._process.stdin.write(image.tobytes())
+        self.num_frames += 1
+
+    def close(self) -> None:
+        """
+        Close the pipe and wait for the encoder to finish writing the video.
+        """
+
+        self._process.stdin.close()
+        self._process.wait()
 
 
 class Demo(Transport):
@@ -20,6 +62,7 @@ class Demo(Transport):
     - Navigation is pre-calculated (see `PATH`).
     - Only the `img` pass is captured (not `id` or `depth`).
     - The screen is large, there is an overhead camera, and images are saved per-frame instead of per-action. This means that this controller will run *much* slower than a use-case controller.
+    - If `stream == True`, images aren't saved to disk. Instead, images are requested only on the frames needed for a video with a fixed frame rate and are piped directly to one ffmpeg process per camera.
     - There are some low-level commands to optimize the demo such as teleporting a container and hiding the roof.
     """
 
@@ -30,19 +73,46 @@ class Demo(Transport):
                                [3.946356, 0, 0.66],
                                [0.4, 0, 0.66],
                                [0.02635, 0, -1.975]])
+    # The duration of a physics frame in seconds.
+    PHYSICS_TIME_STEP: float = 0.01
 
     def __init__(self, port: int = 1071, screen_width: int = 1024, screen_height: int = 1024,
-                 images_directory: str = "images", image_pass_only: bool = False, overhead_camera_only: bool = False):
+                 images_directory: str = "images", image_pass_only: bool = False, overhead_camera_only: bool = False,
+                 stream: bool = False, fps: int = 30, encoder: str = "ffmpeg"):
+        """
+        :param port: The socket port.
+        :param screen_width: The width of the screen in pixels.
+        :param screen_height: The height of the screen in pixels.
+        :param images_directory: The output directory for images and videos.
+        :param image_pass_only: If True, only capture the `img` pass.
+        :param overhead_camera_only: If True, only capture images from the overhead camera.
+        :param stream: If True, pipe images directly to a video encoder instead of saving them to disk.
+        :param fps: If `stream == True`, the frames per second of each video in simulation time.
+        :param encoder: If `stream == True`, the path to the ffmpeg executable.
+        """
+
+        self.stream: bool = stream
+        self._fps: int = fps
+        self._encoder: str = encoder
+        # Key = The avatar ID. Value = The video encoder. Encoders are launched when the first frame is received.
+        self.video_encoders: Dict[str, VideoEncoder] = dict()
+        # The elapsed simulation time.
+        self._time: float = 0
+        # The simulation time of the next video frame.
+        self._next_frame_time: float = 0
+        # This must be set before `super().__init__()` because the Magnebot constructor calls `communicate()`.
+        self.image_directories: Dict[str, Path] = dict()
         super().__init__(port=port, launch_build=False, screen_width=screen_width, screen_height=screen_height,
                          auto_save_images=False, debug=False, images_directory=images_directory, random_seed=16,
                          img_is_png=False, skip_frames=0)
 
-        self.image_directories: Dict[str, Path] = dict()
         self.image_pass_only = image_pass_only
         self.overhead_camera_only = overhead_camera_only
         if not overhead_camera_only:
             self._create_images_directory(avatar_id="a")
 
+        # Write images on background threads. Block if the queue is full so that no video frames are lost.
+        self.image_writer = ImageWriter(num_threads=4, max_queue_size=256)
         self._image_count = 0
         self._to_transport: List[int] = list()
 
@@ -65,7 +135,11 @@ class Demo(Transport):
                                     camera_id=camera_id)
         # Always save images.
         if not self._debug:
-            if self.overhead_camera_only:
+            if self.stream:
+                # Images are requested by the frame scheduler in `communicate()`.
+                self._per_frame_commands.append({"$type": "enable_image_sensor",
+                                                 "enable": True})
+            elif self.overhead_camera_only:
                 self._per_frame_commands.extend([{"$type": "enable_image_sensor",
                                                   "enable": True},
                                                  {"$type": "send_images",
@@ -80,9 +154,25 @@ class Demo(Transport):
         """
         See `Magnebot.communicate()`.
 
-        Images are saved per-frame.
+        Images are queued per-frame and written on background threads.
+
+        If `self.stream == True`, images are requested only on frames needed for the video frame rate and are piped to a video encoder per camera.
         """
 
+        if self.stream and not self._debug:
+            if not isinstance(commands, list):
+                commands = [commands]
+            # Request images only if this frame is needed for the video.
+            capture = self._time >= self._next_frame_time and len(self.image_directories) > 0
+            if capture:
+                commands.append({"$type": "send_images",
+                                 "ids": list(self.image_directories.keys())})
+                self._next_frame_time += 1 / self._fps
+            self._time += Demo.PHYSICS_TIME_STEP * (self._skip_frames + 1)
+            resp = super().communicate(commands=commands)
+            if capture:
+                self._stream_images(resp=resp)
+            return resp
         resp = super().communicate(commands=commands)
         if not self._debug:
             # Save all images.
@@ -94,13 +184,45 @@ class Demo(Transport):
                     images = Images(resp[i])
                     avatar_id = images.get_avatar_id()
                     if avatar_id in self.image_directories:
-                        TDWUtils.save_images(filename=TDWUtils.zero_padding(self._image_count, 8),
-                                             output_directory=self.image_directories[avatar_id],
-                                             images=images)
+                        self.image_writer.save_images(filename=TDWUtils.zero_padding(self._image_count, 8),
+                                                      output_directory=self.image_directories[avatar_id],
+                                                      images=images)
             if got_images:
                 self._image_count += 1
         return resp
 
+    def end(self) -> None:
+        super().end()
+        # Finish writing the videos.
+        for avatar_id in self.video_encoders:
+            self.video_encoders[avatar_id].close()
+
+    def _stream_images(self, resp: List[bytes]) -> None:
+        """
+        Pipe each `img` pass in the response to the video encoder of its camera.
+
+        :param resp: The response from the build.
+        """
+
+        # Write at most one frame per camera, even if images were requested more than once on this frame.
+        streamed: List[str] = list()
+        for i in range(len(resp) - 1):
+            if OutputData.get_data_type_id(resp[i]) != "imag":
+                continue
+            images = Images(resp[i])
+            avatar_id = images.get_avatar_id()
+            if avatar_id not in self.image_directories or avatar_id in streamed:
+                continue
+            streamed.append(avatar_id)
+            for j in range(images.get_num_passes()):
+                if images.get_pass_mask(j) != "_img":
+                    continue
+                if avatar_id not in self.video_encoders:
+                    self.video_encoders[avatar_id] = VideoEncoder(
+                        path=self.images_directory.joinpath(f"transport_challenge_demo_{avatar_id}.mp4"),
+                        fps=self._fps, encoder=self._encoder)
+                self.video_encoders[avatar_id].write(images.get_image(j))
+
     def transport(self) -> None:
         """
         Transport some objects to the other room.
@@ -108,16 +230,15 @@ class Demo(Transport):
 
         for i in range(4):
             # Get the closest object that still needs to be transported.
-            self._to_transport = list(sorted(self._to_transport, key=lambda x: np.linalg.norm(
-                self.state.object_transforms[x].position - self.state.magnebot_transform.position)))
-            object_id = self._to_transport[0]
+            object_id = [o for o in self.nearest_target_objects(k=len(self.target_objects))
+                         if o in self._to_transport][0]
             # Go to the object and pick it up.
             self.move_to(target=object_id)
             self.pick_up(target=object_id, arm=Arm.right)
             # Put the object in the container.
             self.put_in()
             # Record this object as done.
-            self._to_transport = self._to_transport[1:]
+            self._to_transport.remove(object_id)
 
         # Follow the path to the other room.
         path = Demo.PATH[1:]
@@ -169,7 +290,16 @@ class Demo(Transport):
 
 
 if __name__ == "__main__":
-    m = Demo(images_directory="D:/transport_challenge_demo", image_pass_only=True, overhead_camera_only=True)
+    parser = ArgumentParser()
+    parser.add_argument("--directory", type=str, default="D:/transport_challenge_demo",
+                        help="The output directory for images and videos.")
+    parser.add_argument("--stream", action="store_true",
+                        help="Pipe images directly to ffmpeg instead of saving them to disk.")
+    parser.add_argument("--fps", type=int, default=30, help="If --stream, the frames per second of the video.")
+    parser.add_argument("--encoder", type=str, default="ffmpeg", help="If --stream, the path to ffmpeg.")
+    args = parser.parse_args()
+    m = Demo(images_directory=args.directory, image_pass_only=True, overhead_camera_only=True, stream=args.stream,
+             fps=args.fps, encoder=args.encoder)
     m.init_scene(scene="2a", layout=1, room=4)
     # Add an overhead camera.
     m.add_camera(position={"x": -3.6, "y": 8, "z": -0.67}, look_at=True, follow=True)
@@ -187,7 +317,7 @@ if __name__ == "__main__":
     m.end()
 
     # Create a video.
-    if m.overhead_camera_only:
+    if m.overhead_camera_only and not m.stream:
         chdir(str(m.image_directories["c"]))
         call(["ffmpeg.exe",
               "-r", "90",
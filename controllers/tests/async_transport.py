@@ -0,0 +1,101 @@
+import asyncio
+from pathlib import Path
+from argparse import ArgumentParser
+from tdw.controller import Controller
+from magnebot import Arm
+from transport_challenge import Transport
+from transport_challenge.async_transport import AsyncTransport
+from transport_challenge.fake_build import FakeBuild
+from transport_challenge.trace import Trace, record_or_replay
+
+
+async def fake_builds(ports: list, num_frames: int) -> None:
+    """
+    Drive several fake builds from one event loop and check that every build received every frame.
+
+    :param ports: The socket ports.
+    :param num_frames: The number of frames per build.
+    """
+
+    builds = [FakeBuild(port=port).launch() for port in ports]
+    controllers = [await AsyncTransport.create(controller_type=Controller, port=port, check_version=False,
+                                               launch_build=False) for port in ports]
+
+    async def __run(c: AsyncTransport) -> None:
+        for i in range(num_frames):
+            resp = await c.communicate([])
+            frame = int.from_bytes(resp[-1], byteorder="little")
+            assert frame == i + 1, (frame, i + 1)
+        await c.communicate({"$type": "terminate"})
+
+    await asyncio.gather(*[__run(c) for c in controllers])
+    for build in builds:
+        build.join()
+
+
+async def episode(port: int) -> None:
+    """
+    Run the same episode as `record_replay.py` with `AsyncTransport`.
+
+    :param port: The socket port.
+    """
+
+    m = await AsyncTransport.create(port=port, launch_build=False, random_seed=0)
+    await m.init_scene(scene="2a", layout=1)
+    await m.pick_up(target=m.controller.containers[0], arm=Arm.right)
+    await m.move_to(target=m.controller.target_objects[0])
+    await m.pick_up(target=m.controller.target_objects[0], arm=Arm.left)
+    await m.put_in()
+    await m.reset_arm(arm=Arm.right)
+    await m.end()
+
+
+def sync_episode(port: int) -> None:
+    """
+    Run the same episode synchronously.
+
+    :param port: The socket port.
+    """
+
+    m = Transport(port=port, launch_build=False, random_seed=0)
+    m.init_scene(scene="2a", layout=1)
+    m.pick_up(target=m.containers[0], arm=Arm.right)
+    m.move_to(target=m.target_objects[0])
+    m.pick_up(target=m.target_objects[0], arm=Arm.left)
+    m.put_in()
+    m.reset_arm(arm=Arm.right)
+    m.end()
+
+
+"""
+Test `AsyncTransport`:
+
+1. Drive several fake builds from one event loop.
+2. Replay a recorded episode with `AsyncTransport` and check that it sends exactly the same commands as `Transport`.
+
+The first time this runs, it requires a build on the port to record the episode. The trace is saved to disk and every subsequent run replays it.
+"""
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--trace", type=str,
+                        default=str(Path.home().joinpath("transport_challenge/traces/async_transport.trace")),
+                        help="The path to the trace file.")
+    parser.add_argument("--port", type=int, default=1071, help="The socket port.")
+    parser.add_argument("--num_builds", type=int, default=8, help="The number of fake builds.")
+    parser.add_argument("--num_frames", type=int, default=200, help="The number of frames per fake build.")
+    parser.add_argument("--record", action="store_true", help="Record a new trace even if the trace file exists.")
+    args = parser.parse_args()
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(fake_builds(ports=[args.port + i for i in range(args.num_builds)],
+                                        num_frames=args.num_frames))
+    print(f"Drove {args.num_builds} fake builds from one event loop.")
+    trace_path = Path(args.trace)
+    # Record with `Transport` and replay with `AsyncTransport`.
+    if args.record or not trace_path.exists():
+        record_or_replay(path=trace_path, episode=lambda: sync_episode(port=args.port), port=args.port, record=True)
+        print(f"Recorded {len(Trace.load(trace_path).commands)} frames to: {trace_path.resolve()}")
+    _, divergences = record_or_replay(path=trace_path, episode=lambda: loop.run_until_complete(episode(port=args.port)),
+                                      port=args.port)
+    assert len(divergences) == 0, str(divergences[0])
+    print("AsyncTransport sent the same commands as Transport.")
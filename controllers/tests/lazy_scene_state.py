@@ -0,0 +1,82 @@
+from pathlib import Path
+from argparse import ArgumentParser
+import numpy as np
+from tdw.output_data import OutputData
+from magnebot import Arm
+from magnebot.scene_state import SceneState
+from transport_challenge import Transport
+from transport_challenge.trace import Trace, record_or_replay
+from transport_challenge.lazy_scene_state import LazySceneState, get_object_positions
+
+
+def episode(port: int) -> None:
+    """
+    Run a short episode with a fixed random seed.
+
+    :param port: The socket port.
+    """
+
+    m = Transport(port=port, launch_build=False, random_seed=0)
+    m.init_scene(scene="2a", layout=1)
+    m.pick_up(target=m.containers[0], arm=Arm.right)
+    m.move_to(target=m.target_objects[0])
+    m.pick_up(target=m.target_objects[0], arm=Arm.left)
+    m.put_in()
+    m.pour_out()
+    m.end()
+
+
+def check_frame(resp: list) -> None:
+    """
+    Decode a response with `SceneState` and `LazySceneState` and assert that they are the same.
+
+    :param resp: The response.
+    """
+
+    state = SceneState(resp=resp)
+    lazy = LazySceneState(resp=resp)
+    assert set(state.object_transforms.keys()) == set(lazy.object_transforms.keys())
+    for object_id in state.object_transforms:
+        for field in ["position", "rotation", "forward"]:
+            assert np.array_equal(getattr(state.object_transforms[object_id], field),
+                                  getattr(lazy.object_transforms[object_id], field)), (object_id, field)
+    object_ids = list(state.object_transforms.keys())
+    assert np.array_equal(get_object_positions(state=state, object_ids=object_ids),
+                          get_object_positions(state=lazy, object_ids=object_ids))
+    for arm in [Arm.left, Arm.right]:
+        assert np.array_equal(state.held[arm], lazy.held[arm]), arm
+    for field in ["position", "rotation", "forward"]:
+        assert np.array_equal(getattr(state.magnebot_transform, field), getattr(lazy.magnebot_transform, field))
+    assert set(state.joint_angles.keys()) == set(lazy.joint_angles.keys())
+    for joint_id in state.joint_angles:
+        assert np.array_equal(state.joint_angles[joint_id], lazy.joint_angles[joint_id]), joint_id
+        assert np.array_equal(state.joint_positions[joint_id], lazy.joint_positions[joint_id]), joint_id
+
+
+"""
+Decode every frame of a recorded episode with `SceneState` and `LazySceneState` and check that the object transforms, held objects, Magnebot transform, and joints are the same.
+
+The first time this runs, it requires a build on the port to record a trace. The trace is saved to disk and every subsequent run checks it without a build.
+"""
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--path", type=str,
+                        default=str(Path.home().joinpath("transport_challenge/traces/scene_state.trace")),
+                        help="The path to the trace file.")
+    parser.add_argument("--port", type=int, default=1071, help="The socket port.")
+    parser.add_argument("--record", action="store_true", help="Record a new trace even if the trace file exists.")
+    args = parser.parse_args()
+    path = Path(args.path)
+    record_or_replay(path=path, episode=lambda: episode(port=args.port), port=args.port, record=args.record,
+                     replay=False)
+    trace = Trace.load(path)
+    num_frames = 0
+    for frame in trace.responses:
+        # Skip frames without Magnebot output data, such as the response to the constructor.
+        if "magn" not in [OutputData.get_data_type_id(r) for r in frame[:-1]]:
+            continue
+        check_frame(resp=frame)
+        num_frames += 1
+    assert num_frames > 0
+    print(f"{num_frames} frames are the same.")
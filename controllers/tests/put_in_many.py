@@ -0,0 +1,111 @@
+from typing import List
+import numpy as np
+from tdw.tdw_utils import TDWUtils
+from magnebot import Arm, ArmJoint, ActionStatus
+from transport_challenge import Transport
+from transport_challenge.container_arm_pose_cache import CONTAINER_ARM_POSE_CACHE
+
+
+class PutInMany(Transport):
+    """
+    Test whether the Magnebot can put a cluster of nearby target objects in a container with `put_in_many()`.
+    """
+
+    # The positions of the target objects. They are all within reach of the left magnet.
+    POSITIONS: List[dict] = [{"x": -0.3, "y": 0, "z": 0.6},
+                             {"x": -0.5, "y": 0, "z": 0.45},
+                             {"x": -0.15, "y": 0, "z": 0.75}]
+
+    def init_scene(self, scene: str = None, layout: int = None, room: int = None,
+                   goal_room: int = None) -> ActionStatus:
+        # Remove the objects of the previous scene.
+        self.object_registry.clear()
+        self._object_init_commands.clear()
+        commands = [{"$type": "load_scene",
+                     "scene_name": "ProcGenScene"},
+                    TDWUtils.create_empty_room(12, 12)]
+        self._add_container(model_name="basket_18inx18inx12iin",
+                            position={"x": 0.354, "y": 0, "z": 0.549},
+                            rotation={"x": 0, "y": -70, "z": 0})
+        for position in PutInMany.POSITIONS:
+            self._add_target_object("jug05", position=position)
+        commands.extend(self._get_scene_init_commands())
+        resp = self.communicate(commands)
+        self._cache_static_data(resp=resp)
+        # Wait for the Magnebot to reset to its neutral position.
+        status = self._do_arm_motion()
+        self._end_action()
+        return status
+
+
+def get_frames(m: PutInMany, batch: bool) -> int:
+    """
+    :param m: The controller.
+    :param batch: If True, use `put_in_many()`. If False, use `pick_up()` and `put_in()`.
+
+    :return: The total number of frames required to put every target object in the container.
+    """
+
+    m.init_scene()
+    assert len(m.target_objects) == len(PutInMany.POSITIONS) and len(m.containers) == 1
+    m.pick_up(target=m.containers[0], arm=Arm.right)
+    num_actions = len(m.action_metrics)
+    if batch:
+        statuses = m.put_in_many(object_ids=list(m.target_objects))
+        for object_id in statuses:
+            assert statuses[object_id] == ActionStatus.success, (object_id, statuses[object_id])
+    else:
+        for object_id in m.target_objects:
+            m.pick_up(target=object_id, arm=Arm.left)
+            s = m.put_in()
+            assert s == ActionStatus.success, s
+    return sum([m.action_metrics[i].frames for i in range(num_actions, len(m.action_metrics))])
+
+
+def is_at_pose(m: PutInMany, arm: Arm, pose: np.array) -> bool:
+    """
+    :param m: The controller.
+    :param arm: The arm holding the container.
+    :param pose: Arm angles from `CONTAINER_ARM_POSE_CACHE`.
+
+    :return: True if the shoulder, elbow, and wrist of the arm are at the pose.
+    """
+
+    if arm == Arm.right:
+        joints = [ArmJoint.shoulder_right, ArmJoint.elbow_right, ArmJoint.wrist_right]
+    else:
+        joints = [ArmJoint.shoulder_left, ArmJoint.elbow_left, ArmJoint.wrist_left]
+    angles = np.concatenate([m.state.joint_angles[m.magnebot_static.arm_joints[joint]] for joint in joints])
+    # The first angle of the pose is the column.
+    return bool(np.allclose(angles, pose[1:], atol=1))
+
+
+def check_cached_pose(m: PutInMany) -> None:
+    """
+    Check that `put_in_many()` moves the container arm to the leveled pose when the pose is loaded from `CONTAINER_ARM_POSE_CACHE` at the start of a new episode.
+
+    :param m: The controller. The leveled pose must already be in the cache.
+    """
+
+    pose = CONTAINER_ARM_POSE_CACHE.get(arm=Arm.right, model_name="basket_18inx18inx12iin", torso_prismatic=1)
+    assert pose is not None
+    m.init_scene()
+    hits = CONTAINER_ARM_POSE_CACHE.hits
+    m.pick_up(target=m.containers[0], arm=Arm.right)
+    # Move the container arm away from the leveled pose.
+    m.reach_for(target={"x": 0.3, "y": 0.8, "z": 0.4}, arm=Arm.right, absolute=False)
+    assert not is_at_pose(m=m, arm=Arm.right, pose=pose)
+    m.put_in_many(object_ids=[])
+    assert CONTAINER_ARM_POSE_CACHE.hits > hits, "The leveled pose wasn't loaded from the cache."
+    assert is_at_pose(m=m, arm=Arm.right, pose=pose), "The container arm isn't at the leveled pose."
+
+
+if __name__ == "__main__":
+    c = PutInMany(launch_build=False, random_seed=0)
+    frames_batch = get_frames(m=c, batch=True)
+    frames_sequential = get_frames(m=c, batch=False)
+    check_cached_pose(m=c)
+    c.end()
+    num_objects = len(PutInMany.POSITIONS)
+    print(f"Frames per object (put_in_many): {frames_batch / num_objects}")
+    print(f"Frames per object (pick_up and put_in): {frames_sequential / num_objects}")
@@ -0,0 +1,53 @@
+from pathlib import Path
+from argparse import ArgumentParser
+from time import time
+from magnebot import Arm
+from transport_challenge import Transport
+from transport_challenge.trace import Trace, record_or_replay
+
+
+def episode(port: int) -> int:
+    """
+    Run a short episode with a fixed random seed.
+
+    :param port: The socket port.
+
+    :return: The number of actions.
+    """
+
+    m = Transport(port=port, launch_build=False, random_seed=0)
+    m.init_scene(scene="2a", layout=1)
+    m.pick_up(target=m.containers[0], arm=Arm.right)
+    m.move_to(target=m.target_objects[0])
+    m.pick_up(target=m.target_objects[0], arm=Arm.left)
+    m.put_in()
+    m.reset_arm(arm=Arm.right)
+    m.end()
+    return 6
+
+
+"""
+Record an episode with a build and then replay it without a build.
+
+The first time this runs, it requires a build on the port. The trace is saved to disk and every subsequent run replays it.
+"""
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--trace", type=str, default=str(Path.home().joinpath("transport_challenge/traces/test.trace")),
+                        help="The path to the trace file.")
+    parser.add_argument("--port", type=int, default=1071, help="The socket port.")
+    parser.add_argument("--record", action="store_true", help="Record a new trace even if the trace file exists.")
+    parser.add_argument("--trials", type=int, default=10, help="The number of times to replay the trace.")
+    args = parser.parse_args()
+    trace_path = Path(args.trace)
+    if args.record or not trace_path.exists():
+        record_or_replay(path=trace_path, episode=lambda: episode(port=args.port), port=args.port, record=True)
+        print(f"Recorded {len(Trace.load(trace_path).commands)} frames to: {trace_path.resolve()}")
+    num_actions = 0
+    t0 = time()
+    for i in range(args.trials):
+        n, divergences = record_or_replay(path=trace_path, episode=lambda: episode(port=args.port), port=args.port)
+        assert len(divergences) == 0, str(divergences[0])
+        num_actions += n
+    print(f"Actions per second (replay): {num_actions / (time() - t0)}")
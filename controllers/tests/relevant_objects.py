@@ -0,0 +1,86 @@
+from pathlib import Path
+from argparse import ArgumentParser
+import numpy as np
+from magnebot import Arm
+from transport_challenge import Transport
+from transport_challenge.object_role import ObjectRole
+from transport_challenge.trace import record_or_replay
+
+
+class RelevantObjects(Transport):
+    """
+    At the end of every action, check that `self.state` has the transform of every object that the goal zone, held object, and container checks read, as well as the cached transforms of the furniture.
+    """
+
+    def __init__(self, port: int = 1071, launch_build: bool = False, random_seed: int = None):
+        super().__init__(port=port, launch_build=launch_build, random_seed=random_seed, relevant_objects_only=True)
+        # The number of times that the state was checked.
+        self.num_checks: int = 0
+
+    def _end_action(self) -> None:
+        super()._end_action()
+        if self._scene_key is None:
+            return
+        target_object_ids = self.object_registry.get_ids(ObjectRole.target_object)
+        container_ids = self.object_registry.get_ids(ObjectRole.container)
+        furniture_ids = self.object_registry.get_ids(ObjectRole.furniture)
+        assert len(furniture_ids) > 0 and set(self._furniture_transforms.keys()) == set(furniture_ids.tolist())
+        # Target objects and containers must be in the per-frame transforms, not just in the cache.
+        state_transform_ids = set(self._state_transforms["id"].tolist())
+        for object_id in np.concatenate([target_object_ids, container_ids]).tolist():
+            assert object_id in state_transform_ids, object_id
+        # Every object, including the furniture and held objects, must be in the state.
+        held = np.concatenate([self.state.held[arm] for arm in self.state.held])
+        for object_id in np.concatenate([target_object_ids, container_ids, furniture_ids, held]).tolist():
+            assert object_id in self.state.object_transforms, object_id
+        # The goal zone positions are the positions in the state.
+        positions, held_mask, _ = self.get_target_object_states()
+        for i, object_id in enumerate(target_object_ids.tolist()):
+            assert np.allclose(positions[i], self.state.object_transforms[object_id].position), object_id
+            assert held_mask[i] == (object_id in held), object_id
+        self.num_checks += 1
+
+
+def episode(port: int) -> int:
+    """
+    Run a short episode with a fixed random seed.
+
+    :param port: The socket port.
+
+    :return: The number of times that the state was checked.
+    """
+
+    m = RelevantObjects(port=port, launch_build=False, random_seed=0)
+    m.init_scene(scene="2a", layout=1)
+    m.pick_up(target=m.containers[0], arm=Arm.right)
+    m.move_to(target=m.target_objects[0])
+    m.pick_up(target=m.target_objects[0], arm=Arm.left)
+    m.put_in()
+    m.refresh_furniture_transforms()
+    m.pour_out()
+    m.reset_arm(arm=Arm.right)
+    m.end()
+    return m.num_checks
+
+
+"""
+Check that if `relevant_objects_only == True`, the state at the end of every action still includes every object that `Transport` reads.
+
+The first time this runs, it requires a build on the port to record a trace. The trace is saved to disk and every subsequent run replays it without a build.
+"""
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--trace", type=str,
+                        default=str(Path.home().joinpath("transport_challenge/traces/relevant_objects.trace")),
+                        help="The path to the trace file.")
+    parser.add_argument("--port", type=int, default=1071, help="The socket port.")
+    parser.add_argument("--record", action="store_true", help="Record a new trace even if the trace file exists.")
+    args = parser.parse_args()
+    trace_path = Path(args.trace)
+    record_or_replay(path=trace_path, episode=lambda: episode(port=args.port), port=args.port, record=args.record,
+                     replay=False)
+    num_checks, divergences = record_or_replay(path=trace_path, episode=lambda: episode(port=args.port), port=args.port)
+    assert len(divergences) == 0, str(divergences[0])
+    assert num_checks > 0
+    print(f"Checked the state after {num_checks} actions.")
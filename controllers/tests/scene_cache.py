@@ -0,0 +1,56 @@
+import io
+import builtins
+from argparse import ArgumentParser
+from typing import List
+from transport_challenge import Transport
+from transport_challenge.scene_cache import SCENE_CACHE
+
+
+class FileReads:
+    """
+    Record the path of every file that is opened with `open()` (including `Path.read_text()` and `np.load()`).
+    """
+
+    def __init__(self):
+        """:field
+        The paths of the opened files.
+        """
+        self.paths: List[str] = list()
+        self._open = builtins.open
+
+    def __enter__(self) -> "FileReads":
+        def __open(file, *args, **kwargs):
+            self.paths.append(str(file))
+            return self._open(file, *args, **kwargs)
+
+        builtins.open = __open
+        io.open = __open
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        builtins.open = self._open
+        io.open = self._open
+
+
+"""
+Check that `init_scene()` doesn't read any files if the scene and layout are already cached.
+
+This requires a build on the port.
+"""
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--port", type=int, default=1071, help="The socket port.")
+    args = parser.parse_args()
+    SCENE_CACHE.clear()
+    m = Transport(port=args.port, launch_build=False, random_seed=0)
+    # The first call loads the scene assets.
+    m.init_scene(scene="2a", layout=1)
+    assert SCENE_CACHE.misses == 1
+    for i in range(3):
+        with FileReads() as reads:
+            m.init_scene(scene="2a", layout=1)
+        assert len(reads.paths) == 0, reads.paths
+    assert SCENE_CACHE.misses == 1 and SCENE_CACHE.hits > 0
+    m.end()
+    print("A warm init_scene() doesn't read any files.")
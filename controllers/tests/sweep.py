@@ -0,0 +1,82 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from multiprocessing import Process
+import numpy as np
+from tdw.controller import Controller
+from transport_challenge.fake_build import FakeBuild
+from transport_challenge.sweep import Sweep, EpisodeSpec, get_scaling_curve
+
+
+class FakeEpisodeController(Controller):
+    """
+    A minimal controller with the same episode interface as `Transport`. This is driven by a `FakeBuild`.
+    """
+
+    def __init__(self, port: int = 1071, launch_build: bool = False, random_seed: int = None):
+        super().__init__(port=port, check_version=False, launch_build=False)
+        self._rng = np.random.RandomState(random_seed)
+        self.action_cost = 0
+        self.done = False
+
+    def init_scene(self, scene: str, layout: int, room: int = None, goal_room: int = None, episode=None) -> None:
+        self.communicate([])
+        self.action_cost = 0
+        self.done = False
+
+    def end(self) -> None:
+        self.communicate({"$type": "terminate"})
+
+
+def policy(c: FakeEpisodeController) -> None:
+    """
+    Take a few "actions" and then randomly succeed or fail.
+    """
+
+    for i in range(c._rng.randint(5, 20)):
+        c.communicate([])
+        c.action_cost += 1
+    c.done = c._rng.random() < 0.5
+
+
+# The number of fake builds launched per port.
+LAUNCHES = dict()
+
+
+def launch_crashing_build(port: int) -> Process:
+    """
+    The first build on the first port crashes; every other build runs normally.
+    """
+
+    LAUNCHES[port] = LAUNCHES.get(port, 0) + 1
+    crash_after = 5 if port == 1071 and LAUNCHES[port] == 1 else -1
+    return FakeBuild(port=port, crash_after=crash_after).launch()
+
+
+"""
+Test the sweep runner with fake builds on localhost ports.
+"""
+
+if __name__ == "__main__":
+    specs = [EpisodeSpec(scene="2a", layout=0, random_seed=i) for i in range(12)]
+    with TemporaryDirectory() as temp:
+        results_path = Path(temp).joinpath("results.jsonl")
+        sweep = Sweep(num_workers=3, port=1071, controller_type=FakeEpisodeController, policy=policy,
+                      build_launcher=launch_crashing_build, results_path=results_path, episode_timeout=3)
+        results = list(sweep.run(specs[:8]))
+        # Every episode finished, including the one that crashed and was retried.
+        assert len(results) == 8, len(results)
+        assert all(r.error is None for r in results), [r.error for r in results]
+        assert any(r.attempts == 2 for r in results)
+        # The same seed always produces the same result.
+        rerun = {r.spec.get_key(): r for r in Sweep(num_workers=2, port=1081, controller_type=FakeEpisodeController,
+                                                    policy=policy, build_launcher=launch_crashing_build)
+                 .run(specs[:8])}
+        for r in results:
+            assert r.action_cost == rerun[r.spec.get_key()].action_cost
+            assert r.success == rerun[r.spec.get_key()].success
+        # Resume: only the new episodes run.
+        resumed = list(sweep.run(specs))
+        assert len(resumed) == 4, len(resumed)
+        assert len(sweep.get_completed()) == 12
+    print(get_scaling_curve(specs=specs, worker_counts=[1, 2, 4], port=1091, controller_type=FakeEpisodeController,
+                            policy=policy, build_launcher=launch_crashing_build))
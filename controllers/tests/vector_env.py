@@ -0,0 +1,112 @@
+from io import BytesIO
+from time import perf_counter
+from typing import Tuple
+import numpy as np
+from PIL import Image
+from tdw.controller import Controller
+from magnebot.constants import OCCUPANCY_CELL_SIZE
+from transport_challenge.fake_build import launch_fake_build
+from transport_challenge.vector_env import VectorEnv, ObservationLayout
+
+
+class _Transform:
+    def __init__(self, position: np.array, rotation: np.array):
+        self.position: np.array = position
+        self.rotation: np.array = rotation
+
+
+class _State:
+    def __init__(self, position: np.array, image: bytes):
+        self.magnebot_transform: _Transform = _Transform(position=position, rotation=np.array([0, 0, 0, 1.0]))
+        self.images = {"img": np.frombuffer(image, dtype=np.uint8)}
+
+
+class FakeEnvController(Controller):
+    """
+    A minimal controller with the same episode and observation interface as `Transport`. This is driven by a `FakeBuild`. Each `move_by()` action moves the Magnebot along the x axis and raises an exception if the distance is negative. The challenge is done when the Magnebot is at x >= 2.
+    """
+
+    def __init__(self, port: int = 1071, launch_build: bool = False, random_seed: int = None,
+                 screen_width: int = 64, screen_height: int = 64):
+        super().__init__(port=port, check_version=False, launch_build=False)
+        self._rng = np.random.RandomState(random_seed)
+        self.action_cost = 0
+        self.done = False
+        self.goal_position = np.array([2.0, 0, 0])
+        self.occupancy_map = np.zeros((20, 20), dtype=int)
+        image = BytesIO()
+        Image.new("RGB", (screen_width, screen_height), (port % 256, 0, 0)).save(image, "PNG")
+        self.state = _State(position=np.zeros(3), image=image.getvalue())
+        self.target_object_positions = np.zeros((0, 3))
+
+    def init_scene(self, scene: str, layout: int, room: int = None, goal_room: int = None, episode=None) -> None:
+        self.communicate([])
+        self.action_cost = 0
+        self.done = False
+        self.state.magnebot_transform.position = np.zeros(3)
+        num_target_objects = self._rng.randint(8, 12)
+        self.target_object_positions = self._rng.uniform(-4, 4, size=(num_target_objects, 3))
+
+    def move_by(self, distance: float) -> str:
+        if distance < 0:
+            raise ValueError(distance)
+        self.communicate([])
+        self.action_cost += 1
+        self.state.magnebot_transform.position = self.state.magnebot_transform.position + np.array([distance, 0, 0])
+        self.done = self.state.magnebot_transform.position[0] >= 2
+        return "success"
+
+    def get_target_object_states(self) -> Tuple[np.array, np.array, np.array]:
+        num_target_objects = len(self.target_object_positions)
+        return np.copy(self.target_object_positions), np.zeros(num_target_objects, dtype=bool), \
+            np.zeros(num_target_objects, dtype=bool)
+
+    def get_occupancy_cell(self, position: np.array) -> Tuple[int, int]:
+        return int(np.rint((position[0] + 4.9) / OCCUPANCY_CELL_SIZE)), \
+            int(np.rint((position[2] + 4.9) / OCCUPANCY_CELL_SIZE))
+
+    def end(self) -> None:
+        self.communicate({"$type": "terminate"})
+
+
+"""
+Test the vectorized environment with fake builds: stacked observations in shared memory, auto-reset when an episode is done or when the action cost reaches the budget, exceptions in the worker processes, and throughput.
+"""
+
+if __name__ == "__main__":
+    num_envs = 4
+    port = 1071
+    layout = ObservationLayout(image_pass="img", screen_width=64, screen_height=64)
+    with VectorEnv(num_envs=num_envs, port=port, controller_type=FakeEnvController, max_action_cost=3,
+                   layout=layout, build_launcher=launch_fake_build) as env:
+        observations = env.reset()
+        assert observations["image"].shape == (num_envs, 64, 64, 3)
+        assert np.array_equal(observations["image"][:, 0, 0, 0], [(port + i) % 256 for i in range(num_envs)])
+        assert np.all(np.isnan(observations["target_object_positions"][:, 11]))
+        assert np.all(observations["occupancy"][:, 8, 8] == 0)
+        # Environment 0 never finishes and is reset by the action cost budget. Environment 3 finishes in one action.
+        distances = [0, 0.5, 1, 2]
+        expected_dones = [[False, False, False, True], [False, False, True, True], [True, True, False, True]]
+        for step in range(3):
+            observations, dones, infos = env.step([("move_by", {"distance": d}) for d in distances])
+            assert np.array_equal(dones, expected_dones[step]), (step, dones)
+            # Environments that are done were reset.
+            assert np.all(observations["magnebot_position"][dones, 0] == 0)
+        assert infos[3]["success"] and infos[3]["action_cost"] == 1
+        # Environments 0 and 1 were reset by the action cost budget.
+        assert not infos[0]["success"] and infos[0]["action_cost"] == 3
+        assert np.array_equal([info["episode"].random_seed for info in infos], [0, 1, 5, 6])
+        assert np.array_equal([episode.random_seed for episode in env.episodes], [7, 8, 5, 9])
+        # Every environment replies even if some of them raise exceptions, so the next step still works.
+        try:
+            env.step([("move_by", {"distance": d}) for d in [-1, 0, -1, 0]])
+            raise AssertionError("Expected an exception.")
+        except RuntimeError as e:
+            assert "Environment 0" in str(e) and "Environment 2" in str(e), e
+        observations, dones, infos = env.step([("move_by", {"distance": 0}) for _ in range(num_envs)])
+        assert len(infos) == num_envs and all(info["status"] == "success" for info in infos)
+        num_steps = 500
+        t0 = perf_counter()
+        for step in range(num_steps):
+            env.step([("move_by", {"distance": 0.1}) for _ in range(num_envs)])
+        print(f"Steps per second ({num_envs} environments): {num_steps / (perf_counter() - t0)}")
@@ -1 +1,9 @@
 from .transport_controller import Transport
+from .object_role import ObjectRole
+from .object_registry import ObjectRegistry, ObjectRecord
+from .action_metrics import ActionMetricsBuffer, ActionMetrics
+from .image_writer import ImageWriter
+from .backpressure import Backpressure
+from .container_occupancy import ContainerOccupancy
+from .visit_plan import VisitPlan
+from .episode import Episode
@@ -0,0 +1,345 @@
+from json import dumps
+from pathlib import Path
+from time import time, perf_counter
+from functools import wraps
+from contextlib import contextmanager
+from collections import deque
+from typing import List, Dict, Optional, Union, Iterator, Callable
+from magnebot import ActionStatus
+
+
+class ActionMetrics:
+    """
+    The compute cost of a single action. Nested actions (for example, the `grasp()` and `reset_arm()` calls within `pick_up()`) are included in the metrics of the outermost action.
+
+    All times are in seconds.
+    """
+
+    __slots__ = ["action", "status", "start", "wall_time", "socket_time", "python_time", "frames",
+                 "communicate_calls", "response_bytes", "ik_time", "arm_motion_time", "wait_time"]
+
+    def __init__(self, action: str):
+        """
+        :param action: The name of the action.
+        """
+
+        """:field
+        The name of the action.
+        """
+        self.action: str = action
+        """:field
+        The name of the `ActionStatus` returned by the action. If None, the action raised an exception.
+        """
+        self.status: Optional[str] = None
+        """:field
+        The Unix timestamp of the start of the action.
+        """
+        self.start: float = time()
+        """:field
+        The total time elapsed during the action.
+        """
+        self.wall_time: float = 0
+        """:field
+        The time spent sending commands to the build and waiting for a response.
+        """
+        self.socket_time: float = 0
+        """:field
+        The time spent in Python: `wall_time - socket_time`.
+        """
+        self.python_time: float = 0
+        """:field
+        The number of frames that the simulation advanced.
+        """
+        self.frames: int = 0
+        """:field
+        The number of `communicate()` calls.
+        """
+        self.communicate_calls: int = 0
+        """:field
+        The total size of the responses from the build in bytes.
+        """
+        self.response_bytes: int = 0
+        """:field
+        The time spent solving IK (`_start_ik()`), including socket time but not including arm motion.
+        """
+        self.ik_time: float = 0
+        """:field
+        The time spent waiting for the arms to stop moving (`_do_arm_motion()`), including socket time.
+        """
+        self.arm_motion_time: float = 0
+        """:field
+        The time spent waiting for objects to stop moving (`_wait_until_objects_stop()`), including socket time.
+        """
+        self.wait_time: float = 0
+
+    def to_dict(self) -> dict:
+        """
+        :return: A JSON-serializable dictionary of the metrics.
+        """
+
+        return {k: getattr(self, k) for k in ActionMetrics.__slots__}
+
+
+class ActionMetricsBuffer:
+    """
+    A ring buffer of the `ActionMetrics` of the most recent actions. Iterate through the buffer to get the metrics, oldest first.
+
+    Optionally, append each record to a JSON lines file and/or write cumulative per-action totals to an [OpenMetrics](https://openmetrics.io/) text file (for example, for a Prometheus textfile collector).
+
+    ```python
+    from transport_challenge import Transport
+
+    m = Transport()
+    m.action_metrics.json_lines_path = "metrics.jsonl"
+    m.init_scene(scene="2a", layout=1)
+    m.move_by(2)
+    for metrics in m.action_metrics:
+        print(metrics.action, metrics.wall_time, metrics.socket_time, metrics.frames)
+    m.end()
+    ```
+    """
+
+    # The names of the cumulative totals and their descriptions.
+    _TOTALS: Dict[str, str] = {"wall_time": "Time elapsed during the action",
+                               "socket_time": "Time spent waiting on the socket",
+                               "python_time": "Time spent in Python",
+                               "frames": "Frames advanced",
+                               "communicate_calls": "communicate() calls",
+                               "response_bytes": "Bytes received from the build",
+                               "ik_time": "Time spent solving IK",
+                               "arm_motion_time": "Time spent waiting for the arms to stop moving",
+                               "wait_time": "Time spent waiting for objects to stop moving"}
+
+    def __init__(self, max_size: int = 1000):
+        """
+        :param max_size: The maximum number of records in the buffer. When the buffer is full, the oldest record is discarded.
+        """
+
+        """:field
+        If not None, append each record to this JSON lines file.
+        """
+        self.json_lines_path: Optional[Union[str, Path]] = None
+        """:field
+        If not None, rewrite this OpenMetrics text file at the end of each action.
+        """
+        self.openmetrics_path: Optional[Union[str, Path]] = None
+        self._buffer: deque = deque(maxlen=max_size)
+        # The metrics of the current outermost action.
+        self._current: Optional[ActionMetrics] = None
+        # The number of nested actions that are currently running.
+        self._depth: int = 0
+        self._t0: float = 0
+        # The frame number of the most recent response.
+        self._frame: int = -1
+        # Cumulative totals. Key = The name of the action. Value = Dictionary: Key = The name of the total.
+        self._totals: Dict[str, Dict[str, float]] = dict()
+        # The number of times each action was called. Key = The name of the action.
+        self._counts: Dict[str, int] = dict()
+        # A stack of the sections of the current action. Each element is: [the name of the section, start time].
+        self._sections: List[list] = list()
+
+    def start_action(self, action: str) -> None:
+        """
+        Start recording an action. If another action is already running, this action is nested within it.
+
+        :param action: The name of the action.
+        """
+
+        self._depth += 1
+        if self._depth == 1:
+            self._current = ActionMetrics(action=action)
+            self._t0 = perf_counter()
+
+    def end_action(self, status: Optional[Union[ActionStatus, Dict[int, ActionStatus]]]) -> None:
+        """
+        Stop recording an action. If this is the outermost action, add its metrics to the buffer.
+
+        :param status: The status of the action. If None, the action raised an exception. If this is a dictionary of statuses per object (see `Transport.put_in_many()`), the first failure is recorded.
+        """
+
+        self._depth -= 1
+        if self._depth > 0:
+            return
+        if isinstance(status, dict):
+            status = next((s for s in status.values() if s != ActionStatus.success), ActionStatus.success)
+        metrics = self._current
+        self._current = None
+        metrics.wall_time = perf_counter() - self._t0
+        metrics.python_time = metrics.wall_time - metrics.socket_time
+        metrics.status = status.name if isinstance(status, ActionStatus) else None
+        self._buffer.append(metrics)
+        # Update the totals.
+        if metrics.action not in self._totals:
+            self._totals[metrics.action] = {k: 0 for k in ActionMetricsBuffer._TOTALS}
+            self._counts[metrics.action] = 0
+        self._counts[metrics.action] += 1
+        totals = self._totals[metrics.action]
+        for k in totals:
+            totals[k] += getattr(metrics, k)
+        if self.json_lines_path is not None:
+            with Path(self.json_lines_path).open("at", encoding="utf-8") as f:
+                f.write(dumps(metrics.to_dict()) + "\n")
+        if self.openmetrics_path is not None:
+            self.write_openmetrics(path=self.openmetrics_path)
+
+    def add_communicate(self, socket_time: float, response: List[bytes]) -> None:
+        """
+        Record a `communicate()` call.
+
+        :param socket_time: The time spent sending commands and waiting for the response.
+        :param response: The response from the build.
+        """
+
+        if len(response) == 0:
+            return
+        frame = int.from_bytes(response[-1], byteorder="little")
+        if self._current is not None:
+            self._current.communicate_calls += 1
+            self._current.socket_time += socket_time
+            self._current.response_bytes += sum([len(r) for r in response])
+            if self._frame >= 0:
+                self._current.frames += frame - self._frame
+        self._frame = frame
+
+    @contextmanager
+    def section(self, section: str) -> Iterator[None]:
+        """
+        Measure the time spent in a section of the current action. Sections are exclusive: if a section starts within another section, the outer section is paused.
+
+        ```python
+        with self.action_metrics.section("ik_time"):
+            status = super()._start_ik(target=target, arm=arm)
+        ```
+
+        :param section: The name of the `ActionMetrics` field, for example `"ik_time"`.
+        """
+
+        t = perf_counter()
+        # Pause the outer section.
+        if len(self._sections) > 0:
+            self._add_section_time(self._sections[-1][0], t - self._sections[-1][1])
+        self._sections.append([section, t])
+        try:
+            yield
+        finally:
+            section, t0 = self._sections.pop()
+            t = perf_counter()
+            self._add_section_time(section, t - t0)
+            # Resume the outer section.
+            if len(self._sections) > 0:
+                self._sections[-1][1] = t
+
+    def get_openmetrics(self) -> str:
+        """
+        :return: The cumulative totals of every action since this buffer was created or cleared, as OpenMetrics text.
+        """
+
+        lines = ["# TYPE transport_actions counter",
+                 "# HELP transport_actions Number of actions"]
+        for action in self._counts:
+            lines.append(f'transport_actions_total{{action="{action}"}} {self._counts[action]}')
+        for k in ActionMetricsBuffer._TOTALS:
+            name = f"transport_action_{k}"
+            if k.endswith("_time"):
+                name = name[:-len("_time")] + "_seconds"
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"# HELP {name} {ActionMetricsBuffer._TOTALS[k]}")
+            for action in self._totals:
+                lines.append(f'{name}_total{{action="{action}"}} {self._totals[action][k]}')
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_openmetrics(self, path: Union[str, Path]) -> None:
+        """
+        Write the cumulative totals of every action to an OpenMetrics text file.
+
+        :param path: The path to the file.
+        """
+
+        if isinstance(path, str):
+            path = Path(path)
+        # Write to a temporary file and then replace the file so that a collector never reads a partial file.
+        temp = path.parent.joinpath(path.name + ".tmp")
+        temp.write_text(self.get_openmetrics(), encoding="utf-8")
+        temp.replace(path)
+
+    def _add_section_time(self, section: str, t: float) -> None:
+        """
+        :param section: The name of the `ActionMetrics` field.
+        :param t: The elapsed time.
+        """
+
+        if self._current is not None:
+            setattr(self._current, section, getattr(self._current, section) + t)
+
+    def clear(self) -> None:
+        """
+        Remove all records from the buffer and reset the cumulative totals.
+        """
+
+        self._buffer.clear()
+        self._totals.clear()
+        self._counts.clear()
+
+    def __getitem__(self, index: int) -> ActionMetrics:
+        return self._buffer[index]
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def __iter__(self) -> Iterator[ActionMetrics]:
+        return iter(self._buffer)
+
+
+class SocketTimer:
+    """
+    A wrapper for a controller's socket that measures the time spent sending commands and waiting for responses.
+    """
+
+    def __init__(self, socket):
+        """
+        :param socket: The socket.
+        """
+
+        """:field
+        The total time spent in `send_multipart()` and `recv_multipart()`.
+        """
+        self.time: float = 0
+        self._socket = socket
+
+    def send_multipart(self, *args, **kwargs):
+        t0 = perf_counter()
+        result = self._socket.send_multipart(*args, **kwargs)
+        self.time += perf_counter() - t0
+        return result
+
+    def recv_multipart(self, *args, **kwargs):
+        t0 = perf_counter()
+        result = self._socket.recv_multipart(*args, **kwargs)
+        self.time += perf_counter() - t0
+        return result
+
+    def __getattr__(self, item):
+        return getattr(self._socket, item)
+
+
+def measure_action(function: Callable[..., ActionStatus]) -> Callable[..., ActionStatus]:
+    """
+    Decorate a controller action so that its metrics are recorded in the controller's `action_metrics` buffer.
+
+    :param function: The action function.
+
+    :return: The decorated function.
+    """
+
+    @wraps(function)
+    def __measure_action(self, *args, **kwargs) -> ActionStatus:
+        self.action_metrics.start_action(function.__name__)
+        status = None
+        try:
+            status = function(self, *args, **kwargs)
+        finally:
+            self.action_metrics.end_action(status=status)
+        return status
+
+    return __measure_action
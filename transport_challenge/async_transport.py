@@ -0,0 +1,365 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import get_ident
+from typing import Dict, List, Union, Callable
+import zmq.asyncio
+from magnebot import Arm, ActionStatus
+from transport_challenge.action_metrics import SocketTimer
+from transport_challenge.episode import Episode
+from transport_challenge.transport_controller import Transport
+
+
+class _EventLoopSocket:
+    """
+    A wrapper for a controller's socket. The controller calls `send_multipart()` and `recv_multipart()` from its own thread as usual, but the socket I/O is scheduled on an asyncio event loop. While the controller waits for a response, the event loop is free to serve the sockets of other controllers.
+    """
+
+    def __init__(self, socket: zmq.Socket, loop: asyncio.AbstractEventLoop):
+        """
+        :param socket: The controller's socket. This must be called from the event loop's thread.
+        :param loop: The event loop.
+        """
+
+        # Keep a reference to the original socket so that it isn't closed when it's garbage-collected.
+        self._socket: zmq.Socket = socket
+        self._async_socket: zmq.asyncio.Socket = zmq.asyncio.Socket.shadow(socket.underlying)
+        self._loop: asyncio.AbstractEventLoop = loop
+        self._loop_thread: int = get_ident()
+
+    def send_multipart(self, *args, **kwargs):
+        return self._run(self._send_multipart(*args, **kwargs))
+
+    def recv_multipart(self, *args, **kwargs):
+        return self._run(self._recv_multipart(*args, **kwargs))
+
+    async def _send_multipart(self, *args, **kwargs):
+        # The socket's futures must be created in the event loop's thread.
+        return await self._async_socket.send_multipart(*args, **kwargs)
+
+    async def _recv_multipart(self, *args, **kwargs):
+        return await self._async_socket.recv_multipart(*args, **kwargs)
+
+    def _run(self, coroutine):
+        """
+        Run a socket coroutine on the event loop and block the calling thread until it's done.
+
+        :param coroutine: The coroutine.
+
+        :return: The result of the coroutine.
+        """
+
+        if get_ident() == self._loop_thread:
+            coroutine.close()
+            raise RuntimeError("The controller can't communicate from the event loop's thread. "
+                               "Use the awaitable functions in AsyncTransport instead.")
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def __getattr__(self, item):
+        return getattr(self._socket, item)
+
+
+class AsyncTransport:
+    """
+    An asyncio wrapper for a [`Transport`](transport_controller.md) controller. Every action is awaitable, which makes it possible to drive many builds from a single process and a single event loop:
+
+    ```python
+    import asyncio
+    from transport_challenge.async_transport import AsyncTransport
+
+
+    async def run(port: int) -> None:
+        m = await AsyncTransport.create(port=port, launch_build=False)
+        await m.init_scene(scene="2a", layout=1)
+        await m.move_by(2)
+        await m.end()
+
+
+    async def main() -> None:
+        await asyncio.gather(*[run(port) for port in [1071, 1072, 1073, 1074]])
+
+    asyncio.get_event_loop().run_until_complete(main())
+    ```
+
+    Magnebot's action code is synchronous, so each controller runs its actions in its own worker thread. Every `communicate()` call, and therefore every frame of a multi-frame action, is sent and received on the event loop. While one controller waits for its build to respond, the event loop serves the other controllers.
+
+    The wrapped controller is still available as `self.controller`, which can be used to read its state (for example, `self.controller.state`) between actions. Don't call the controller's actions directly from the event loop's thread; this will raise a `RuntimeError`.
+    """
+
+    def __init__(self, controller: Transport, executor: ThreadPoolExecutor):
+        """
+        Don't call this constructor directly. Use `await AsyncTransport.create()` instead.
+
+        :param controller: The controller.
+        :param executor: The single-thread executor in which the controller's actions run.
+        """
+
+        """:field
+        The wrapped controller.
+        """
+        self.controller: Transport = controller
+        self._executor: ThreadPoolExecutor = executor
+
+    @staticmethod
+    async def create(controller_type: type = None, **kwargs) -> "AsyncTransport":
+        """
+        Create a controller and connect it to the build. This must be awaited from within a running event loop.
+
+        :param controller_type: The type of controller. If None, this is `Transport`. This can be a subclass of `Transport`. It can also be any TDW `Controller`, in which case only `communicate()` is useful.
+        :param kwargs: Keyword arguments for the controller's constructor, for example `port` and `launch_build`.
+
+        :return: An `AsyncTransport`.
+        """
+
+        if controller_type is None:
+            controller_type = Transport
+        loop = asyncio.get_event_loop()
+        executor = ThreadPoolExecutor(max_workers=1)
+        # The constructor blocks until the build connects, so it runs in the worker thread.
+        controller = await loop.run_in_executor(executor, partial(controller_type, **kwargs))
+        socket = controller.socket
+        if isinstance(socket, SocketTimer):
+            socket = socket._socket
+        controller.socket = _EventLoopSocket(socket=socket, loop=loop)
+        return AsyncTransport(controller=controller, executor=executor)
+
+    async def communicate(self, commands: Union[dict, List[dict]]) -> List[bytes]:
+        """
+        Awaitable `Transport.communicate()`.
+
+        :param commands: A command or list of commands.
+
+        :return: The response from the build.
+        """
+
+        return await self._run(self.controller.communicate, commands)
+
+    async def init_scene(self, scene: str = None, layout: int = None, room: int = None, goal_room: int = None,
+                         episode: Episode = None) -> ActionStatus:
+        """
+        Awaitable [`Transport.init_scene()`](transport_controller.md#init_scene).
+
+        :param scene: The name of an interior floorplan scene.
+        :param layout: The furniture layout of the floorplan.
+        :param room: The index of the room that the Magnebot will spawn in the center of.
+        :param goal_room: The goal room.
+        :param episode: A pre-generated episode.
+
+        :return: An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.init_scene, scene=scene, layout=layout, room=room,
+                               goal_room=goal_room, episode=episode)
+
+    async def reset_episode(self, room: int = None, goal_room: int = None, episode: Episode = None) -> ActionStatus:
+        """
+        Awaitable [`Transport.reset_episode()`](transport_controller.md#reset_episode).
+
+        :param room: The index of the room that the Magnebot will spawn in the center of.
+        :param goal_room: The goal room.
+        :param episode: A pre-generated episode.
+
+        :return: An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.reset_episode, room=room, goal_room=goal_room, episode=episode)
+
+    async def pick_up(self, target: int, arm: Arm) -> ActionStatus:
+        """
+        Awaitable [`Transport.pick_up()`](transport_controller.md#pick_up).
+
+        :param target: The ID of the object.
+        :param arm: The arm.
+
+        :return: An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.pick_up, target=target, arm=arm)
+
+    async def put_in(self, fused: bool = False) -> ActionStatus:
+        """
+        Awaitable [`Transport.put_in()`](transport_controller.md#put_in).
+
+        :param fused: If True, the action requires fewer frames and `communicate()` calls.
+
+        :return: An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.put_in, fused=fused)
+
+    async def put_in_many(self, object_ids: List[int]) -> Dict[int, ActionStatus]:
+        """
+        Awaitable [`Transport.put_in_many()`](transport_controller.md#put_in_many).
+
+        :param object_ids: The IDs of the target objects.
+
+        :return: A dictionary. Key = The object ID. Value = An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.put_in_many, object_ids=object_ids)
+
+    async def pour_out(self) -> ActionStatus:
+        """
+        Awaitable [`Transport.pour_out()`](transport_controller.md#pour_out).
+
+        :return: An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.pour_out)
+
+    async def turn_by(self, angle: float, aligned_at: float = 3) -> ActionStatus:
+        """
+        Awaitable [`Transport.turn_by()`](transport_controller.md#turn_by).
+
+        :param angle: The target angle in degrees.
+        :param aligned_at: If the difference between the current angle and the target angle is less than this value, then the action is successful.
+
+        :return: An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.turn_by, angle=angle, aligned_at=aligned_at)
+
+    async def turn_to(self, target: Union[int, Dict[str, float]], aligned_at: float = 3) -> ActionStatus:
+        """
+        Awaitable [`Transport.turn_to()`](transport_controller.md#turn_to).
+
+        :param target: Either the ID of an object or a Vector3 position.
+        :param aligned_at: If the difference between the current angle and the target angle is less than this value, then the action is successful.
+
+        :return: An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.turn_to, target=target, aligned_at=aligned_at)
+
+    async def move_by(self, distance: float, arrived_at: float = 0.3) -> ActionStatus:
+        """
+        Awaitable [`Transport.move_by()`](transport_controller.md#move_by).
+
+        :param distance: The target distance.
+        :param arrived_at: If at any point during the action the difference between the target distance and distance traversed is less than this, then the action is successful.
+
+        :return: An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.move_by, distance=distance, arrived_at=arrived_at)
+
+    async def move_to(self, target: Union[int, Dict[str, float]], arrived_at: float = 0.3,
+                      aligned_at: float = 3) -> ActionStatus:
+        """
+        Awaitable [`Transport.move_to()`](transport_controller.md#move_to).
+
+        :param target: Either the ID of an object or a Vector3 position.
+        :param arrived_at: While moving, if at any point during the action the difference between the target distance and distance traversed is less than this, then the action is successful.
+        :param aligned_at: While turning, if the difference between the current angle and the target angle is less than this value, then the action is successful.
+
+        :return: An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.move_to, target=target, arrived_at=arrived_at, aligned_at=aligned_at)
+
+    async def reset_position(self) -> ActionStatus:
+        """
+        Awaitable [`Transport.reset_position()`](transport_controller.md#reset_position).
+
+        :return: An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.reset_position)
+
+    async def reach_for(self, target: Dict[str, float], arm: Arm, absolute: bool = True,
+                        arrived_at: float = 0.125) -> ActionStatus:
+        """
+        Awaitable [`Transport.reach_for()`](transport_controller.md#reach_for).
+
+        :param target: The target position for the magnet at the arm to reach.
+        :param arm: The arm that will reach for the target.
+        :param absolute: If True, `target` is in absolute world coordinates. If False, `target` is relative to the position and rotation of the Magnebot.
+        :param arrived_at: If the magnet is this distance or less from `target`, then the action is successful.
+
+        :return: An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.reach_for, target=target, arm=arm, absolute=absolute,
+                               arrived_at=arrived_at)
+
+    async def grasp(self, target: int, arm: Arm) -> ActionStatus:
+        """
+        Awaitable [`Transport.grasp()`](transport_controller.md#grasp).
+
+        :param target: The ID of the target object.
+        :param arm: The arm of the magnet that will try to grasp the object.
+
+        :return: An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.grasp, target=target, arm=arm)
+
+    async def drop(self, target: int, arm: Arm, wait_for_objects: bool = True) -> ActionStatus:
+        """
+        Awaitable [`Transport.drop()`](transport_controller.md#drop).
+
+        :param target: The ID of the object currently held by the magnet.
+        :param arm: The arm of the magnet holding the object.
+        :param wait_for_objects: If True, the action will continue until the objects have finished falling or settling.
+
+        :return: An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.drop, target=target, arm=arm, wait_for_objects=wait_for_objects)
+
+    async def reset_arm(self, arm: Arm, reset_torso: bool = True) -> ActionStatus:
+        """
+        Awaitable [`Transport.reset_arm()`](transport_controller.md#reset_arm).
+
+        :param arm: The arm that will be reset.
+        :param reset_torso: If True, rotate and slide the torso to its neutral rotation and height.
+
+        :return: An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.reset_arm, arm=arm, reset_torso=reset_torso)
+
+    async def rotate_camera(self, roll: float = 0, pitch: float = 0, yaw: float = 0) -> ActionStatus:
+        """
+        Awaitable [`Transport.rotate_camera()`](transport_controller.md#rotate_camera).
+
+        :param roll: The roll angle in degrees.
+        :param pitch: The pitch angle in degrees.
+        :param yaw: The yaw angle in degrees.
+
+        :return: An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.rotate_camera, roll=roll, pitch=pitch, yaw=yaw)
+
+    async def reset_camera(self) -> ActionStatus:
+        """
+        Awaitable [`Transport.reset_camera()`](transport_controller.md#reset_camera).
+
+        :return: An `ActionStatus`.
+        """
+
+        return await self._run(self.controller.reset_camera)
+
+    async def end(self) -> None:
+        """
+        Awaitable [`Transport.end()`](transport_controller.md#end). This also shuts down the controller's worker thread.
+        """
+
+        try:
+            await self._run(self.controller.end)
+        finally:
+            self._executor.shutdown(wait=False)
+
+    async def _run(self, function: Callable, *args, **kwargs):
+        """
+        Run a controller function in the controller's worker thread.
+
+        :param function: The function.
+        :param args: Positional arguments.
+        :param kwargs: Keyword arguments.
+
+        :return: The return value of the function.
+        """
+
+        return await asyncio.get_event_loop().run_in_executor(self._executor, partial(function, *args, **kwargs))
@@ -0,0 +1,17 @@
+from enum import Enum
+
+
+class Backpressure(Enum):
+    """
+    What an `ImageWriter` does when its queue is full.
+
+    ```python
+    from transport_challenge import Backpressure
+
+    for backpressure in Backpressure:
+        print(backpressure) # Backpressure.block, Backpressure.drop_oldest
+    ```
+    """
+
+    block = 0  # Wait until there is room in the queue. No images are lost.
+    drop_oldest = 1  # Discard the oldest queued image. The simulation never waits for the disk.
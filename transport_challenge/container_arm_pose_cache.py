@@ -0,0 +1,223 @@
+import os
+from json import loads, dumps
+from time import time, sleep
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from threading import RLock
+from typing import Dict, Optional, Union
+import numpy as np
+from magnebot import Arm
+from transport_challenge.object_data import OBJECT_DATA
+
+
+class ContainerArmPoseCache:
+    """
+    A persistent cache of arm angles that level a held container with the floor. See: `Transport.reset_arm()`.
+
+    Key = (arm, container model name, torso prismatic value). Value = The arm angles in degrees.
+
+    The cache is saved to disk whenever a new pose is added. It is loaded lazily the first time it is needed; poses for every container model in `containers.txt` are loaded in a single pass.
+
+    The cache file can be shared by many controllers, threads, and processes. While saving, the cache holds a lock file and merges the poses that are already in the file. If the file can't be read or written, the cache behaves as if the file were empty or as an in-memory cache; this never raises an exception.
+
+    ```python
+    from transport_challenge.container_arm_pose_cache import CONTAINER_ARM_POSE_CACHE
+
+    print(CONTAINER_ARM_POSE_CACHE.hits, CONTAINER_ARM_POSE_CACHE.misses)
+    ```
+    """
+
+    def __init__(self, path: Union[str, Path] = None):
+        """
+        :param path: The path to the cache file. If None, defaults to `~/transport_challenge/container_arm_poses.json`
+        """
+
+        if path is None:
+            path = Path.home().joinpath("transport_challenge/container_arm_poses.json")
+        elif isinstance(path, str):
+            path = Path(path)
+        """:field
+        The path to the cache file.
+        """
+        self.path: Path = path
+        """:field
+        The number of times `get()` returned a cached pose.
+        """
+        self.hits: int = 0
+        """:field
+        The number of times `get()` didn't find a cached pose.
+        """
+        self.misses: int = 0
+        # Key = A string key (see `_get_key()`). Value = The arm angles.
+        # This is None until the cache is loaded.
+        self._poses: Optional[Dict[str, np.array]] = None
+        # Controllers on different threads can share the cache.
+        self._lock: RLock = RLock()
+
+    def get(self, arm: Arm, model_name: str, torso_prismatic: float) -> Optional[np.array]:
+        """
+        :param arm: The arm holding the container.
+        :param model_name: The model name of the container.
+        :param torso_prismatic: The value of the torso prismatic joint.
+
+        :return: The cached arm angles in degrees, or None if there isn't a cached pose.
+        """
+
+        with self._lock:
+            if self._poses is None:
+                self.load()
+            key = ContainerArmPoseCache._get_key(arm=arm, model_name=model_name, torso_prismatic=torso_prismatic)
+            if key in self._poses:
+                self.hits += 1
+                return np.copy(self._poses[key])
+            self.misses += 1
+            return None
+
+    def set(self, arm: Arm, model_name: str, torso_prismatic: float, angles: np.array) -> None:
+        """
+        Add a pose to the cache and save the cache to disk.
+
+        :param arm: The arm holding the container.
+        :param model_name: The model name of the container.
+        :param torso_prismatic: The value of the torso prismatic joint.
+        :param angles: The arm angles in degrees.
+        """
+
+        with self._lock:
+            if self._poses is None:
+                self.load()
+            key = ContainerArmPoseCache._get_key(arm=arm, model_name=model_name, torso_prismatic=torso_prismatic)
+            self._poses[key] = np.array(angles, dtype=float)
+            self.save()
+
+    def load(self) -> None:
+        """
+        Load the cache from disk. Only poses of container models listed in `containers.txt` are loaded. If the cache file doesn't exist or can't be read, the cache is empty.
+        """
+
+        with self._lock:
+            containers = set(OBJECT_DATA.get_containers())
+            self._poses = {key: angles for key, angles in self._read().items() if key.split("|")[1] in containers}
+
+    def save(self) -> bool:
+        """
+        Save the cache to disk. Poses in the cache file that aren't in this cache, for example poses saved by another process, are merged into the file and into this cache.
+
+        :return: True if the cache was saved. If False, the cache file couldn't be written but the poses are still cached in memory.
+        """
+
+        with self._lock:
+            if self._poses is None:
+                return False
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+            except OSError:
+                return False
+            # Other processes can't save while this process holds the lock file.
+            locked = self._lock_file()
+            temp: Optional[Path] = None
+            try:
+                # Merge the poses in the cache file. Poses in this cache replace poses in the file.
+                poses = self._read()
+                containers = set(OBJECT_DATA.get_containers())
+                for key in poses:
+                    if key not in self._poses and key.split("|")[1] in containers:
+                        self._poses[key] = poses[key]
+                poses.update(self._poses)
+                # Write to a unique temporary file and then replace the cache file so that the cache is never partially
+                # written and other writers never write to the same temporary file.
+                with NamedTemporaryFile(mode="w", encoding="utf-8", dir=str(self.path.parent),
+                                        prefix=self.path.name + ".", suffix=".tmp", delete=False) as f:
+                    temp = Path(f.name)
+                    f.write(dumps({k: poses[k].tolist() for k in poses}, indent=2))
+                temp.replace(self.path)
+                return True
+            except OSError:
+                if temp is not None and temp.exists():
+                    try:
+                        temp.unlink()
+                    except OSError:
+                        pass
+                return False
+            finally:
+                if locked:
+                    self._unlock_file()
+
+    def clear(self) -> None:
+        """
+        Clear the in-memory cache and the hit and miss counters. This doesn't delete the cache file.
+        """
+
+        with self._lock:
+            self._poses = None
+            self.hits = 0
+            self.misses = 0
+
+    def _lock_file(self, timeout: float = 2, stale: float = 10) -> bool:
+        """
+        Create a lock file next to the cache file. Wait if another process has already created it.
+
+        :param timeout: Stop waiting after this many seconds.
+        :param stale: If the lock file is older than this many seconds, its process probably crashed; delete it.
+
+        :return: True if this process created the lock file. If False, save without a lock.
+        """
+
+        path = self.path.parent.joinpath(self.path.name + ".lock")
+        t0 = time()
+        while time() - t0 < timeout:
+            try:
+                os.close(os.open(str(path), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time() - path.stat().st_mtime > stale:
+                        path.unlink()
+                except OSError:
+                    pass
+                sleep(0.005)
+            except OSError:
+                return False
+        return False
+
+    def _unlock_file(self) -> None:
+        """
+        Delete the lock file.
+        """
+
+        try:
+            self.path.parent.joinpath(self.path.name + ".lock").unlink()
+        except OSError:
+            pass
+
+    def _read(self) -> Dict[str, np.array]:
+        """
+        :return: The poses in the cache file. Key = A string key (see `_get_key()`). Value = The arm angles. If the file doesn't exist or can't be read or parsed, this is empty.
+        """
+
+        poses: Dict[str, np.array] = dict()
+        try:
+            data = loads(self.path.read_text(encoding="utf-8"))
+            for key in data:
+                if len(key.split("|")) == 3:
+                    poses[key] = np.array(data[key], dtype=float)
+        except (OSError, ValueError, TypeError, AttributeError):
+            # The file doesn't exist, or it's truncated or invalid (for example, because it was edited by hand).
+            return dict()
+        return poses
+
+    @staticmethod
+    def _get_key(arm: Arm, model_name: str, torso_prismatic: float) -> str:
+        """
+        :param arm: The arm.
+        :param model_name: The model name of the container.
+        :param torso_prismatic: The value of the torso prismatic joint.
+
+        :return: A key for the cache.
+        """
+
+        return f"{arm.name}|{model_name}|{round(float(torso_prismatic), 2)}"
+
+
+# The process-wide container arm pose cache.
+CONTAINER_ARM_POSE_CACHE = ContainerArmPoseCache()
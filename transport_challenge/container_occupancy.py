@@ -0,0 +1,80 @@
+from typing import Dict, Set, List, FrozenSet
+from tdw.output_data import OutputData, TriggerCollision
+
+
+class ContainerOccupancy:
+    """
+    An index of the objects inside each container. This is updated incrementally from trigger collision enter and exit events.
+
+    Each container has a trigger collider. When an object enters the trigger collider, it is added to the container's set of occupants; when an object exits the trigger collider, it is removed. Queries are O(1).
+
+    ```python
+    from transport_challenge import Transport
+
+    m = Transport()
+    m.init_scene(scene="2a", layout=1)
+    container_id = m.containers[0]
+    print(m.container_occupancy.is_empty(container_id))
+    ```
+    """
+
+    def __init__(self):
+        # Key = The ID of the container. Value = The IDs of the objects in the container.
+        self._occupants: Dict[int, Set[int]] = dict()
+
+    def update(self, resp: List[bytes]) -> None:
+        """
+        Update the index from the trigger collision events in a response from the build.
+
+        :param resp: The response from the build.
+        """
+
+        for i in range(len(resp) - 1):
+            if OutputData.get_data_type_id(resp[i]) != "trco":
+                continue
+            trigger = TriggerCollision(resp[i])
+            container_id = trigger.get_collidee_id()
+            if container_id not in self._occupants:
+                self._occupants[container_id] = set()
+            if trigger.get_state() == "exit":
+                self._occupants[container_id].discard(trigger.get_collider_id())
+            # Enter and stay events.
+            else:
+                self._occupants[container_id].add(trigger.get_collider_id())
+
+    def contains(self, container_id: int, object_id: int) -> bool:
+        """
+        :param container_id: The ID of the container.
+        :param object_id: The ID of the object.
+
+        :return: True if the object is in the container.
+        """
+
+        return container_id in self._occupants and object_id in self._occupants[container_id]
+
+    def is_empty(self, container_id: int) -> bool:
+        """
+        :param container_id: The ID of the container.
+
+        :return: True if there are no objects in the container.
+        """
+
+        return container_id not in self._occupants or len(self._occupants[container_id]) == 0
+
+    def get(self, container_id: int) -> FrozenSet[int]:
+        """
+        :param container_id: The ID of the container.
+
+        :return: The IDs of the objects in the container.
+        """
+
+        if container_id not in self._occupants:
+            return frozenset()
+        return frozenset(self._occupants[container_id])
+
+    def clear(self) -> None:
+        """
+        Remove every container from the index.
+        """
+
+        self._occupants.clear()
@@ -0,0 +1,309 @@
+from pathlib import Path
+from argparse import ArgumentParser
+from multiprocessing import Pool
+from typing import List, Dict, Optional, Union, Iterable, Tuple
+import numpy as np
+from transport_challenge.scene_cache import SCENE_CACHE
+from transport_challenge.placement import get_placement
+from transport_challenge.object_data import OBJECT_DATA
+
+
+class Episode:
+    """
+    The content of a single Transport Challenge episode: the goal room, the Magnebot's spawn room, and the model, occupancy map cell, rotation, and visual material of every target object and container.
+
+    To generate an episode without a build, see `get_episode()`. To start an episode, see `Transport.init_scene(episode=episode)`.
+
+    ```python
+    from transport_challenge.episode import get_episode
+
+    episode = get_episode(scene="2a", layout=1, random_seed=0)
+    print(episode.goal_room, episode.target_object_models)
+    ```
+    """
+
+    def __init__(self, scene: str, layout: int, goal_room: int, room: int, target_object_models: List[str],
+                 target_object_cells: np.array, target_object_rotations: np.array,
+                 target_object_materials: List[str], container_models: List[str], container_cells: np.array,
+                 container_rotations: np.array, random_seed: int = None):
+        """
+        :param scene: The name of the scene.
+        :param layout: The furniture layout.
+        :param goal_room: The goal room.
+        :param room: The room that the Magnebot spawns in.
+        :param target_object_models: The model name of each target object.
+        :param target_object_cells: The `(i, j)` occupancy map cell of each target object as an `(n, 2)` numpy array.
+        :param target_object_rotations: The rotation around the y axis of each target object in degrees.
+        :param target_object_materials: The visual material of each target object.
+        :param container_models: The model name of each container.
+        :param container_cells: The `(i, j)` occupancy map cell of each container as an `(n, 2)` numpy array.
+        :param container_rotations: The rotation around the y axis of each container in degrees.
+        :param random_seed: The random seed that was used to generate the episode. Can be None.
+        """
+
+        """:field
+        The name of the scene.
+        """
+        self.scene: str = scene
+        """:field
+        The furniture layout.
+        """
+        self.layout: int = int(layout)
+        """:field
+        The goal room.
+        """
+        self.goal_room: int = int(goal_room)
+        """:field
+        The room that the Magnebot spawns in.
+        """
+        self.room: int = int(room)
+        """:field
+        The model name of each target object.
+        """
+        self.target_object_models: List[str] = target_object_models
+        """:field
+        The `(i, j)` occupancy map cell of each target object as an `(n, 2)` numpy array.
+        """
+        self.target_object_cells: np.array = np.asarray(target_object_cells, dtype=int).reshape(-1, 2)
+        """:field
+        The rotation around the y axis of each target object in degrees.
+        """
+        self.target_object_rotations: np.array = np.asarray(target_object_rotations, dtype=float)
+        """:field
+        The visual material of each target object.
+        """
+        self.target_object_materials: List[str] = target_object_materials
+        """:field
+        The model name of each container.
+        """
+        self.container_models: List[str] = container_models
+        """:field
+        The `(i, j)` occupancy map cell of each container as an `(n, 2)` numpy array.
+        """
+        self.container_cells: np.array = np.asarray(container_cells, dtype=int).reshape(-1, 2)
+        """:field
+        The rotation around the y axis of each container in degrees.
+        """
+        self.container_rotations: np.array = np.asarray(container_rotations, dtype=float)
+        """:field
+        The random seed that was used to generate the episode. Can be None.
+        """
+        self.random_seed: Optional[int] = random_seed
+
+
+def get_episode(scene: str, layout: int, random_seed: int = None, room: int = None, goal_room: int = None,
+                rng: np.random.RandomState = None) -> Episode:
+    """
+    Generate an episode without a build. For a given random seed, the episode is the same as the one created by `Transport.init_scene()`.
+
+    :param scene: The name of the scene.
+    :param layout: The furniture layout.
+    :param random_seed: The random seed. Ignored if `rng` isn't None.
+    :param room: The room that the Magnebot spawns in. If None, the room is chosen randomly.
+    :param goal_room: The goal room. If None, the room is chosen randomly.
+    :param rng: The random number generator. If None, a new generator is created from `random_seed`.
+
+    :return: An `Episode`.
+    """
+
+    if rng is None:
+        rng = np.random.RandomState(random_seed)
+    assets = SCENE_CACHE.get(scene=scene, layout=layout)
+    # The order of the random draws determines the episode for a given seed. Don't change it.
+    # Set the room of the goal.
+    if goal_room is None:
+        goal_room = int(rng.choice(assets.rooms))
+    else:
+        assert goal_room in assets.rooms, f"Not a valid room: {goal_room}"
+    # Choose cells for the target objects and containers.
+    placement = get_placement(free_cells=assets.get_free_cells(), rng=rng)
+    # Choose the model, rotation, and visual material of each target object.
+    # `choice()` converts lists to arrays, so convert them once.
+    target_object_names = np.array(OBJECT_DATA.get_target_object_names())
+    target_object_materials = np.array(OBJECT_DATA.get_target_object_materials())
+    target_object_models: List[str] = list()
+    target_object_rotations = np.zeros(len(placement.target_cells))
+    materials: List[str] = list()
+    for i in range(len(placement.target_cells)):
+        target_object_models.append(str(rng.choice(target_object_names)))
+        target_object_rotations[i] = rng.uniform(-179, 179)
+        materials.append(str(rng.choice(target_object_materials)))
+    # Choose the model and rotation of each container.
+    containers = np.array(OBJECT_DATA.get_containers())
+    container_models: List[str] = list()
+    container_rotations = np.zeros(len(placement.container_cells))
+    for i in range(len(placement.container_cells)):
+        container_models.append(str(rng.choice(containers)))
+        container_rotations[i] = rng.uniform(-179, 179)
+    # Choose the Magnebot's room.
+    room_keys = list(assets.spawn_positions.keys())
+    if room is None:
+        room = rng.choice(room_keys)
+    else:
+        assert str(room) in room_keys, f"Invalid room: {room}; valid rooms are: {room_keys}"
+    return Episode(scene=scene, layout=layout, goal_room=goal_room, room=int(room),
+                   target_object_models=target_object_models, target_object_cells=placement.target_cells,
+                   target_object_rotations=target_object_rotations, target_object_materials=materials,
+                   container_models=container_models, container_cells=placement.container_cells,
+                   container_rotations=container_rotations, random_seed=random_seed)
+
+
+def write_episodes(episodes: List[Episode], path: Union[str, Path]) -> None:
+    """
+    Write episodes to a compressed columnar `.npz` file. Each field is stored as a single array; the objects of every episode are concatenated and model and material names are stored as indices.
+
+    :param episodes: The episodes.
+    :param path: The path to the file.
+    """
+
+    if isinstance(path, str):
+        path = Path(path)
+    if not path.parent.exists():
+        path.parent.mkdir(parents=True)
+    target_object_models = [m for e in episodes for m in e.target_object_models]
+    target_object_materials = [m for e in episodes for m in e.target_object_materials]
+    container_models = [m for e in episodes for m in e.container_models]
+    target_object_model_names, target_object_model_indices = _get_vocabulary(target_object_models)
+    material_names, material_indices = _get_vocabulary(target_object_materials)
+    container_model_names, container_model_indices = _get_vocabulary(container_models)
+    with path.open("wb") as f:
+        np.savez_compressed(
+            f,
+            scenes=np.array([e.scene for e in episodes], dtype=str),
+            layouts=np.array([e.layout for e in episodes], dtype=np.int16),
+            random_seeds=np.array([-1 if e.random_seed is None else e.random_seed for e in episodes],
+                                  dtype=np.int64),
+            goal_rooms=np.array([e.goal_room for e in episodes], dtype=np.int16),
+            rooms=np.array([e.room for e in episodes], dtype=np.int16),
+            target_object_offsets=_get_offsets([len(e.target_object_models) for e in episodes]),
+            target_object_model_names=np.array(target_object_model_names, dtype=str),
+            target_object_models=target_object_model_indices,
+            target_object_cells=np.concatenate([e.target_object_cells for e in episodes] +
+                                               [np.zeros((0, 2))]).astype(np.int16),
+            target_object_rotations=np.concatenate([e.target_object_rotations for e in episodes] + [np.zeros(0)]),
+            material_names=np.array(material_names, dtype=str),
+            target_object_materials=material_indices,
+            container_offsets=_get_offsets([len(e.container_models) for e in episodes]),
+            container_model_names=np.array(container_model_names, dtype=str),
+            container_models=container_model_indices,
+            container_cells=np.concatenate([e.container_cells for e in episodes] +
+                                           [np.zeros((0, 2))]).astype(np.int16),
+            container_rotations=np.concatenate([e.container_rotations for e in episodes] + [np.zeros(0)]))
+
+
+def read_episodes(path: Union[str, Path]) -> List[Episode]:
+    """
+    :param path: The path to a file created by `write_episodes()`.
+
+    :return: A list of episodes.
+    """
+
+    with np.load(str(path)) as data:
+        columns: Dict[str, np.array] = {k: data[k] for k in data.files}
+    target_object_model_names = columns["target_object_model_names"].tolist()
+    material_names = columns["material_names"].tolist()
+    container_model_names = columns["container_model_names"].tolist()
+    target_object_offsets = columns["target_object_offsets"]
+    container_offsets = columns["container_offsets"]
+    episodes: List[Episode] = list()
+    for i in range(len(columns["scenes"])):
+        t = slice(target_object_offsets[i], target_object_offsets[i + 1])
+        c = slice(container_offsets[i], container_offsets[i + 1])
+        random_seed = int(columns["random_seeds"][i])
+        episodes.append(Episode(scene=str(columns["scenes"][i]),
+                                layout=int(columns["layouts"][i]),
+                                goal_room=int(columns["goal_rooms"][i]),
+                                room=int(columns["rooms"][i]),
+                                target_object_models=[target_object_model_names[j] for j in
+                                                      columns["target_object_models"][t]],
+                                target_object_cells=columns["target_object_cells"][t],
+                                target_object_rotations=columns["target_object_rotations"][t],
+                                target_object_materials=[material_names[j] for j in
+                                                         columns["target_object_materials"][t]],
+                                container_models=[container_model_names[j] for j in columns["container_models"][c]],
+                                container_cells=columns["container_cells"][c],
+                                container_rotations=columns["container_rotations"][c],
+                                random_seed=None if random_seed < 0 else random_seed))
+    return episodes
+
+
+def generate_episodes(specs: Iterable[dict], path: Union[str, Path] = None, num_workers: int = None,
+                      chunk_size: int = 64) -> List[Episode]:
+    """
+    Generate many episodes in parallel with a process pool.
+
+    ```python
+    from transport_challenge.episode import generate_episodes
+
+    specs = [{"scene": "2a", "layout": 1, "random_seed": i} for i in range(1000)]
+    episodes = generate_episodes(specs=specs, path="episodes.npz")
+    ```
+
+    :param specs: The parameters of each episode as dictionaries of `get_episode()` parameters, for example: `{"scene": "2a", "layout": 1, "random_seed": 0}`.
+    :param path: If not None, write the episodes to this file. See `write_episodes()`.
+    :param num_workers: The number of worker processes. If None, this is the number of CPUs.
+    :param chunk_size: The number of episodes per task. Each task is sent to a worker process.
+
+    :return: A list of episodes in the same order as `specs`.
+    """
+
+    specs = list(specs)
+    # Group the specs by scene and layout so that each worker loads as few scenes as possible.
+    order = sorted(range(len(specs)), key=lambda i: (specs[i]["scene"], int(specs[i]["layout"])))
+    chunks = [[specs[i] for i in order[j:j + chunk_size]] for j in range(0, len(order), chunk_size)]
+    episodes: List[Optional[Episode]] = [None] * len(specs)
+    with Pool(processes=num_workers) as pool:
+        index = 0
+        for chunk in pool.imap(_get_episodes, chunks):
+            for episode in chunk:
+                episodes[order[index]] = episode
+                index += 1
+    if path is not None:
+        write_episodes(episodes=episodes, path=path)
+    return episodes
+
+
+def _get_episodes(specs: List[dict]) -> List[Episode]:
+    """
+    :param specs: The parameters of each episode.
+
+    :return: The episodes.
+    """
+
+    return [get_episode(**spec) for spec in specs]
+
+
+def _get_vocabulary(names: List[str]) -> Tuple[List[str], np.array]:
+    """
+    :param names: A list of names.
+
+    :return: Tuple: The sorted unique names; the index of each name in the vocabulary as a numpy array.
+    """
+
+    vocabulary, indices = np.unique(np.array(names, dtype=str), return_inverse=True)
+    return vocabulary.tolist(), indices.astype(np.int16)
+
+
+def _get_offsets(counts: List[int]) -> np.array:
+    """
+    :param counts: The number of objects in each episode.
+
+    :return: The start index of each episode's objects. The last element is the total number of objects.
+    """
+
+    offsets = np.zeros(len(counts) + 1, dtype=np.int32)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Generate Transport Challenge episodes without a build.")
+    parser.add_argument("--scene", type=str, nargs="+", default=["2a"], help="The scenes.")
+    parser.add_argument("--layout", type=int, nargs="+", default=[0], help="The layouts.")
+    parser.add_argument("--num_seeds", type=int, default=1, help="The number of random seeds per scene and layout.")
+    parser.add_argument("--num_workers", type=int, help="The number of worker processes. Default: the number of CPUs.")
+    parser.add_argument("--output", type=str, default="episodes.npz", help="The path to the output file.")
+    args = parser.parse_args()
+    generate_episodes(specs=[{"scene": s, "layout": la, "random_seed": seed} for s in args.scene
+                             for la in args.layout for seed in range(args.num_seeds)],
+                      path=args.output, num_workers=args.num_workers)
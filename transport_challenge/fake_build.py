@@ -0,0 +1,119 @@
+from json import loads
+from os import _exit
+from multiprocessing import Process
+from threading import Thread
+from typing import List, Callable, Optional
+import zmq
+
+
+class FakeBuild:
+    """
+    A stand-in for the TDW build. It connects to a controller's socket on localhost and replies to every `communicate()` call with a scripted response. There is no rendering or physics and it doesn't require a GPU.
+
+    This is meant for testing and benchmarking controller-side code. The default response contains only the frame number, which is enough to drive a plain `tdw.controller.Controller`.
+
+    ```python
+    from tdw.controller import Controller
+    from transport_challenge.fake_build import FakeBuild
+
+    build = FakeBuild(port=1071).launch()
+    c = Controller(port=1071, check_version=False, launch_build=False)
+    resp = c.communicate([])
+    c.communicate({"$type": "terminate"})
+    build.join()
+    ```
+    """
+
+    def __init__(self, port: int = 1071, responses: Callable[[List[dict], int], List[bytes]] = None,
+                 crash_after: int = -1):
+        """
+        :param port: The socket port.
+        :param responses: A function that returns a response. Parameters: The commands sent by the controller; the frame number. If None, the response contains only the frame number.
+        :param crash_after: If greater than or equal to 0, the process will exit without replying after receiving this many messages. This can be used to test how controllers handle a crashed build.
+        """
+
+        """:field
+        The socket port.
+        """
+        self.port: int = port
+        """:field
+        The current frame number.
+        """
+        self.frame: int = 0
+        self._responses: Callable[[List[dict], int], List[bytes]] = responses
+        self._crash_after: int = crash_after
+
+    def run(self) -> None:
+        """
+        Connect to the controller and reply to messages until the controller sends `terminate`. This blocks the current thread.
+        """
+
+        context = zmq.Context()
+        socket = context.socket(zmq.REQ)
+        socket.connect(f"tcp://localhost:{self.port}")
+        # The controller waits for a first message from the build.
+        socket.send(b"0")
+        num_messages = 0
+        while True:
+            commands: List[dict] = loads(socket.recv_multipart()[0].decode("utf-8"))
+            num_messages += 1
+            if num_messages == self._crash_after:
+                _exit(1)
+            # Step the simulation.
+            self.frame += 1
+            socket.send_multipart(self.get_response(commands=commands))
+            for command in commands:
+                if command["$type"] == "terminate":
+                    socket.close(linger=0)
+                    context.term()
+                    return
+
+    def get_response(self, commands: List[dict]) -> List[bytes]:
+        """
+        :param commands: The commands sent by the controller.
+
+        :return: The response to send to the controller. The last element is the frame number.
+        """
+
+        if self._responses is None:
+            resp = list()
+        else:
+            resp = self._responses(commands, self.frame)
+        # The last element of the response is always the frame number.
+        return resp + [self.frame.to_bytes(4, byteorder="little")]
+
+    def launch(self, daemon: bool = True) -> Process:
+        """
+        Run this fake build in a separate process.
+
+        :param daemon: If True, the process is a daemon process.
+
+        :return: The process.
+        """
+
+        process = Process(target=self.run, daemon=daemon)
+        process.start()
+        return process
+
+    def launch_thread(self) -> Thread:
+        """
+        Run this fake build in a daemon thread of the current process. This is useful when the caller needs to inspect the fake build while it runs.
+
+        :return: The thread.
+        """
+
+        thread = Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
+
+
+def launch_fake_build(port: int) -> Optional[Process]:
+    """
+    Launch a default `FakeBuild`. This can be used as the `build_launcher` of a `Sweep`.
+
+    :param port: The socket port.
+
+    :return: The fake build process.
+    """
+
+    return FakeBuild(port=port).launch()
@@ -0,0 +1,216 @@
+from pathlib import Path
+from collections import deque
+from threading import Thread, Condition
+from typing import List, Set, Union
+import numpy as np
+from PIL import Image
+from tdw.tdw_utils import TDWUtils
+from tdw.output_data import Images
+from magnebot.scene_state import SceneState
+from transport_challenge.backpressure import Backpressure
+
+
+class ImageWriter:
+    """
+    Write images to disk on background threads so that disk latency isn't added to simulation time.
+
+    Images are added to a bounded queue and written by a pool of threads. If the queue is full, the writer either blocks until there is room or discards the oldest queued image (see `Backpressure`).
+
+    Encoded passes (`img`, `id`) are written as-is. Depth passes are encoded as .png files on the writer threads.
+
+    ```python
+    from transport_challenge import Transport
+
+    m = Transport(auto_save_images=True)
+    m.init_scene(scene="2a", layout=1)
+    m.move_by(2)
+    # Wait for every queued image to be written.
+    m.image_writer.flush()
+    m.end()
+    ```
+    """
+
+    def __init__(self, num_threads: int = 2, max_queue_size: int = 64,
+                 backpressure: Backpressure = Backpressure.block):
+        """
+        :param num_threads: The number of writer threads.
+        :param max_queue_size: The maximum number of queued images.
+        :param backpressure: What to do when the queue is full.
+        """
+
+        """:field
+        What to do when the queue is full.
+        """
+        self.backpressure: Backpressure = backpressure
+        """:field
+        The total number of images written to disk.
+        """
+        self.written: int = 0
+        """:field
+        The total number of images discarded because the queue was full (see `Backpressure.drop_oldest`).
+        """
+        self.dropped: int = 0
+        self._num_threads: int = num_threads
+        self._max_queue_size: int = max_queue_size
+        # Each element is a tuple: The path; the image data (encoded bytes or a numpy array).
+        self._queue: deque = deque()
+        self._condition: Condition = Condition()
+        # The number of images that are being written right now.
+        self._num_writing: int = 0
+        self._threads: List[Thread] = list()
+        self._done: bool = False
+        # Directories that already exist.
+        self._directories: Set[Path] = set()
+
+    def save(self, path: Union[str, Path], image: Union[bytes, np.array]) -> None:
+        """
+        Queue an image to be written to disk. The directory is created if it doesn't exist.
+
+        :param path: The path to the image file.
+        :param image: Either an encoded image (.jpg or .png bytes, or a 1D array of bytes) or a 2D or 3D numpy array (for example, a depth pass) that will be encoded as a .png file.
+        """
+
+        if isinstance(path, str):
+            path = Path(path)
+        # Start the threads the first time an image is saved.
+        if len(self._threads) == 0:
+            self._done = False
+            for i in range(self._num_threads):
+                thread = Thread(target=self._run, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        with self._condition:
+            while len(self._queue) >= self._max_queue_size:
+                if self.backpressure == Backpressure.drop_oldest:
+                    self._queue.popleft()
+                    self.dropped += 1
+                else:
+                    self._condition.wait()
+            self._queue.append((path, image))
+            self._condition.notify_all()
+
+    def save_scene_state(self, state: SceneState, output_directory: Union[str, Path]) -> None:
+        """
+        Queue each image pass of a `SceneState`. This is the same as `SceneState.save_images()`: images will be named `[frame_number]_[pass_name].[extension]`
+
+        :param state: The scene state.
+        :param output_directory: The directory that the images will be saved to.
+        """
+
+        if isinstance(output_directory, str):
+            output_directory = Path(output_directory)
+        # The prefix is a zero-padded integer to ensure sequential images.
+        prefix = TDWUtils.zero_padding(SceneState.FRAME_COUNT, 8)
+        for pass_name in state.images:
+            image = state.images[pass_name]
+            if image is None:
+                continue
+            self.save(path=output_directory.joinpath(f"{prefix}_{pass_name}.{ImageWriter._get_extension(image)}"),
+                      image=image)
+
+    def save_images(self, images: Images, filename: str, output_directory: Union[str, Path]) -> None:
+        """
+        Queue each pass of an `Images` output data object. This is the same as `TDWUtils.save_images()`: images will be named `[pass_name]_[filename].[extension]`
+
+        :param images: The `Images` output data.
+        :param filename: The filename of each image, minus the extension. The image pass will be appended as a prefix.
+        :param output_directory: The directory that the images will be saved to.
+        """
+
+        if isinstance(output_directory, str):
+            output_directory = Path(output_directory)
+        for i in range(images.get_num_passes()):
+            pass_mask = images.get_pass_mask(i)
+            path = output_directory.joinpath(f"{pass_mask[1:]}_{filename}.{images.get_extension(i)}")
+            # The depth passes aren't png files. Reshape them now and encode them on a writer thread.
+            if pass_mask == "_depth" or pass_mask == "_depth_simple":
+                self.save(path=path, image=TDWUtils.get_shaped_depth_pass(images=images, index=i))
+            else:
+                self.save(path=path, image=images.get_image(i))
+
+    def flush(self) -> None:
+        """
+        Wait until every queued image has been written to disk.
+        """
+
+        with self._condition:
+            while len(self._queue) > 0 or self._num_writing > 0:
+                self._condition.wait()
+
+    def close(self) -> None:
+        """
+        Write every queued image to disk and stop the writer threads. The threads will restart if another image is saved.
+        """
+
+        self.flush()
+        with self._condition:
+            self._done = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+
+    def get_queue_size(self) -> int:
+        """
+        :return: The number of images in the queue.
+        """
+
+        return len(self._queue)
+
+    def _run(self) -> None:
+        """
+        Write images until `close()` is called.
+        """
+
+        while True:
+            with self._condition:
+                while len(self._queue) == 0 and not self._done:
+                    self._condition.wait()
+                if len(self._queue) == 0:
+                    return
+                path, image = self._queue.popleft()
+                self._num_writing += 1
+                # There is now room in the queue.
+                self._condition.notify_all()
+            written = False
+            try:
+                self._write(path=path, image=image)
+                written = True
+            except OSError as e:
+                print(f"Failed to write {path}: {e}")
+            finally:
+                with self._condition:
+                    self._num_writing -= 1
+                    if written:
+                        self.written += 1
+                    self._condition.notify_all()
+
+    def _write(self, path: Path, image: Union[bytes, np.array]) -> None:
+        """
+        Write an image to disk.
+
+        :param path: The path to the image file.
+        :param image: Either an encoded image or a numpy array.
+        """
+
+        directory = path.parent
+        if directory not in self._directories:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._directories.add(directory)
+        if isinstance(image, np.ndarray) and image.ndim > 1:
+            Image.fromarray(image).save(str(path.resolve()))
+        else:
+            path.write_bytes(image)
+
+    @staticmethod
+    def _get_extension(image: Union[bytes, np.array]) -> str:
+        """
+        :param image: Either an encoded image or a numpy array.
+
+        :return: The file extension of the image.
+        """
+
+        # Images that aren't already encoded (for example, depth passes) are encoded as .png files.
+        if (isinstance(image, np.ndarray) and image.ndim > 1) or bytes(image[:4]) == b"\x89PNG":
+            return "png"
+        return "jpg"
@@ -0,0 +1,280 @@
+from collections.abc import Mapping
+from typing import List, Dict, Optional, Callable, Iterator
+import numpy as np
+from tdw.output_data import OutputData, Images
+from tdw.FBOutput import Transforms as Trans
+from tdw.FBOutput import Robot as Robo
+from tdw.FBOutput import Magnebot as Mag
+from tdw.FBOutput import Images as Imags
+from tdw.FBOutput import CameraMatrices as CaMa
+from tdw.tdw_utils import TDWUtils
+from magnebot import Arm
+from magnebot.scene_state import SceneState
+from magnebot.transform import Transform
+
+
+# The memory layout of each element of the `Transforms` object vector: ID, position, rotation, forward.
+TRANSFORM_DTYPE = np.dtype([("id", "<i4"), ("position", "<f4", (3,)), ("rotation", "<f4", (4,)),
+                            ("forward", "<f4", (3,))])
+
+
+class _LazyMapping(Mapping):
+    """
+    A read-only dictionary whose values are decoded the first time they're accessed.
+    """
+
+    def __init__(self, get_indices: Callable[[], Dict[int, int]], get_value: Callable[[int], object]):
+        """
+        :param get_indices: A function that returns a dictionary. Key = The key. Value = The index of the value.
+        :param get_value: A function that decodes a value. Parameters: the index of the value.
+        """
+
+        self._get_indices: Callable[[], Dict[int, int]] = get_indices
+        self._get_value: Callable[[int], object] = get_value
+        self._indices: Optional[Dict[int, int]] = None
+        self._values: Dict[int, object] = dict()
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            if self._indices is None:
+                self._indices = self._get_indices()
+            self._values[key] = self._get_value(self._indices[key])
+        return self._values[key]
+
+    def __contains__(self, key) -> bool:
+        if self._indices is None:
+            self._indices = self._get_indices()
+        return key in self._indices
+
+    def __iter__(self) -> Iterator:
+        if self._indices is None:
+            self._indices = self._get_indices()
+        return iter(self._indices)
+
+    def __len__(self) -> int:
+        if self._indices is None:
+            self._indices = self._get_indices()
+        return len(self._indices)
+
+
+class LazySceneState(SceneState):
+    """
+    A [`SceneState`](https://github.com/alters-mit/magnebot/blob/main/doc/scene_state.md) that doesn't decode the output data until it's needed.
+
+    The constructor only indexes the response by output data type. Each field is decoded the first time it's accessed, and only for the keys that are accessed. For example, `state.object_transforms[object_id]` decodes the transform of one object and `state.joint_angles[joint_id]` decodes the angles of one joint. The object transforms are a zero-copy NumPy view of the response's byte buffer (see `get_object_positions()`, which also accepts a regular `SceneState`).
+
+    This is meant for inner loops that create a new state per frame, such as waiting for arm motion or for objects to stop moving. The values are read-only. `Transport.state` is still a `SceneState`.
+
+    ```python
+    from transport_challenge.lazy_scene_state import LazySceneState
+
+    state = LazySceneState(resp=resp)
+    print(state.object_transforms[object_id].position)
+    ```
+    """
+
+    def __init__(self, resp: List[bytes]):
+        """
+        :param resp: The response from the build.
+        """
+
+        # `SceneState.__init__()` decodes everything, so it isn't called here.
+        self._resp: List[bytes] = resp
+        # Key = The output data type ID. Value = The indices of the output data in the response.
+        self._sections: Dict[str, List[int]] = dict()
+        for i in range(len(resp) - 1):
+            r_id = OutputData.get_data_type_id(resp[i])
+            if r_id not in self._sections:
+                self._sections[r_id] = [i]
+            else:
+                self._sections[r_id].append(i)
+        self._robot: Optional[Robo.Robot] = None
+        self._magnebot_transform: Optional[Transform] = None
+        self._joint_indices: Optional[Dict[int, int]] = None
+        self._joint_positions: Optional[_LazyMapping] = None
+        self._joint_angles: Optional[_LazyMapping] = None
+        self._held: Optional[Dict[Arm, np.array]] = None
+        self._transforms: Optional[np.array] = None
+        self._transform_indices: Optional[Dict[int, int]] = None
+        self._object_transforms: Optional[_LazyMapping] = None
+        self._camera_matrices: Optional[CaMa.CameraMatrices] = None
+        self._images: Optional[Dict[str, np.array]] = None
+        self._third_person_images: Optional[Dict[str, Dict[str, np.array]]] = None
+        # Update the frame count like `SceneState` if there are images from the Magnebot's camera.
+        for i in self._sections.get("imag", []):
+            if Imags.Images.GetRootAsImages(resp[i], 0).AvatarId() == b"a":
+                SceneState.FRAME_COUNT += 1
+                break
+
+    @property
+    def magnebot_transform(self) -> Transform:
+        if self._magnebot_transform is None:
+            transform = self._get_robot().Transform()
+            self._magnebot_transform = Transform(position=np.array(OutputData._get_vector3(transform.Position)),
+                                                 rotation=np.array(OutputData._get_quaternion(transform.Rotation)),
+                                                 forward=np.array(OutputData._get_vector3(transform.Forward)))
+        return self._magnebot_transform
+
+    @property
+    def joint_positions(self) -> Dict[int, np.array]:
+        if self._joint_positions is None:
+            self._joint_positions = _LazyMapping(get_indices=self._get_joint_indices,
+                                                 get_value=lambda i: self._get_robot().Joints(i).PositionAsNumpy())
+        return self._joint_positions
+
+    @property
+    def joint_angles(self) -> Dict[int, np.array]:
+        if self._joint_angles is None:
+            self._joint_angles = _LazyMapping(get_indices=self._get_joint_indices,
+                                              get_value=lambda i: np.degrees(
+                                                  self._get_robot().Joints(i).PositionsAsNumpy()))
+        return self._joint_angles
+
+    @property
+    def held(self) -> Dict[Arm, np.array]:
+        if self._held is None:
+            magnebot = Mag.Magnebot.GetRootAsMagnebot(self._resp[self._sections["magn"][0]], 0)
+            self._held = {Arm.left: magnebot.HeldLeftAsNumpy(),
+                          Arm.right: magnebot.HeldRightAsNumpy()}
+        return self._held
+
+    @property
+    def object_transforms(self) -> Dict[int, Transform]:
+        if self._object_transforms is None:
+            transforms = self._get_transforms()
+            self._object_transforms = _LazyMapping(
+                get_indices=self._get_transform_indices,
+                get_value=lambda i: Transform(position=transforms["position"][i],
+                                              rotation=transforms["rotation"][i],
+                                              forward=transforms["forward"][i]))
+        return self._object_transforms
+
+    @property
+    def projection_matrix(self) -> Optional[np.array]:
+        matrices = self._get_camera_matrices()
+        return None if matrices is None else matrices.ProjectionMatrixAsNumpy()
+
+    @property
+    def camera_matrix(self) -> Optional[np.array]:
+        matrices = self._get_camera_matrices()
+        return None if matrices is None else matrices.CameraMatrixAsNumpy()
+
+    @property
+    def images(self) -> Dict[str, np.array]:
+        if self._images is None:
+            self._decode_images()
+        return self._images
+
+    @property
+    def third_person_images(self) -> Dict[str, Dict[str, np.array]]:
+        if self._third_person_images is None:
+            self._decode_images()
+        return self._third_person_images
+
+    def _get_robot(self) -> Robo.Robot:
+        """
+        :return: The robot output data.
+        """
+
+        if self._robot is None:
+            self._robot = Robo.Robot.GetRootAsRobot(self._resp[self._sections["robo"][0]], 0)
+        return self._robot
+
+    def _get_joint_indices(self) -> Dict[int, int]:
+        """
+        :return: A dictionary. Key = The ID of a joint. Value = The index of the joint in the robot output data.
+        """
+
+        if self._joint_indices is None:
+            robot = self._get_robot()
+            self._joint_indices = {robot.Joints(i).Id(): i for i in range(robot.JointsLength())}
+        return self._joint_indices
+
+    def _get_transforms(self) -> np.array:
+        """
+        :return: A structured numpy array of the object transforms (see `TRANSFORM_DTYPE`). This is a view of the response's byte buffer.
+        """
+
+        if self._transforms is None:
+            if "tran" not in self._sections:
+                self._transforms = np.zeros(0, dtype=TRANSFORM_DTYPE)
+            else:
+                self._transforms = get_transforms(buffer=self._resp[self._sections["tran"][0]])
+        return self._transforms
+
+    def _get_transform_indices(self) -> Dict[int, int]:
+        """
+        :return: A dictionary. Key = An object ID. Value = The index of the object in the transforms array.
+        """
+
+        if self._transform_indices is None:
+            transforms = self._get_transforms()
+            self._transform_indices = dict(zip(transforms["id"].tolist(), range(len(transforms))))
+        return self._transform_indices
+
+    def _get_camera_matrices(self) -> Optional[CaMa.CameraMatrices]:
+        """
+        :return: The camera matrices output data. Can be None.
+        """
+
+        if self._camera_matrices is None and "cama" in self._sections:
+            self._camera_matrices = CaMa.CameraMatrices.GetRootAsCameraMatrices(
+                self._resp[self._sections["cama"][0]], 0)
+        return self._camera_matrices
+
+    def _decode_images(self) -> None:
+        """
+        Decode the images the same way as `SceneState`.
+        """
+
+        self._images = dict()
+        self._third_person_images = dict()
+        # `SceneState.save_images()` reads the file extensions from this name-mangled field.
+        self._SceneState__image_extensions = dict()
+        for i in self._sections.get("imag", []):
+            images = Images(self._resp[i])
+            avatar_id = images.get_avatar_id()
+            if avatar_id == "a":
+                passes = self._images
+            else:
+                if avatar_id not in self._third_person_images:
+                    self._third_person_images[avatar_id] = dict()
+                passes = self._third_person_images[avatar_id]
+            for j in range(images.get_num_passes()):
+                pass_mask = images.get_pass_mask(j)
+                if pass_mask == "_depth":
+                    image_data = TDWUtils.get_shaped_depth_pass(images=images, index=j)
+                else:
+                    image_data = images.get_image(j)
+                passes[pass_mask[1:]] = image_data
+                if avatar_id == "a":
+                    self._SceneState__image_extensions[pass_mask[1:]] = images.get_extension(j)
+
+
+def get_object_positions(state: SceneState, object_ids: List[int]) -> np.array:
+    """
+    :param state: The scene state. This can be a `SceneState` or a `LazySceneState`.
+    :param object_ids: The IDs of the objects.
+
+    :return: The positions of the objects as an `(n, 3)` numpy array, in the same order as `object_ids`.
+    """
+
+    if not isinstance(state, LazySceneState):
+        return np.array([state.object_transforms[object_id].position for object_id in object_ids]).reshape(-1, 3)
+    transforms = state._get_transforms()
+    indices = state._get_transform_indices()
+    return transforms["position"][[indices[object_id] for object_id in object_ids]].reshape(-1, 3)
+
+
+def get_transforms(buffer: bytes) -> np.array:
+    """
+    :param buffer: `Transforms` output data.
+
+    :return: A structured numpy array of the object transforms (see `TRANSFORM_DTYPE`). This is a read-only view of `buffer`.
+    """
+
+    table = Trans.Transforms.GetRootAsTransforms(buffer, 0)._tab
+    offset = table.Offset(4)
+    if offset == 0:
+        return np.zeros(0, dtype=TRANSFORM_DTYPE)
+    return np.frombuffer(buffer, dtype=TRANSFORM_DTYPE, count=table.VectorLen(offset), offset=table.Vector(offset))
@@ -0,0 +1,158 @@
+from json import loads, dumps
+from pathlib import Path
+from platform import system
+from typing import Dict, List, Optional, Union
+from tdw.librarian import MaterialLibrarian
+from transport_challenge.object_data import OBJECT_DATA
+
+
+class MaterialTemplates:
+    """
+    A table of the commands that set every visual material of a target object model to a single material. Key = (model name, material name). Value = A list of commands without an object ID.
+
+    The first time a model is needed, its record is read from the model librarian and templates for every target object material are built in a single pass. To get the commands for an object, the object ID is stamped into a copy of the template.
+
+    Optionally, the table can be saved to disk so that later processes don't need to read the model and material librarians.
+
+    ```python
+    from transport_challenge.material_templates import MATERIAL_TEMPLATES
+
+    commands = MATERIAL_TEMPLATES.get_commands(model_name="jug05", material="marble_white", object_id=0)
+    ```
+    """
+
+    def __init__(self, path: Union[str, Path] = None, quality: str = "low"):
+        """
+        :param path: The path to the cache file. If None, the templates aren't saved to disk.
+        :param quality: The quality of the materials: `"low"`, `"med"`, or `"high"`.
+        """
+
+        if isinstance(path, str):
+            path = Path(path)
+        """:field
+        The path to the cache file. If None, the templates aren't saved to disk.
+        """
+        self.path: Optional[Path] = path
+        """:field
+        The quality of the materials.
+        """
+        self.quality: str = quality
+        """:field
+        The number of times `get_commands()` used an existing template.
+        """
+        self.hits: int = 0
+        """:field
+        The number of times `get_commands()` had to build templates.
+        """
+        self.misses: int = 0
+        # Key = A string key (see `_get_key()`). Value = A list of commands without an object ID.
+        # This is None until the table is loaded.
+        self._templates: Optional[Dict[str, List[dict]]] = None
+        # The material librarian. This is loaded lazily.
+        self._material_librarian: Optional[MaterialLibrarian] = None
+
+    def get_commands(self, model_name: str, material: str, object_id: int) -> List[dict]:
+        """
+        :param model_name: The name of the model.
+        :param material: The name of the visual material.
+        :param object_id: The ID of the object.
+
+        :return: A list of commands to add the material and set every visual material of the object to it.
+        """
+
+        if self._templates is None:
+            self.load()
+        key = MaterialTemplates._get_key(model_name=model_name, material=material)
+        if key in self._templates:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.build(model_names=[model_name], materials=list(set(OBJECT_DATA.get_target_object_materials() +
+                                                                    [material])))
+        return [{**command, "id": object_id} if command["$type"] == "set_visual_material" else dict(command)
+                for command in self._templates[key]]
+
+    def build(self, model_names: List[str] = None, materials: List[str] = None) -> None:
+        """
+        Build the templates for each combination of models and materials. If `self.path` isn't None, save the table to disk.
+
+        :param model_names: The names of the models. If None, build templates for every target object model.
+        :param materials: The names of the materials. If None, build templates for every target object material.
+        """
+
+        if self._templates is None:
+            self.load()
+        if model_names is None:
+            model_names = OBJECT_DATA.get_target_object_names()
+        if materials is None:
+            materials = OBJECT_DATA.get_target_object_materials()
+        if self._material_librarian is None:
+            self._material_librarian = MaterialLibrarian(library=f"materials_{self.quality}.json")
+        add_material_commands = {material: {"$type": "add_material",
+                                            "name": material,
+                                            "url": self._material_librarian.get_record(material).get_url()}
+                                 for material in materials}
+        for model_name in model_names:
+            substructure = OBJECT_DATA.get_librarian().get_record(model_name).substructure
+            for material in materials:
+                # The material only needs to be added once per object.
+                commands = [add_material_commands[material]]
+                for sub_object in substructure:
+                    for i in range(len(sub_object["materials"])):
+                        commands.append({"$type": "set_visual_material",
+                                         "material_name": material,
+                                         "object_name": sub_object["name"],
+                                         "material_index": i})
+                self._templates[MaterialTemplates._get_key(model_name=model_name, material=material)] = commands
+        self.save()
+
+    def load(self) -> None:
+        """
+        Load the table from disk. Templates that were saved on a different platform are ignored because material URLs are platform-specific.
+        """
+
+        self._templates = dict()
+        if self.path is None or not self.path.exists():
+            return
+        data: dict = loads(self.path.read_text(encoding="utf-8"))
+        if data["platform"] == system() and data["quality"] == self.quality:
+            self._templates.update(data["templates"])
+
+    def save(self) -> None:
+        """
+        Save the table to disk. If `self.path` is None, this doesn't do anything.
+        """
+
+        if self._templates is None or self.path is None:
+            return
+        if not self.path.parent.exists():
+            self.path.parent.mkdir(parents=True)
+        # Write to a temporary file and then replace the cache file so that the cache is never partially written.
+        temp = self.path.parent.joinpath(self.path.name + ".tmp")
+        temp.write_text(dumps({"platform": system(), "quality": self.quality, "templates": self._templates}),
+                        encoding="utf-8")
+        temp.replace(self.path)
+
+    def clear(self) -> None:
+        """
+        Clear the in-memory table and the hit and miss counters. This doesn't delete the cache file.
+        """
+
+        self._templates = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _get_key(model_name: str, material: str) -> str:
+        """
+        :param model_name: The name of the model.
+        :param material: The name of the material.
+
+        :return: A key for the table.
+        """
+
+        return f"{model_name}|{material}"
+
+
+# The process-wide material template table.
+MATERIAL_TEMPLATES = MaterialTemplates()
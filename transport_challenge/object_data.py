@@ -0,0 +1,84 @@
+from csv import DictReader
+from typing import Dict, List, Optional
+from tdw.librarian import ModelLibrarian
+from transport_challenge.paths import TARGET_OBJECTS_PATH, TARGET_OBJECT_MATERIALS_PATH, CONTAINERS_PATH
+
+
+class ObjectData:
+    """
+    Model data for target objects and containers: the model librarian, the target object models and their scale factors, the target object visual materials, and the container models.
+
+    Nothing is loaded until it is first needed. After that, the data is shared by every controller in the process.
+
+    ```python
+    from transport_challenge.object_data import OBJECT_DATA
+
+    print(OBJECT_DATA.get_target_objects())
+    ```
+    """
+
+    def __init__(self):
+        # The model librarian.
+        self._librarian: Optional[ModelLibrarian] = None
+        # Key = The name of a target object model. Value = Its scale factor.
+        self._target_objects: Optional[Dict[str, float]] = None
+        # The names of the target object models.
+        self._target_object_names: Optional[List[str]] = None
+        # The names of the visual materials for target objects.
+        self._target_object_materials: Optional[List[str]] = None
+        # The names of the container models.
+        self._containers: Optional[List[str]] = None
+
+    def get_librarian(self) -> ModelLibrarian:
+        """
+        :return: The model librarian (`models_core.json`).
+        """
+
+        if self._librarian is None:
+            self._librarian = ModelLibrarian()
+        return self._librarian
+
+    def get_target_objects(self) -> Dict[str, float]:
+        """
+        :return: A dictionary of target object models. Key = The name of the model. Value = The scale factor.
+        """
+
+        if self._target_objects is None:
+            target_objects: Dict[str, float] = dict()
+            with open(str(TARGET_OBJECTS_PATH.resolve())) as csvfile:
+                reader = DictReader(csvfile)
+                for row in reader:
+                    target_objects[row["name"]] = float(row["scale"])
+            self._target_objects = target_objects
+        return self._target_objects
+
+    def get_target_object_names(self) -> List[str]:
+        """
+        :return: The names of the target object models.
+        """
+
+        if self._target_object_names is None:
+            self._target_object_names = list(self.get_target_objects().keys())
+        return self._target_object_names
+
+    def get_target_object_materials(self) -> List[str]:
+        """
+        :return: The names of the visual materials for target objects.
+        """
+
+        if self._target_object_materials is None:
+            self._target_object_materials = TARGET_OBJECT_MATERIALS_PATH.read_text(encoding="utf-8").split("\n")
+        return self._target_object_materials
+
+    def get_containers(self) -> List[str]:
+        """
+        :return: The names of the container models.
+        """
+
+        if self._containers is None:
+            self._containers = CONTAINERS_PATH.read_text(encoding="utf-8").split("\n")
+        return self._containers
+
+
+# The process-wide object data.
+OBJECT_DATA = ObjectData()
@@ -0,0 +1,227 @@
+from collections.abc import Sequence
+from typing import Dict, List, Set, Optional, Iterator, Union
+import numpy as np
+from transport_challenge.object_role import ObjectRole
+
+
+class ObjectRecord:
+    """
+    Data for an object added to the scene by the Transport Challenge controller.
+    """
+
+    __slots__ = ["object_id", "role", "model_name", "scale", "cell"]
+
+    def __init__(self, object_id: int, role: ObjectRole, model_name: str, scale: Dict[str, float] = None,
+                 cell: Optional[np.array] = None):
+        """
+        :param object_id: The ID of the object.
+        :param role: The role of the object.
+        :param model_name: The name of the model.
+        :param scale: The scale factor of the object. If None, the scale factor is (1, 1, 1).
+        :param cell: The `(i, j)` occupancy map cell that the object spawned in. Can be None.
+        """
+
+        """:field
+        The ID of the object.
+        """
+        self.object_id: int = object_id
+        """:field
+        [The role of the object.](object_role.md)
+        """
+        self.role: ObjectRole = role
+        """:field
+        The name of the model.
+        """
+        self.model_name: str = model_name
+        """:field
+        The scale factor of the object as an `(x, y, z)` dictionary.
+        """
+        self.scale: Dict[str, float] = {"x": 1, "y": 1, "z": 1} if scale is None else scale
+        """:field
+        The `(i, j)` occupancy map cell that the object spawned in. Can be None.
+        """
+        self.cell: Optional[np.array] = cell
+
+
+class ObjectIdView(Sequence):
+    """
+    A read-only, list-like view of the IDs of every object in an `ObjectRegistry` with a given role.
+    `in` checks are O(1).
+    """
+
+    def __init__(self, ids: List[int], id_set: Set[int]):
+        """
+        :param ids: The object IDs, in the order they were added. This is shared with the registry.
+        :param id_set: The object IDs as a set. This is shared with the registry.
+        """
+
+        self.__ids: List[int] = ids
+        self.__id_set: Set[int] = id_set
+
+    def __contains__(self, object_id) -> bool:
+        return object_id in self.__id_set
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[int, List[int]]:
+        return self.__ids[index]
+
+    def __len__(self) -> int:
+        return len(self.__ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.__ids)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (list, tuple, ObjectIdView)):
+            return NotImplemented
+        return self.__ids == list(other)
+
+    def __repr__(self) -> str:
+        return repr(self.__ids)
+
+
+class ObjectRegistry:
+    """
+    An index of every object added to the scene by the Transport Challenge controller. Key = The object ID.
+
+    Each object has a role; see [`ObjectRole`](object_role.md). Role lookups are O(1) and the IDs of each role are available as a numpy array.
+
+    ```python
+    from transport_challenge import Transport, ObjectRole
+
+    m = Transport()
+    m.init_scene(scene="2a", layout=1)
+    for object_id in m.target_objects:
+        print(m.object_registry.get(object_id).model_name)
+    print(m.object_registry.get_ids(ObjectRole.container))
+    ```
+    """
+
+    def __init__(self):
+        # Key = The object ID. Value = The record.
+        self._records: Dict[int, ObjectRecord] = dict()
+        # The IDs of each role, in the order that they were added.
+        self._ids: Dict[ObjectRole, List[int]] = {role: list() for role in ObjectRole}
+        # The IDs of each role as a set.
+        self._id_sets: Dict[ObjectRole, Set[int]] = {role: set() for role in ObjectRole}
+        # The IDs of each role as a numpy array. This is set lazily and reset whenever the registry changes.
+        self._id_arrays: Dict[ObjectRole, np.array] = dict()
+        # The list-like views of each role.
+        self._views: Dict[ObjectRole, ObjectIdView] = {role: ObjectIdView(ids=self._ids[role],
+                                                                          id_set=self._id_sets[role])
+                                                       for role in ObjectRole}
+
+    def add(self, object_id: int, role: ObjectRole, model_name: str, scale: Dict[str, float] = None,
+            cell: Optional[np.array] = None) -> ObjectRecord:
+        """
+        Add an object to the registry.
+
+        :param object_id: The ID of the object.
+        :param role: The role of the object.
+        :param model_name: The name of the model.
+        :param scale: The scale factor of the object. If None, the scale factor is (1, 1, 1).
+        :param cell: The `(i, j)` occupancy map cell that the object spawned in. Can be None.
+
+        :return: The new `ObjectRecord`.
+        """
+
+        if object_id in self._records:
+            self.remove(object_id)
+        record = ObjectRecord(object_id=object_id, role=role, model_name=model_name, scale=scale, cell=cell)
+        self._records[object_id] = record
+        self._ids[role].append(object_id)
+        self._id_sets[role].add(object_id)
+        self._id_arrays.pop(role, None)
+        return record
+
+    def remove(self, object_id: int) -> None:
+        """
+        Remove an object from the registry.
+
+        :param object_id: The ID of the object.
+        """
+
+        record = self._records.pop(object_id)
+        self._ids[record.role].remove(object_id)
+        self._id_sets[record.role].discard(object_id)
+        self._id_arrays.pop(record.role, None)
+
+    def clear(self, role: ObjectRole = None) -> None:
+        """
+        Remove objects from the registry.
+
+        :param role: If not None, remove only objects with this role. If None, remove all objects.
+        """
+
+        roles = [r for r in ObjectRole] if role is None else [role]
+        for r in roles:
+            for object_id in self._ids[r]:
+                del self._records[object_id]
+            # Clear in-place so that the views stay valid.
+            self._ids[r].clear()
+            self._id_sets[r].clear()
+            self._id_arrays.pop(r, None)
+
+    def get(self, object_id: int) -> Optional[ObjectRecord]:
+        """
+        :param object_id: The ID of the object.
+
+        :return: The `ObjectRecord`, or None if the object isn't in the registry.
+        """
+
+        return self._records.get(object_id)
+
+    def get_role(self, object_id: int) -> Optional[ObjectRole]:
+        """
+        :param object_id: The ID of the object.
+
+        :return: The role of the object, or None if the object isn't in the registry.
+        """
+
+        record = self._records.get(object_id)
+        return None if record is None else record.role
+
+    def is_container(self, object_id: int) -> bool:
+        """
+        :param object_id: The ID of the object.
+
+        :return: True if the object is a container.
+        """
+
+        return object_id in self._id_sets[ObjectRole.container]
+
+    def is_target_object(self, object_id: int) -> bool:
+        """
+        :param object_id: The ID of the object.
+
+        :return: True if the object is a target object.
+        """
+
+        return object_id in self._id_sets[ObjectRole.target_object]
+
+    def get_ids(self, role: ObjectRole) -> np.array:
+        """
+        :param role: The role.
+
+        :return: A read-only numpy array of the IDs of each object with this role, in the order they were added. The same array is returned until the objects with this role change.
+        """
+
+        if role not in self._id_arrays:
+            ids = np.array(self._ids[role], dtype=int)
+            ids.flags.writeable = False
+            self._id_arrays[role] = ids
+        return self._id_arrays[role]
+
+    def get_view(self, role: ObjectRole) -> ObjectIdView:
+        """
+        :param role: The role.
+
+        :return: A read-only, list-like view of the IDs of each object with this role.
+        """
+
+        return self._views[role]
+
+    def __contains__(self, object_id) -> bool:
+        return object_id in self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
@@ -0,0 +1,18 @@
+from enum import Enum
+
+
+class ObjectRole(Enum):
+    """
+    The role of an object in the Transport Challenge.
+
+    ```python
+    from transport_challenge import ObjectRole
+
+    for role in ObjectRole:
+        print(role) # ObjectRole.container, ObjectRole.target_object, ObjectRole.furniture
+    ```
+    """
+
+    container = 0  # A container that can hold target objects.
+    target_object = 1  # A target object that must be transported to the goal zone.
+    furniture = 2  # Furniture and props added by the floorplan layout.
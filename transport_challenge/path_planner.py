@@ -0,0 +1,348 @@
+from heapq import heappush, heappop
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Optional
+import numpy as np
+from magnebot.constants import OCCUPANCY_CELL_SIZE, MAGNEBOT_RADIUS
+
+
+class PathPlanner:
+    """
+    Plan paths for the Magnebot on the occupancy map of a scene and layout.
+
+    Only free and navigable cells (`0` in the occupancy map) are traversable. The occupancy map cell size is slightly larger than the Magnebot's diameter, so the Magnebot fits in any free cell; set `clearance` to inflate the obstacles further. Diagonal steps can't cut the corners of blocked cells.
+
+    Paths are found with A* and then smoothed by removing every waypoint that can be skipped without the Magnebot's footprint crossing a blocked cell.
+
+    Geodesic distance fields (the path distance from every cell to a goal cell) are cached. If there is a distance field for the goal, the path is found by descending the field instead of searching, which is nearly instant. Call `precompute()` to build the distance fields of positions that will be used often, for example the spawn position of each room.
+
+    The planner of each scene and layout is cached in `SCENE_CACHE` (see `SceneAssets.get_path_planner()`).
+
+    ```python
+    from transport_challenge import Transport
+
+    m = Transport()
+    m.init_scene(scene="2a", layout=1)
+    for waypoint in m.get_path(target=m.target_objects[0]):
+        m.move_to(target=waypoint)
+    ```
+    """
+
+    # The offsets of the neighbors of a cell and the cost of each step.
+    _NEIGHBORS: List[Tuple[int, int, float]] = [(-1, 0, 1.0), (1, 0, 1.0), (0, -1, 1.0), (0, 1, 1.0),
+                                                (-1, -1, float(np.sqrt(2))), (-1, 1, float(np.sqrt(2))),
+                                                (1, -1, float(np.sqrt(2))), (1, 1, float(np.sqrt(2)))]
+
+    # The number of cells checked at a time when smoothing a path.
+    _SMOOTH_BATCH_SIZE: int = 8
+
+    def __init__(self, occupancy_map: np.array, scene_bounds: Dict[str, float], clearance: float = 0,
+                 max_distance_fields: int = 32):
+        """
+        :param occupancy_map: The occupancy map of the scene and layout.
+        :param scene_bounds: The scene bounds.
+        :param clearance: Extra distance in meters between the Magnebot's footprint and any blocked cell. Blocked cells are inflated by this distance.
+        :param max_distance_fields: The maximum number of cached distance fields. When the cache is full, the least-recently-used distance field is discarded.
+        """
+
+        """:field
+        The maximum number of cached distance fields.
+        """
+        self.max_distance_fields: int = max_distance_fields
+        self._origin: np.array = np.array([scene_bounds["x_min"], scene_bounds["z_min"]])
+        navigable = np.asarray(occupancy_map) == 0
+        # Inflate the blocked cells.
+        inflation = int(np.ceil((MAGNEBOT_RADIUS + clearance) / OCCUPANCY_CELL_SIZE - 0.5))
+        if inflation > 0:
+            blocked = ~navigable
+            inflated = np.copy(blocked)
+            w, h = blocked.shape
+            for di in range(-inflation, inflation + 1):
+                for dj in range(-inflation, inflation + 1):
+                    if di * di + dj * dj > inflation * inflation:
+                        continue
+                    inflated[max(di, 0):w + min(di, 0), max(dj, 0):h + min(dj, 0)] |= \
+                        blocked[max(-di, 0):w + min(-di, 0), max(-dj, 0):h + min(-dj, 0)]
+            navigable = ~inflated
+        """:field
+        A read-only boolean array of the navigable cells, after inflation.
+        """
+        self.navigable: np.array = navigable
+        self.navigable.flags.writeable = False
+        self._width: int = navigable.shape[0]
+        self._height: int = navigable.shape[1]
+        # The navigable cells as a flat list. This is faster to index than a numpy array in the search loops.
+        self._navigable_flat: List[bool] = navigable.flatten().tolist()
+        # The `(i, j)` coordinates of every navigable cell.
+        self._navigable_cells: np.array = np.argwhere(navigable)
+        # The Magnebot's radius in cells. This is used to check whether a straight line is clear.
+        self._footprint: float = min(MAGNEBOT_RADIUS / OCCUPANCY_CELL_SIZE, 0.49)
+        # Cached distance fields. Key = The flat index of the goal cell. Value = A flat list of distances.
+        self._distance_fields: OrderedDict = OrderedDict()
+
+    def get_cell(self, position: np.array) -> Optional[Tuple[int, int]]:
+        """
+        :param position: A worldspace position as an `(x, y, z)` numpy array.
+
+        :return: The nearest navigable `(i, j)` occupancy map cell, or None if there are no navigable cells.
+        """
+
+        if len(self._navigable_cells) == 0:
+            return None
+        cell = np.rint((np.array([position[0], position[2]]) - self._origin) / OCCUPANCY_CELL_SIZE).astype(int)
+        if 0 <= cell[0] < self._width and 0 <= cell[1] < self._height and self.navigable[cell[0], cell[1]]:
+            return int(cell[0]), int(cell[1])
+        # Snap to the nearest navigable cell.
+        nearest = self._navigable_cells[np.argmin(np.sum((self._navigable_cells - cell) ** 2, axis=1))]
+        return int(nearest[0]), int(nearest[1])
+
+    def get_position(self, cell: Tuple[int, int]) -> np.array:
+        """
+        :param cell: An `(i, j)` occupancy map cell.
+
+        :return: The worldspace position of the center of the cell as an `(x, y, z)` numpy array.
+        """
+
+        x, z = self._origin + np.array(cell) * OCCUPANCY_CELL_SIZE
+        return np.array([x, 0, z])
+
+    def get_path(self, origin: np.array, destination: np.array) -> np.array:
+        """
+        :param origin: The start position as an `(x, y, z)` numpy array.
+        :param destination: The destination as an `(x, y, z)` numpy array.
+
+        :return: A smoothed path from `origin` to `destination` as an `(n, 3)` numpy array of waypoints. The path doesn't include `origin`; the last waypoint is `destination`. If there is no path, the array is empty.
+        """
+
+        start = self.get_cell(origin)
+        goal = self.get_cell(destination)
+        if start is None or goal is None:
+            return np.zeros((0, 3))
+        goal_index = goal[0] * self._height + goal[1]
+        if goal_index in self._distance_fields:
+            self._distance_fields.move_to_end(goal_index)
+            cells = self._descend(start=start, field=self._distance_fields[goal_index])
+        else:
+            cells = self._a_star(start=start, goal=goal)
+        if cells is None:
+            return np.zeros((0, 3))
+        waypoints = [self.get_position(cell) for cell in self._smooth(cells)[1:]]
+        # End exactly at the destination.
+        if len(waypoints) == 0:
+            waypoints.append(np.array([destination[0], 0, destination[2]], dtype=float))
+        else:
+            waypoints[-1] = np.array([destination[0], 0, destination[2]], dtype=float)
+        return np.array(waypoints)
+
+    def get_distance_field(self, destination: np.array) -> np.array:
+        """
+        :param destination: The destination as an `(x, y, z)` numpy array.
+
+        :return: The geodesic distance in meters from every cell to the destination as a 2D numpy array in the same shape as the occupancy map. Unreachable cells are `inf`. The distance field is cached.
+        """
+
+        goal = self.get_cell(destination)
+        if goal is None:
+            return np.full((self._width, self._height), np.inf)
+        field = self._get_distance_field(goal=goal)
+        return np.array(field).reshape(self._width, self._height) * OCCUPANCY_CELL_SIZE
+
+    def get_distances(self, origins: np.array, destinations: np.array) -> np.array:
+        """
+        Get the geodesic distance from each origin to each destination. This uses the distance field of each destination; only the distance fields of the destinations are built and cached.
+
+        :param origins: The origins as an `(m, 3)` numpy array.
+        :param destinations: The destinations as an `(n, 3)` numpy array.
+
+        :return: An `(m, n)` numpy array of distances in meters. Unreachable destinations are `inf`.
+        """
+
+        distances = np.full((len(origins), len(destinations)), np.inf)
+        origin_indices = list()
+        for origin in origins:
+            cell = self.get_cell(origin)
+            origin_indices.append(None if cell is None else cell[0] * self._height + cell[1])
+        for j, destination in enumerate(destinations):
+            goal = self.get_cell(destination)
+            if goal is None:
+                continue
+            field = self._get_distance_field(goal=goal)
+            for i, origin_index in enumerate(origin_indices):
+                if origin_index is not None:
+                    distances[i, j] = field[origin_index]
+        return distances * OCCUPANCY_CELL_SIZE
+
+    def precompute(self, destinations: np.array) -> None:
+        """
+        Build and cache the distance fields of destinations.
+
+        :param destinations: The destinations as an `(n, 3)` numpy array.
+        """
+
+        for destination in destinations:
+            goal = self.get_cell(destination)
+            if goal is not None:
+                self._get_distance_field(goal=goal)
+
+    def _get_distance_field(self, goal: Tuple[int, int]) -> List[float]:
+        """
+        :param goal: The goal cell.
+
+        :return: The cached distance field of the goal cell as a flat list of distances in cells. If the distance field isn't cached, build it with Dijkstra's algorithm.
+        """
+
+        goal_index = goal[0] * self._height + goal[1]
+        if goal_index in self._distance_fields:
+            self._distance_fields.move_to_end(goal_index)
+            return self._distance_fields[goal_index]
+        field = [np.inf] * (self._width * self._height)
+        field[goal_index] = 0.0
+        queue = [(0.0, goal[0], goal[1])]
+        while len(queue) > 0:
+            d, i, j = heappop(queue)
+            if d > field[i * self._height + j]:
+                continue
+            for ni, nj, cost in self._get_neighbors(i, j):
+                n_index = ni * self._height + nj
+                nd = d + cost
+                if nd < field[n_index]:
+                    field[n_index] = nd
+                    heappush(queue, (nd, ni, nj))
+        self._distance_fields[goal_index] = field
+        # Evict the least-recently-used distance field.
+        while len(self._distance_fields) > self.max_distance_fields:
+            self._distance_fields.popitem(last=False)
+        return field
+
+    def _descend(self, start: Tuple[int, int], field: List[float]) -> Optional[List[Tuple[int, int]]]:
+        """
+        :param start: The start cell.
+        :param field: A distance field.
+
+        :return: The cells of the shortest path from the start cell to the goal cell of the distance field, or None if there is no path.
+        """
+
+        i, j = start
+        d = field[i * self._height + j]
+        if d == np.inf:
+            return None
+        cells = [start]
+        while d > 0:
+            # Step to the neighbor that is on a shortest path.
+            best = None
+            best_d = d
+            for ni, nj, cost in self._get_neighbors(i, j):
+                nd = field[ni * self._height + nj] + cost
+                if nd <= best_d + 1e-6 and (best is None or nd < best[2]):
+                    best = (ni, nj, nd)
+            if best is None:
+                return None
+            i, j = best[0], best[1]
+            d = field[i * self._height + j]
+            cells.append((i, j))
+        return cells
+
+    def _a_star(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Optional[List[Tuple[int, int]]]:
+        """
+        :param start: The start cell.
+        :param goal: The goal cell.
+
+        :return: The cells of the shortest path from the start cell to the goal cell, or None if there is no path.
+        """
+
+        sqrt_2_minus_2 = np.sqrt(2) - 2
+        gi, gj = goal
+        g: Dict[Tuple[int, int], float] = {start: 0.0}
+        parents: Dict[Tuple[int, int], Tuple[int, int]] = dict()
+        queue = [(0.0, 0.0, start)]
+        closed = set()
+        while len(queue) > 0:
+            f, d, cell = heappop(queue)
+            if cell == goal:
+                cells = [cell]
+                while cell in parents:
+                    cell = parents[cell]
+                    cells.append(cell)
+                return cells[::-1]
+            if cell in closed:
+                continue
+            closed.add(cell)
+            for ni, nj, cost in self._get_neighbors(cell[0], cell[1]):
+                neighbor = (ni, nj)
+                nd = d + cost
+                if neighbor in closed or nd >= g.get(neighbor, np.inf):
+                    continue
+                g[neighbor] = nd
+                parents[neighbor] = cell
+                # Octile distance heuristic.
+                di = abs(ni - gi)
+                dj = abs(nj - gj)
+                h = di + dj + sqrt_2_minus_2 * min(di, dj)
+                heappush(queue, (nd + h, nd, neighbor))
+        return None
+
+    def _get_neighbors(self, i: int, j: int) -> List[Tuple[int, int, float]]:
+        """
+        :param i: The i coordinate of the cell.
+        :param j: The j coordinate of the cell.
+
+        :return: Tuples of the navigable neighbors of the cell: i, j, the cost of the step. Diagonal steps that cut the corner of a blocked cell are excluded.
+        """
+
+        neighbors = list()
+        for di, dj, cost in PathPlanner._NEIGHBORS:
+            ni = i + di
+            nj = j + dj
+            if ni < 0 or nj < 0 or ni >= self._width or nj >= self._height or \
+                    not self._navigable_flat[ni * self._height + nj]:
+                continue
+            if di != 0 and dj != 0 and (not self._navigable_flat[ni * self._height + j] or
+                                        not self._navigable_flat[i * self._height + nj]):
+                continue
+            neighbors.append((ni, nj, cost))
+        return neighbors
+
+    def _smooth(self, cells: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """
+        :param cells: The cells of a path.
+
+        :return: The cells of the path without any cells that can be skipped in a straight line.
+        """
+
+        path = np.array(cells, dtype=float)
+        smoothed = [cells[0]]
+        anchor = 0
+        while anchor < len(cells) - 1:
+            # Find the first cell that can't be reached in a straight line from the anchor.
+            # Check the cells in small batches because the first blocked cell is usually close to the anchor.
+            end = anchor + 1
+            while end < len(cells):
+                batch = path[end:end + PathPlanner._SMOOTH_BATCH_SIZE]
+                blocked = np.flatnonzero(~self._get_clear(origin=path[anchor], destinations=batch))
+                if len(blocked) > 0:
+                    end += int(blocked[0])
+                    break
+                end += len(batch)
+            # Adjacent cells are always clear, so `end - 1` is always after the anchor.
+            anchor = end - 1
+            smoothed.append(cells[anchor])
+        return smoothed
+
+    def _get_clear(self, origin: np.array, destinations: np.array) -> np.array:
+        """
+        :param origin: The `(i, j)` coordinates of a cell.
+        :param destinations: The `(i, j)` coordinates of other cells as an `(n, 2)` numpy array.
+
+        :return: A boolean array. True if the Magnebot's footprint doesn't cross any blocked cells along a straight line from the origin to each destination.
+        """
+
+        num_samples = int(np.ceil(np.max(np.abs(destinations - origin)) * 4)) + 1
+        # Shape: (destinations, samples, 2)
+        samples = origin + (destinations - origin)[:, np.newaxis, :] * \
+            np.linspace(0, 1, num_samples)[np.newaxis, :, np.newaxis]
+        # Check the corners of the footprint at each sample. Shape: (destinations, samples * corners, 2)
+        corners = np.array([[-1, -1], [-1, 1], [1, -1], [1, 1]]) * self._footprint
+        points = np.rint(samples[:, :, np.newaxis, :] + corners).reshape(len(destinations), -1, 2).astype(int)
+        in_bounds = (points[:, :, 0] >= 0) & (points[:, :, 0] < self._width) & \
+                    (points[:, :, 1] >= 0) & (points[:, :, 1] < self._height)
+        points[~in_bounds] = 0
+        return np.all(in_bounds & self.navigable[points[:, :, 0], points[:, :, 1]], axis=1)
@@ -1,12 +1,11 @@
 from pathlib import Path
-from pkg_resources import resource_filename
 
 """
 Paths to data files in this Python module.
 """
 
 # The path to the data files.
-DATA_DIRECTORY = Path(resource_filename(__name__, "data"))
+DATA_DIRECTORY = Path(__file__).resolve().parent.joinpath("data")
 # The path to object data.
 OBJECT_DATA_DIRECTORY = DATA_DIRECTORY.joinpath("objects")
 # The path to the list of target objects.
@@ -0,0 +1,149 @@
+from typing import Dict, Tuple
+import numpy as np
+from magnebot.constants import OCCUPANCY_CELL_SIZE
+
+
+class FreeCells:
+    """
+    Free (unoccupied) cells of an occupancy map, grouped by room.
+
+    All of the cells are stored in a single `(n, 2)` array sorted by room; `get_room_cells(room)` returns a view of that array.
+    """
+
+    def __init__(self, room_map: np.array, occupancy_map: np.array):
+        """
+        :param room_map: The room map of the scene. Each element is a room index.
+        :param occupancy_map: The occupancy map of the scene and layout. Free cells have a value of 0.
+        """
+
+        room_map = np.asarray(room_map)
+        """:field
+        A sorted array of the indices of every room in the scene, including rooms without any free cells.
+        """
+        self.rooms: np.array = np.unique(room_map)
+        # Get the (i, j) coordinates of each free cell, in the same order as `np.ndindex`.
+        free = np.argwhere(np.asarray(occupancy_map) == 0)
+        free_rooms = room_map[free[:, 0], free[:, 1]]
+        # Group the cells by room. The sort is stable so cells stay in `np.ndindex` order within each room.
+        order = np.argsort(free_rooms, kind="stable")
+        """:field
+        The `(i, j)` occupancy map coordinates of every free cell, sorted by room.
+        """
+        self.cells: np.array = free[order]
+        self.cells.flags.writeable = False
+        counts = np.bincount(np.searchsorted(self.rooms, free_rooms), minlength=len(self.rooms))
+        # The start and end index in `self.cells` of each room's cells.
+        self._offsets: np.array = np.zeros(len(self.rooms) + 1, dtype=int)
+        np.cumsum(counts, out=self._offsets[1:])
+        # Key = The room index. Value = The index of the room in `self.rooms`.
+        self._room_indices: Dict[int, int] = {int(r): i for i, r in enumerate(self.rooms)}
+
+    def get_room_cells(self, room: int) -> np.array:
+        """
+        :param room: The room index.
+
+        :return: A read-only `(n, 2)` view of the free cells in the room.
+        """
+
+        i = self._room_indices[int(room)]
+        return self.cells[self._offsets[i]:self._offsets[i + 1]]
+
+    def get_num_cells(self) -> np.array:
+        """
+        :return: The number of free cells in each room, in the same order as `self.rooms`.
+        """
+
+        return np.diff(self._offsets)
+
+
+class Placement:
+    """
+    Occupancy map cells for the target objects and containers of an episode. See: `get_placement()`.
+    """
+
+    def __init__(self, target_room: int, target_cells: np.array, container_rooms: np.array,
+                 container_cells: np.array):
+        """
+        :param target_room: The room that the target objects are in.
+        :param target_cells: The `(i, j)` occupancy map coordinates of each target object.
+        :param container_rooms: The room of each container.
+        :param container_cells: The `(i, j)` occupancy map coordinates of each container.
+        """
+
+        """:field
+        The room that the target objects are in.
+        """
+        self.target_room: int = target_room
+        """:field
+        The `(i, j)` occupancy map coordinates of each target object as an `(n, 2)` numpy array.
+        """
+        self.target_cells: np.array = target_cells
+        """:field
+        The room of each container.
+        """
+        self.container_rooms: np.array = container_rooms
+        """:field
+        The `(i, j)` occupancy map coordinates of each container as an `(n, 2)` numpy array.
+        """
+        self.container_cells: np.array = container_cells
+
+
+def get_placement(free_cells: FreeCells, rng: np.random.RandomState,
+                  num_target_objects: Tuple[int, int] = (8, 12), container_probability: float = 0.75) -> Placement:
+    """
+    Choose cells for target objects and containers. No two objects will share the same cell.
+
+    The target objects are placed in a random room that has at least one free cell. Cells are drawn without replacement in a single RNG call. Then, there is a `container_probability` chance of adding one container per room.
+
+    :param free_cells: The free cells of the scene and layout.
+    :param rng: The random number generator.
+    :param num_target_objects: The range of the number of target objects: `[min, max)`.
+    :param container_probability: The probability of adding a container to each room.
+
+    :return: The `Placement`.
+    """
+
+    # Choose a random room. Rooms without free cells can't have target objects.
+    rooms_with_cells = free_cells.rooms[free_cells.get_num_cells() > 0]
+    assert len(rooms_with_cells) > 0, "There are no free cells in the occupancy map."
+    target_room = int(rng.choice(rooms_with_cells))
+    target_room_cells = free_cells.get_room_cells(target_room)
+    num = min(rng.randint(num_target_objects[0], num_target_objects[1]), len(target_room_cells))
+    # Draw each target object cell without replacement.
+    target_indices = rng.choice(len(target_room_cells), size=num, replace=False)
+    target_cells = target_room_cells[target_indices]
+
+    # Decide which rooms get a container.
+    num_cells = free_cells.get_num_cells().copy()
+    target_room_index = int(np.searchsorted(free_cells.rooms, target_room))
+    # Exclude the target object cells from the target room.
+    num_cells[target_room_index] -= num
+    add_container = (rng.random_sample(len(free_cells.rooms)) < container_probability) & (num_cells > 0)
+    container_room_indices = np.flatnonzero(add_container)
+    # Draw one cell per container room in a single RNG call.
+    cell_indices = (rng.random_sample(len(container_room_indices)) *
+                    num_cells[container_room_indices]).astype(int)
+    container_cells = np.zeros((len(container_room_indices), 2), dtype=free_cells.cells.dtype)
+    for i, (room_index, cell_index) in enumerate(zip(container_room_indices, cell_indices)):
+        room_cells = free_cells.get_room_cells(free_cells.rooms[room_index])
+        # Skip over cells that are used by target objects.
+        if room_index == target_room_index:
+            room_cells = np.delete(room_cells, target_indices, axis=0)
+        container_cells[i] = room_cells[cell_index]
+    return Placement(target_room=target_room,
+                     target_cells=target_cells,
+                     container_rooms=free_cells.rooms[container_room_indices],
+                     container_cells=container_cells)
+
+
+def get_occupancy_positions(cells: np.array, scene_bounds: Dict[str, float]) -> np.array:
+    """
+    Convert occupancy map cells to worldspace coordinates. This is a vectorized version of `Magnebot.get_occupancy_position()`.
+
+    :param cells: The `(i, j)` occupancy map coordinates as an `(n, 2)` numpy array.
+    :param scene_bounds: The scene bounds.
+
+    :return: The `(x, z)` worldspace coordinates as an `(n, 2)` numpy array.
+    """
+
+    return np.array([scene_bounds["x_min"], scene_bounds["z_min"]]) + np.asarray(cells) * OCCUPANCY_CELL_SIZE
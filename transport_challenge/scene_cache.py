@@ -0,0 +1,179 @@
+from json import loads
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, Tuple, Optional, List
+from pkg_resources import resource_filename
+import numpy as np
+from magnebot.paths import ROOM_MAPS_DIRECTORY, OCCUPANCY_MAPS_DIRECTORY, SCENE_BOUNDS_PATH, SPAWN_POSITIONS_PATH
+from transport_challenge.placement import FreeCells
+from transport_challenge.path_planner import PathPlanner
+
+
+# The path to TDW's furniture layouts file. See: `FloorplanController.get_scene_init_commands()`.
+_FLOORPLAN_LAYOUTS_PATH: Path = Path(resource_filename("tdw", "floorplan_layouts.json"))
+
+
+class SceneAssets:
+    """
+    Static data for a scene and layout: the room map, the occupancy map, spawn positions, scene bounds, and furniture.
+
+    The room map and the occupancy map are read-only memory-mapped numpy arrays. Don't modify them.
+    """
+
+    def __init__(self, scene: str, layout: int, spawn_positions: Dict[str, Dict[str, float]],
+                 scene_bounds: Dict[str, float], furniture: List[dict]):
+        """
+        :param scene: The name of the scene, for example `"2a"`. Only the first character (the floorplan) is used.
+        :param layout: The furniture layout index.
+        :param spawn_positions: The spawn positions of each room for this scene and layout. Key = The room index as a string.
+        :param scene_bounds: The scene bounds of this scene.
+        :param furniture: The furniture of this scene and layout.
+        """
+
+        """:field
+        The floorplan, for example `"2"`.
+        """
+        self.scene: str = scene[0]
+        """:field
+        The furniture layout index.
+        """
+        self.layout: int = int(layout)
+        """:field
+        A read-only map of the rooms in the scene. Each element is a room index.
+        """
+        self.room_map: np.array = np.load(str(ROOM_MAPS_DIRECTORY.joinpath(f"{self.scene}.npy").resolve()),
+                                          mmap_mode="r")
+        """:field
+        A read-only occupancy map of this scene and layout. See: `Magnebot.occupancy_map`.
+        """
+        self.occupancy_map: np.array = np.load(str(OCCUPANCY_MAPS_DIRECTORY.joinpath(
+            f"{self.scene}_{self.layout}.npy").resolve()), mmap_mode="r")
+        """:field
+        A sorted array of the indices of each room in the scene.
+        """
+        self.rooms: np.array = np.unique(self.room_map)
+        """:field
+        The spawn position of each room. Key = The room index as a string. Value = The position as an (x, y, z) dictionary.
+        """
+        self.spawn_positions: Dict[str, Dict[str, float]] = spawn_positions
+        """:field
+        The scene bounds. This is used along with the occupancy map to get (x, z) worldspace positions.
+        """
+        self.scene_bounds: Dict[str, float] = scene_bounds
+        """:field
+        The furniture of this scene and layout. Each element is a dictionary of `AudioInitData` parameters, as in TDW's `floorplan_layouts.json`. Don't modify this.
+        """
+        self.furniture: List[dict] = furniture
+        # The free cells of the occupancy map grouped by room. This is set lazily; see `get_free_cells()`.
+        self._free_cells: Optional[FreeCells] = None
+        # The path planner. This is set lazily; see `get_path_planner()`.
+        self._path_planner: Optional[PathPlanner] = None
+
+    def get_free_cells(self) -> FreeCells:
+        """
+        :return: The free cells of the occupancy map grouped by room. This is calculated only once per scene and layout.
+        """
+
+        if self._free_cells is None:
+            self._free_cells = FreeCells(room_map=self.room_map, occupancy_map=self.occupancy_map)
+        return self._free_cells
+
+    def get_path_planner(self) -> PathPlanner:
+        """
+        :return: The path planner of this scene and layout. This is created only once per scene and layout. The distance fields to the spawn position of each room (which is also the goal position if the room is the goal room) are built when the planner is created.
+        """
+
+        if self._path_planner is None:
+            self._path_planner = PathPlanner(occupancy_map=self.occupancy_map, scene_bounds=self.scene_bounds)
+            self._path_planner.precompute(destinations=np.array([[p["x"], p["y"], p["z"]] for p in
+                                                                 self.spawn_positions.values()]))
+        return self._path_planner
+
+
+class SceneCache:
+    """
+    A process-wide least-recently-used cache of `SceneAssets`. Key = (floorplan, layout).
+
+    The spawn positions, scene bounds, and furniture layouts files are parsed only once per process.
+
+    ```python
+    from transport_challenge.scene_cache import SCENE_CACHE
+
+    assets = SCENE_CACHE.get(scene="2a", layout=1)
+    print(assets.rooms)
+    ```
+    """
+
+    def __init__(self, max_size: int = 16):
+        """
+        :param max_size: The maximum number of scene+layout combinations in the cache. When the cache is full, the least-recently-used entry is evicted.
+        """
+
+        """:field
+        The maximum number of scene+layout combinations in the cache.
+        """
+        self.max_size: int = max_size
+        """:field
+        The number of times `get()` returned a cached entry.
+        """
+        self.hits: int = 0
+        """:field
+        The number of times `get()` had to load an entry from disk.
+        """
+        self.misses: int = 0
+        self._assets: OrderedDict = OrderedDict()
+        # The parsed spawn positions file. This is loaded lazily.
+        self._spawn_positions: Optional[dict] = None
+        # The parsed scene bounds file. This is loaded lazily.
+        self._scene_bounds: Optional[dict] = None
+        # The parsed furniture layouts file. This is loaded lazily.
+        self._floorplans: Optional[dict] = None
+
+    def get(self, scene: str, layout: int) -> SceneAssets:
+        """
+        :param scene: The name of the scene, for example `"2a"`.
+        :param layout: The furniture layout index.
+
+        :return: The `SceneAssets` for this scene and layout.
+        """
+
+        key: Tuple[str, int] = (scene[0], int(layout))
+        if key in self._assets:
+            self.hits += 1
+            self._assets.move_to_end(key)
+            return self._assets[key]
+        self.misses += 1
+        if self._spawn_positions is None:
+            self._spawn_positions = loads(SPAWN_POSITIONS_PATH.read_text())
+        if self._scene_bounds is None:
+            self._scene_bounds = loads(SCENE_BOUNDS_PATH.read_text())
+        if self._floorplans is None:
+            self._floorplans = loads(_FLOORPLAN_LAYOUTS_PATH.read_text(encoding="utf-8"))
+        assets = SceneAssets(scene=scene, layout=layout,
+                             spawn_positions=self._spawn_positions[key[0]][str(key[1])],
+                             scene_bounds=self._scene_bounds[key[0]],
+                             furniture=self._floorplans[key[0]][str(key[1])])
+        self._assets[key] = assets
+        # Evict the least-recently-used entry.
+        while len(self._assets) > self.max_size:
+            self._assets.popitem(last=False)
+        return assets
+
+    def clear(self) -> None:
+        """
+        Remove all entries from the cache and reset the hit and miss counters.
+        """
+
+        self._assets.clear()
+        self._spawn_positions = None
+        self._scene_bounds = None
+        self._floorplans = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._assets)
+
+
+# The process-wide scene cache.
+SCENE_CACHE = SceneCache()
@@ -0,0 +1,203 @@
+from typing import Optional
+import numpy as np
+from magnebot.constants import OCCUPANCY_CELL_SIZE
+
+
+class SpatialIndex:
+    """
+    A uniform grid of object positions on the `(x, z)` plane for nearest-neighbor queries. By default, the grid cells are the same size as the occupancy map cells.
+
+    Objects are bucketed by cell. Updating the positions is vectorized, and the buckets are rebuilt only if an object moved to another cell. A query searches rings of cells outwards from the query position and stops as soon as no unsearched cell can contain a closer object. If the objects are sparse, the query checks every object instead.
+
+    ```python
+    import numpy as np
+    from transport_challenge.spatial_index import SpatialIndex
+
+    index = SpatialIndex()
+    index.set_objects(object_ids=np.array([1, 2, 3]), positions=np.array([[0, 0, 0], [1, 0, 1], [5, 0, 2]]))
+    print(index.nearest(position=np.array([0.8, 0, 0.8]), k=2))  # [2 1]
+    ```
+    """
+
+    # Cell coordinates are packed into a single integer key: `(i + _OFFSET) * _STRIDE + (j + _OFFSET)`.
+    _OFFSET: int = 2 ** 20
+    _STRIDE: int = 2 ** 21
+
+    def __init__(self, cell_size: float = OCCUPANCY_CELL_SIZE, origin: np.array = None):
+        """
+        :param cell_size: The width and length of each grid cell in meters.
+        :param origin: The `(x, z)` worldspace position of the center of cell `(0, 0)`. If None, this is `(0, 0)`. To align the grid with the occupancy map, set this to `(scene_bounds["x_min"], scene_bounds["z_min"])`.
+        """
+
+        """:field
+        The width and length of each grid cell in meters.
+        """
+        self.cell_size: float = cell_size
+        self._origin: np.array = np.zeros(2) if origin is None else np.asarray(origin, dtype=float)
+        # The object IDs.
+        self._ids: np.array = np.zeros(0, dtype=int)
+        # The `(x, z)` position of each object as an `(n, 2)` numpy array.
+        self._positions: np.array = np.zeros((0, 2))
+        # The cell key of each object.
+        self._keys: np.array = np.zeros(0, dtype=np.int64)
+        # The sorted unique cell keys.
+        self._cell_keys: np.array = np.zeros(0, dtype=np.int64)
+        # The start of each cell's bucket in `self._order`. The last element is the number of objects.
+        self._cell_starts: np.array = np.zeros(1, dtype=int)
+        # The rows of the objects, sorted by cell.
+        self._order: np.array = np.zeros(0, dtype=int)
+        # The minimum and maximum `(i, j)` cell coordinates of any object.
+        self._cell_min: np.array = np.zeros(2, dtype=int)
+        self._cell_max: np.array = np.zeros(2, dtype=int)
+
+    def set_objects(self, object_ids: np.array, positions: np.array, origin: np.array = None) -> None:
+        """
+        Replace every object in the index.
+
+        :param object_ids: The object IDs.
+        :param positions: The position of each object as an `(n, 3)` or `(n, 2)` numpy array. If the array is `(n, 3)`, the y values are ignored.
+        :param origin: If not None, set the `(x, z)` worldspace position of the center of cell `(0, 0)`.
+        """
+
+        if origin is not None:
+            self._origin = np.asarray(origin, dtype=float)
+        self._ids = np.array(object_ids, dtype=int).reshape(-1)
+        self._positions = np.zeros((len(self._ids), 2))
+        self._keys = np.full(len(self._ids), -1, dtype=np.int64)
+        self.update(positions=positions)
+
+    def update(self, positions: np.array) -> int:
+        """
+        Update the position of every object.
+
+        :param positions: The position of each object in the same order as the object IDs as an `(n, 3)` or `(n, 2)` numpy array. If the array is `(n, 3)`, the y values are ignored.
+
+        :return: The number of objects that moved to a different cell.
+        """
+
+        positions = SpatialIndex._get_xz(positions)
+        self._positions[:] = positions
+        keys = self._get_keys(self._get_cells(positions))
+        moved = keys != self._keys
+        num_moved = int(np.count_nonzero(moved))
+        if num_moved > 0:
+            self._keys = keys
+            self._rebuild()
+        return num_moved
+
+    def nearest(self, position: np.array, k: int = 1, exclude: np.array = None) -> np.array:
+        """
+        :param position: The query position as an `(x, y, z)` or `(x, z)` numpy array. The y value is ignored.
+        :param k: The maximum number of objects.
+        :param exclude: If not None, ignore these object IDs.
+
+        :return: The IDs of the `k` objects nearest to `position` on the `(x, z)` plane, sorted by distance.
+        """
+
+        position = SpatialIndex._get_xz(np.asarray(position, dtype=float).reshape(1, -1))[0]
+        if k <= 0 or len(self._ids) == 0:
+            return np.zeros(0, dtype=int)
+        excluded: Optional[np.array] = None
+        if exclude is not None and len(exclude) > 0:
+            excluded = np.isin(self._ids, exclude)
+        cell = self._get_cells(position.reshape(1, 2))[0]
+        # Beyond this ring, there are no objects.
+        max_ring = int(np.max(np.maximum(np.abs(self._cell_min - cell), np.abs(self._cell_max - cell))))
+        rows = list()
+        ring = 0
+        while ring <= max_ring:
+            # There are more cells in this ring than objects. It's faster to check every object.
+            if 8 * ring > len(self._ids):
+                rows = [np.arange(len(self._ids)) if excluded is None else np.flatnonzero(~excluded)]
+                break
+            ring_rows = self._get_ring_rows(cell=cell, ring=ring)
+            if excluded is not None and len(ring_rows) > 0:
+                ring_rows = ring_rows[~excluded[ring_rows]]
+            rows.append(ring_rows)
+            num_rows = sum([len(r) for r in rows])
+            if num_rows >= k:
+                candidates = np.concatenate(rows)
+                distances = np.sum((self._positions[candidates] - position) ** 2, axis=1)
+                kth = np.partition(distances, k - 1)[k - 1]
+                # Any object in an unsearched ring is at least this far away.
+                if kth <= (ring * self.cell_size) ** 2:
+                    break
+            ring += 1
+        candidates = np.concatenate(rows) if len(rows) > 0 else np.zeros(0, dtype=int)
+        distances = np.sum((self._positions[candidates] - position) ** 2, axis=1)
+        # Break ties by the order in which the objects were added.
+        nearest = candidates[np.lexsort((candidates, distances))][:k]
+        return self._ids[nearest]
+
+    def _get_ring_rows(self, cell: np.array, ring: int) -> np.array:
+        """
+        :param cell: The `(i, j)` coordinates of the center cell.
+        :param ring: The Chebyshev distance from the center cell.
+
+        :return: The rows of every object in the cells of the ring.
+        """
+
+        if ring == 0:
+            offsets = np.zeros((1, 2), dtype=int)
+        else:
+            r = np.arange(-ring, ring + 1)
+            inner = r[1:-1]
+            offsets = np.concatenate([np.stack([np.full(len(r), -ring), r], axis=1),
+                                      np.stack([np.full(len(r), ring), r], axis=1),
+                                      np.stack([inner, np.full(len(inner), -ring)], axis=1),
+                                      np.stack([inner, np.full(len(inner), ring)], axis=1)])
+        keys = self._get_keys(cell + offsets)
+        indices = np.searchsorted(self._cell_keys, keys)
+        valid = indices < len(self._cell_keys)
+        indices = indices[valid]
+        # Ignore empty cells.
+        indices = indices[self._cell_keys[indices] == keys[valid]]
+        if len(indices) == 0:
+            return np.zeros(0, dtype=int)
+        return np.concatenate([self._order[self._cell_starts[i]:self._cell_starts[i + 1]] for i in indices])
+
+    def _rebuild(self) -> None:
+        """
+        Rebuild the buckets of each cell.
+        """
+
+        self._order = np.argsort(self._keys, kind="stable")
+        self._cell_keys, counts = np.unique(self._keys[self._order], return_counts=True)
+        self._cell_starts = np.concatenate([[0], np.cumsum(counts)])
+        if len(self._keys) > 0:
+            cells = np.stack([self._keys // SpatialIndex._STRIDE, self._keys % SpatialIndex._STRIDE],
+                             axis=1) - SpatialIndex._OFFSET
+            self._cell_min = np.min(cells, axis=0)
+            self._cell_max = np.max(cells, axis=0)
+
+    def _get_cells(self, positions: np.array) -> np.array:
+        """
+        :param positions: The `(x, z)` positions as an `(n, 2)` numpy array.
+
+        :return: The `(i, j)` cell coordinates of each position as an `(n, 2)` numpy array.
+        """
+
+        return np.floor((positions - self._origin) / self.cell_size + 0.5).astype(np.int64)
+
+    @staticmethod
+    def _get_keys(cells: np.array) -> np.array:
+        """
+        :param cells: The `(i, j)` cell coordinates as an `(n, 2)` numpy array.
+
+        :return: The packed key of each cell.
+        """
+
+        return (cells[:, 0] + SpatialIndex._OFFSET) * SpatialIndex._STRIDE + (cells[:, 1] + SpatialIndex._OFFSET)
+
+    @staticmethod
+    def _get_xz(positions: np.array) -> np.array:
+        """
+        :param positions: Positions as an `(n, 3)` or `(n, 2)` numpy array.
+
+        :return: The `(x, z)` positions as an `(n, 2)` numpy array.
+        """
+
+        positions = np.asarray(positions, dtype=float)
+        if positions.ndim == 2 and positions.shape[1] == 3:
+            return positions[:, [0, 2]]
+        return positions.reshape(-1, 2)
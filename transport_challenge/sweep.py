@@ -0,0 +1,579 @@
+from json import loads, dumps
+from pathlib import Path
+from time import perf_counter
+from collections import deque
+from multiprocessing import Process, Queue
+from queue import Empty
+from argparse import ArgumentParser
+from importlib import import_module
+from subprocess import Popen
+from typing import List, Dict, Optional, Callable, Iterator, Union, Tuple, Deque
+import numpy as np
+
+
+class EpisodeSpec:
+    """
+    The parameters of a single Transport Challenge episode.
+    """
+
+    def __init__(self, scene: str, layout: int, random_seed: int, room: int = None, goal_room: int = None,
+                 episode=None):
+        """
+        :param scene: The name of the scene. See: `Transport.init_scene()`.
+        :param layout: The furniture layout. See: `Transport.init_scene()`.
+        :param random_seed: The random seed of the episode.
+        :param room: The room that the Magnebot will spawn in. If None, the room will be chosen randomly.
+        :param goal_room: The goal room. If None, the room will be chosen randomly.
+        :param episode: A pre-generated `Episode` (see `transport_challenge.episode`). If not None, the controller uses this instead of generating the episode from the random seed.
+        """
+
+        """:field
+        The name of the scene.
+        """
+        self.scene: str = scene
+        """:field
+        The furniture layout.
+        """
+        self.layout: int = layout
+        """:field
+        The random seed of the episode.
+        """
+        self.random_seed: int = random_seed
+        """:field
+        The room that the Magnebot will spawn in. If None, the room will be chosen randomly.
+        """
+        self.room: Optional[int] = room
+        """:field
+        The goal room. If None, the room will be chosen randomly.
+        """
+        self.goal_room: Optional[int] = goal_room
+        """:field
+        A pre-generated `Episode`. If not None, the controller uses this instead of generating the episode from the random seed.
+        """
+        self.episode = episode
+
+    def get_key(self) -> str:
+        """
+        :return: A string that uniquely identifies this episode.
+        """
+
+        return f"{self.scene}_{self.layout}_{self.room}_{self.goal_room}_{self.random_seed}"
+
+    def to_dict(self) -> dict:
+        """
+        :return: A JSON-serializable dictionary of this spec.
+        """
+
+        return {"scene": self.scene, "layout": self.layout, "random_seed": self.random_seed, "room": self.room,
+                "goal_room": self.goal_room}
+
+    @staticmethod
+    def from_dict(data: dict) -> "EpisodeSpec":
+        """
+        :param data: A dictionary created by `to_dict()`.
+
+        :return: An `EpisodeSpec`.
+        """
+
+        return EpisodeSpec(scene=data["scene"], layout=data["layout"], random_seed=data["random_seed"],
+                           room=data.get("room"), goal_room=data.get("goal_room"))
+
+
+class EpisodeResult:
+    """
+    The result of a single episode in a `Sweep`.
+    """
+
+    def __init__(self, spec: EpisodeSpec, success: bool = False, action_cost: int = 0, frames: int = 0,
+                 wall_time: float = 0, worker: int = -1, attempts: int = 1, error: str = None):
+        """
+        :param spec: The episode spec.
+        :param success: If True, all of the target objects were transported to the goal zone.
+        :param action_cost: The `action_cost` at the end of the episode.
+        :param frames: The number of `communicate()` calls during the episode.
+        :param wall_time: The wall time of the episode in seconds.
+        :param worker: The index of the worker that ran the episode.
+        :param attempts: The number of times that the episode was attempted.
+        :param error: If not None, the episode crashed or timed out and was skipped; this is the error message.
+        """
+
+        """:field
+        The episode spec.
+        """
+        self.spec: EpisodeSpec = spec
+        """:field
+        If True, all of the target objects were transported to the goal zone.
+        """
+        self.success: bool = success
+        """:field
+        The `action_cost` at the end of the episode.
+        """
+        self.action_cost: int = action_cost
+        """:field
+        The number of `communicate()` calls during the episode.
+        """
+        self.frames: int = frames
+        """:field
+        The wall time of the episode in seconds.
+        """
+        self.wall_time: float = wall_time
+        """:field
+        The index of the worker that ran the episode.
+        """
+        self.worker: int = worker
+        """:field
+        The number of times that the episode was attempted.
+        """
+        self.attempts: int = attempts
+        """:field
+        If not None, the episode crashed or timed out and was skipped; this is the error message.
+        """
+        self.error: Optional[str] = error
+
+    def to_dict(self) -> dict:
+        """
+        :return: A JSON-serializable dictionary of this result.
+        """
+
+        return {"spec": self.spec.to_dict(), "success": self.success, "action_cost": self.action_cost,
+                "frames": self.frames, "wall_time": self.wall_time, "worker": self.worker, "attempts": self.attempts,
+                "error": self.error}
+
+    @staticmethod
+    def from_dict(data: dict) -> "EpisodeResult":
+        """
+        :param data: A dictionary created by `to_dict()`.
+
+        :return: An `EpisodeResult`.
+        """
+
+        return EpisodeResult(spec=EpisodeSpec.from_dict(data["spec"]), success=data["success"],
+                             action_cost=data["action_cost"], frames=data["frames"], wall_time=data["wall_time"],
+                             worker=data["worker"], attempts=data["attempts"], error=data["error"])
+
+
+def run_episode(controller, spec: EpisodeSpec, policy: Callable = None, reuse_scene: bool = False) -> EpisodeResult:
+    """
+    Run a single episode: reset the random seed, call `init_scene()`, and then call `policy(controller)`.
+
+    :param controller: The controller. This is usually a `Transport` controller.
+    :param spec: The episode spec.
+    :param policy: A function that runs the actions of the episode. Parameters: The controller. If None, the episode ends after `init_scene()`.
+    :param reuse_scene: If True and the controller already loaded the spec's scene and layout, call `reset_episode()` instead of `init_scene()`. This is faster, but the scene isn't reloaded: objects that were moved or knocked over in the previous episode (for example, furniture) stay where they are, so the episode might not be the same as after `init_scene()`.
+
+    :return: An `EpisodeResult`.
+    """
+
+    frames = 0
+    communicate = controller.communicate
+
+    def __communicate(commands):
+        nonlocal frames
+        frames += 1
+        return communicate(commands)
+
+    # Count the frames of this episode.
+    controller.communicate = __communicate
+    t0 = perf_counter()
+    try:
+        controller._rng = np.random.RandomState(spec.random_seed)
+        # Only pass the pre-generated episode if there is one so that controllers without an `episode` parameter work.
+        kwargs = {"room": spec.room, "goal_room": spec.goal_room}
+        if spec.episode is not None:
+            kwargs["episode"] = spec.episode
+        if reuse_scene and getattr(controller, "_scene_key", None) == (spec.scene, int(spec.layout)):
+            controller.reset_episode(**kwargs)
+        else:
+            controller.init_scene(scene=spec.scene, layout=spec.layout, **kwargs)
+        if policy is not None:
+            policy(controller)
+    finally:
+        del controller.communicate
+    return EpisodeResult(spec=spec, success=bool(controller.done), action_cost=int(controller.action_cost),
+                         frames=frames, wall_time=perf_counter() - t0)
+
+
+def _run_worker(worker: int, port: int, controller_type: type, policy: Optional[Callable], launch_build: bool,
+                reuse_scene: bool, tasks: Queue, results: Queue) -> None:
+    """
+    Run episodes in a worker process until the worker receives None. The worker exits after an episode crashes.
+
+    :param worker: The index of the worker.
+    :param port: The socket port of this worker's build.
+    :param controller_type: The type of controller.
+    :param policy: The policy function. Can be None.
+    :param launch_build: If True, the controller will launch its own build.
+    :param reuse_scene: If True, call `reset_episode()` instead of `init_scene()` if the controller already loaded the spec's scene and layout.
+    :param tasks: The queue of incoming `EpisodeSpec` objects.
+    :param results: The queue of outgoing `(worker, EpisodeResult)` tuples.
+    """
+
+    controller = None
+    while True:
+        spec: Optional[EpisodeSpec] = tasks.get()
+        if spec is None:
+            break
+        t0 = perf_counter()
+        try:
+            if controller is None:
+                controller = controller_type(port=port, launch_build=launch_build, random_seed=spec.random_seed)
+            result = run_episode(controller=controller, spec=spec, policy=policy, reuse_scene=reuse_scene)
+        except Exception as e:
+            results.put((worker, EpisodeResult(spec=spec, wall_time=perf_counter() - t0, worker=worker,
+                                               error=repr(e))))
+            return
+        result.worker = worker
+        results.put((worker, result))
+    if controller is not None:
+        controller.end()
+
+
+class _Worker:
+    """
+    Parent-side handles of a worker process.
+    """
+
+    def __init__(self, process: Process, tasks: Queue, build):
+        """
+        :param process: The worker process.
+        :param tasks: The worker's task queue.
+        :param build: The worker's build process. Can be None.
+        """
+
+        self.process: Process = process
+        self.tasks: Queue = tasks
+        self.build = build
+        # The current task and when it started.
+        self.task: Optional[Tuple[EpisodeSpec, float]] = None
+
+
+class Sweep:
+    """
+    Run many Transport Challenge episodes in parallel. Each worker process has its own controller and its own build on its own port.
+
+    Results are streamed back to the parent process as each episode ends and are appended to a JSON lines results file. If the results file already exists, episodes that already have a result are skipped, so an interrupted sweep can be resumed.
+
+    If an episode raises an exception, or if its worker doesn't respond within `episode_timeout` seconds (for example, because the build crashed), the worker and its build are restarted and the episode is retried up to `max_retries` times. After that, the episode is skipped and its result has an `error`.
+
+    ```python
+    from transport_challenge.sweep import Sweep, EpisodeSpec
+
+    specs = [EpisodeSpec(scene="2a", layout=1, random_seed=i) for i in range(100)]
+    sweep = Sweep(num_workers=4, port=1071, results_path="results.jsonl")
+    for result in sweep.run(specs):
+        print(result.spec.get_key(), result.success, result.action_cost)
+    ```
+
+    Command-line usage:
+
+    ```bash
+    python3 -m transport_challenge.sweep --scene 2a 5a --layout 0 1 --num_seeds 50 --num_workers 4 --results results.jsonl
+    ```
+    """
+
+    def __init__(self, num_workers: int = 1, port: int = 1071, controller_type: type = None, policy: Callable = None,
+                 launch_build: bool = False, build_launcher: Callable[[int], object] = None,
+                 results_path: Union[str, Path] = None, max_retries: int = 1, episode_timeout: float = 600,
+                 reuse_scene: bool = False):
+        """
+        :param num_workers: The number of worker processes. Worker `i` uses port `port + i`.
+        :param port: The socket port of the first worker.
+        :param controller_type: The type of controller. It must accept `port`, `launch_build`, and `random_seed` constructor parameters. If None, this is `Transport`.
+        :param policy: A function that runs the actions of an episode after `init_scene()`. Parameters: The controller. This must be a module-level function so that it can be sent to worker processes. If None, each episode ends after `init_scene()`.
+        :param launch_build: If True, each controller launches its own build.
+        :param build_launcher: A function that launches a build for a port and returns a process with a `terminate()` function. The parent process calls this whenever it (re)starts a worker. If None, builds are managed externally (or by `launch_build`).
+        :param results_path: The path to a JSON lines results file. If None, results aren't saved.
+        :param max_retries: The maximum number of times a crashed or timed-out episode is retried.
+        :param episode_timeout: If a worker hasn't finished an episode after this many seconds, it is restarted.
+        :param reuse_scene: If True, a worker calls `reset_episode()` instead of `init_scene()` if its controller already loaded the episode's scene and layout. This is faster, but objects that were moved in the worker's previous episode aren't reset. See `run_episode()`.
+        """
+
+        if controller_type is None:
+            from transport_challenge.transport_controller import Transport
+            controller_type = Transport
+        """:field
+        The number of worker processes.
+        """
+        self.num_workers: int = num_workers
+        """:field
+        The socket port of the first worker.
+        """
+        self.port: int = port
+        """:field
+        The path to the JSON lines results file. Can be None.
+        """
+        self.results_path: Optional[Path] = None if results_path is None else Path(results_path)
+        self._controller_type: type = controller_type
+        self._policy: Optional[Callable] = policy
+        self._launch_build: bool = launch_build
+        self._build_launcher: Optional[Callable[[int], object]] = build_launcher
+        self._max_retries: int = max_retries
+        self._episode_timeout: float = episode_timeout
+        self._reuse_scene: bool = reuse_scene
+        # The results queue shared by all workers.
+        self._results: Optional[Queue] = None
+
+    def get_completed(self) -> Dict[str, EpisodeResult]:
+        """
+        :return: Results of episodes in the results file that finished without an error. Key = The episode key.
+        """
+
+        completed: Dict[str, EpisodeResult] = dict()
+        if self.results_path is None or not self.results_path.exists():
+            return completed
+        for line in self.results_path.read_text(encoding="utf-8").split("\n"):
+            if line.strip() == "":
+                continue
+            result = EpisodeResult.from_dict(loads(line))
+            if result.error is None:
+                completed[result.spec.get_key()] = result
+        return completed
+
+    def run(self, specs: List[EpisodeSpec]) -> Iterator[EpisodeResult]:
+        """
+        Run each episode. This is a generator that yields results as they arrive.
+
+        :param specs: The episode specs.
+
+        :return: An iterator of `EpisodeResult`. Episodes that were already completed in the results file aren't yielded.
+        """
+
+        completed = self.get_completed()
+        pending: Deque[EpisodeSpec] = deque([s for s in specs if s.get_key() not in completed])
+        attempts: Dict[str, int] = dict()
+        self._results = Queue()
+        workers = [self._start_worker(i) for i in range(min(self.num_workers, max(len(pending), 1)))]
+        try:
+            while len(pending) > 0 or any(w.task is not None for w in workers):
+                # Assign episodes to idle workers.
+                for w in workers:
+                    if w.task is None and len(pending) > 0:
+                        spec = pending.popleft()
+                        attempts[spec.get_key()] = attempts.get(spec.get_key(), 0) + 1
+                        w.tasks.put(spec)
+                        w.task = (spec, perf_counter())
+                # Wait for the next result.
+                try:
+                    index, result = self._results.get(timeout=0.1)
+                except Empty:
+                    index, result = -1, None
+                # Ignore late results from workers that were restarted.
+                if result is not None and (workers[index].task is None or
+                                           workers[index].task[0].get_key() != result.spec.get_key()):
+                    result = None
+                if result is not None:
+                    workers[index].task = None
+                    result.attempts = attempts[result.spec.get_key()]
+                    if result.error is None:
+                        self._write(result)
+                        yield result
+                    else:
+                        workers[index] = self._restart_worker(workers[index], index)
+                        failed = self._fail(result=result, attempts=attempts, pending=pending)
+                        if failed is not None:
+                            yield failed
+                # Restart workers that died or timed out.
+                for i in range(len(workers)):
+                    w = workers[i]
+                    if w.task is None:
+                        continue
+                    spec, t0 = w.task
+                    if not w.process.is_alive() or perf_counter() - t0 > self._episode_timeout:
+                        error = "Worker process exited." if not w.process.is_alive() else "Episode timed out."
+                        workers[i] = self._restart_worker(w, i)
+                        failed = self._fail(result=EpisodeResult(spec=spec, wall_time=perf_counter() - t0, worker=i,
+                                                                 attempts=attempts[spec.get_key()], error=error),
+                                            attempts=attempts, pending=pending)
+                        if failed is not None:
+                            yield failed
+        finally:
+            for w in workers:
+                self._stop_worker(w)
+
+    def _fail(self, result: EpisodeResult, attempts: Dict[str, int],
+              pending: Deque[EpisodeSpec]) -> Optional[EpisodeResult]:
+        """
+        Handle an episode that crashed or timed out.
+
+        :param result: The result with an error.
+        :param attempts: The number of attempts per episode key.
+        :param pending: The pending episodes.
+
+        :return: The result if the episode won't be retried, or None if the episode will be retried.
+        """
+
+        if attempts[result.spec.get_key()] <= self._max_retries:
+            pending.appendleft(result.spec)
+            return None
+        self._write(result)
+        return result
+
+    def _write(self, result: EpisodeResult) -> None:
+        """
+        Append a result to the results file.
+
+        :param result: The result.
+        """
+
+        if self.results_path is None:
+            return
+        if not self.results_path.parent.exists():
+            self.results_path.parent.mkdir(parents=True)
+        with self.results_path.open("at", encoding="utf-8") as f:
+            f.write(dumps(result.to_dict()) + "\n")
+
+    def _start_worker(self, index: int) -> _Worker:
+        """
+        :param index: The index of the worker.
+
+        :return: A new worker.
+        """
+
+        port = self.port + index
+        build = None if self._build_launcher is None else self._build_launcher(port)
+        tasks = Queue()
+        process = Process(target=_run_worker, args=(index, port, self._controller_type, self._policy,
+                                                    self._launch_build, self._reuse_scene, tasks, self._results), daemon=True)
+        process.start()
+        return _Worker(process=process, tasks=tasks, build=build)
+
+    def _restart_worker(self, worker: _Worker, index: int) -> _Worker:
+        """
+        Kill a worker and its build and start a new one.
+
+        :param worker: The worker.
+        :param index: The index of the worker.
+
+        :return: A new worker.
+        """
+
+        if worker.process.is_alive():
+            worker.process.terminate()
+        worker.process.join()
+        if worker.build is not None:
+            worker.build.terminate()
+        return self._start_worker(index)
+
+    @staticmethod
+    def _stop_worker(worker: _Worker) -> None:
+        """
+        Stop a worker and its build.
+
+        :param worker: The worker.
+        """
+
+        if worker.process.is_alive():
+            worker.tasks.put(None)
+            worker.process.join(timeout=10)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        if worker.build is not None:
+            if isinstance(worker.build, Popen):
+                try:
+                    worker.build.wait(timeout=10)
+                except Exception:
+                    worker.build.terminate()
+            else:
+                worker.build.join(timeout=10)
+                if worker.build.is_alive():
+                    worker.build.terminate()
+
+
+def get_scaling_curve(specs: List[EpisodeSpec], worker_counts: List[int], **kwargs) -> Dict[int, float]:
+    """
+    Run the same sweep with different numbers of workers.
+
+    :param specs: The episode specs.
+    :param worker_counts: The numbers of workers.
+    :param kwargs: Additional `Sweep` constructor parameters. `results_path` is ignored.
+
+    :return: The number of episodes per hour. Key = The number of workers.
+    """
+
+    kwargs["results_path"] = None
+    curve: Dict[int, float] = dict()
+    for num_workers in worker_counts:
+        sweep = Sweep(num_workers=num_workers, **kwargs)
+        t0 = perf_counter()
+        num_episodes = len(list(sweep.run(specs)))
+        curve[num_workers] = num_episodes / (perf_counter() - t0) * 3600
+    return curve
+
+
+def _import(path: str):
+    """
+    :param path: An import path such as `"my_module:my_function"`.
+
+    :return: The imported object.
+    """
+
+    module_name, name = path.split(":")
+    return getattr(import_module(module_name), name)
+
+
+def _get_build_launcher(path: str) -> Callable[[int], Popen]:
+    """
+    :param path: The path to the build executable.
+
+    :return: A function that launches a build on a port.
+    """
+
+    def __launch(port: int) -> Popen:
+        return Popen([path, f"-port={port}"])
+    return __launch
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Run Transport Challenge episodes across multiple builds.")
+    parser.add_argument("--specs", type=str, help="A JSON lines file of episode specs. If set, --scene, --layout, and --num_seeds are ignored.")
+    parser.add_argument("--episodes", type=str, help="A file of pre-generated episodes (see transport_challenge.episode). If set, --specs, --scene, --layout, and --num_seeds are ignored.")
+    parser.add_argument("--scene", type=str, nargs="+", default=["2a"], help="The scenes.")
+    parser.add_argument("--layout", type=int, nargs="+", default=[0], help="The layouts.")
+    parser.add_argument("--num_seeds", type=int, default=1, help="The number of random seeds per scene and layout.")
+    parser.add_argument("--num_workers", type=int, default=1, help="The number of worker processes.")
+    parser.add_argument("--port", type=int, default=1071, help="The port of the first worker.")
+    parser.add_argument("--controller", type=str, help="The controller type, for example: my_module:MyController")
+    parser.add_argument("--policy", type=str, help="The policy function, for example: my_module:my_policy")
+    parser.add_argument("--launch_build", action="store_true", help="Each controller launches its own build.")
+    parser.add_argument("--build", type=str, help="The path to a build executable. The sweep will launch one per worker.")
+    parser.add_argument("--fake_build", action="store_true", help="Launch a fake build per worker (for testing).")
+    parser.add_argument("--results", type=str, help="The path to the JSON lines results file.")
+    parser.add_argument("--max_retries", type=int, default=1, help="The maximum number of retries per episode.")
+    parser.add_argument("--episode_timeout", type=float, default=600, help="The episode timeout in seconds.")
+    parser.add_argument("--reuse_scene", action="store_true", help="Call reset_episode() instead of init_scene() if a worker already loaded the scene and layout. Objects moved in the previous episode aren't reset.")
+    parser.add_argument("--scaling", type=int, nargs="+", help="Report episodes per hour for each of these worker counts.")
+    args = parser.parse_args()
+
+    if args.episodes is not None:
+        from transport_challenge.episode import read_episodes
+        episode_specs = [EpisodeSpec(scene=e.scene, layout=e.layout, random_seed=e.random_seed, episode=e)
+                         for e in read_episodes(args.episodes)]
+    elif args.specs is not None:
+        episode_specs = [EpisodeSpec.from_dict(loads(line)) for line in
+                         Path(args.specs).read_text(encoding="utf-8").split("\n") if line.strip() != ""]
+    else:
+        episode_specs = [EpisodeSpec(scene=s, layout=la, random_seed=seed) for s in args.scene
+                         for la in args.layout for seed in range(args.num_seeds)]
+    if args.fake_build:
+        from transport_challenge.fake_build import launch_fake_build
+        launcher = launch_fake_build
+    elif args.build is not None:
+        launcher = _get_build_launcher(args.build)
+    else:
+        launcher = None
+    sweep_kwargs = {"port": args.port,
+                    "controller_type": None if args.controller is None else _import(args.controller),
+                    "policy": None if args.policy is None else _import(args.policy),
+                    "launch_build": args.launch_build,
+                    "build_launcher": launcher,
+                    "max_retries": args.max_retries,
+                    "episode_timeout": args.episode_timeout,
+                    "reuse_scene": args.reuse_scene}
+    if args.scaling is not None:
+        print("| Workers | Episodes per hour |")
+        print("| --- | --- |")
+        for n, eph in get_scaling_curve(specs=episode_specs, worker_counts=args.scaling, **sweep_kwargs).items():
+            print(f"| {n} | {round(eph)} |")
+    else:
+        for r in Sweep(num_workers=args.num_workers, results_path=args.results, **sweep_kwargs).run(episode_specs):
+            print(dumps(r.to_dict()))
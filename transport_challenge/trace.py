@@ -0,0 +1,374 @@
+import gzip
+from json import dumps, loads
+from struct import pack, unpack
+from pathlib import Path
+from threading import Thread
+from tempfile import TemporaryDirectory
+from typing import List, Optional, Union, Callable, Tuple, TypeVar
+from tdw.controller import Controller
+from transport_challenge.fake_build import FakeBuild
+from transport_challenge.container_arm_pose_cache import CONTAINER_ARM_POSE_CACHE
+
+
+T = TypeVar("T")
+
+
+class Trace:
+    """
+    A recording of every command batch sent to the build and every response received from it, plus every object ID generated by `Controller.get_unique_id()`.
+
+    Traces are saved as gzip-compressed binary files. See: `TraceRecorder` and `TraceReplayer`.
+    """
+
+    # The header of a trace file.
+    _MAGIC = b"TCTR"
+    # The version of the trace file format.
+    _VERSION = 1
+
+    def __init__(self):
+        """:field
+        The JSON-encoded commands of each `communicate()` call.
+        """
+        self.commands: List[bytes] = list()
+        """:field
+        The response of each `communicate()` call as a list of byte arrays.
+        """
+        self.responses: List[List[bytes]] = list()
+        """:field
+        Each object ID generated by `Controller.get_unique_id()`, in order.
+        """
+        self.ids: List[int] = list()
+
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Save the trace to disk.
+
+        :param path: The path to the trace file.
+        """
+
+        if isinstance(path, str):
+            path = Path(path)
+        if not path.parent.exists():
+            path.parent.mkdir(parents=True)
+        with gzip.open(str(path.resolve()), "wb") as f:
+            f.write(Trace._MAGIC)
+            f.write(pack("<III", Trace._VERSION, len(self.commands), len(self.ids)))
+            f.write(pack(f"<{len(self.ids)}I", *self.ids))
+            for commands, resp in zip(self.commands, self.responses):
+                f.write(pack("<II", len(commands), len(resp)))
+                f.write(commands)
+                for r in resp:
+                    f.write(pack("<I", len(r)))
+                    f.write(r)
+
+    @staticmethod
+    def load(path: Union[str, Path]) -> "Trace":
+        """
+        :param path: The path to the trace file.
+
+        :return: The trace.
+        """
+
+        if isinstance(path, str):
+            path = Path(path)
+        with gzip.open(str(path.resolve()), "rb") as f:
+            data = f.read()
+        if data[:4] != Trace._MAGIC:
+            raise Exception(f"Not a trace file: {path}")
+        version, num_frames, num_ids = unpack("<III", data[4:16])
+        if version != Trace._VERSION:
+            raise Exception(f"Unsupported trace file version: {version}")
+        trace = Trace()
+        i = 16
+        trace.ids = list(unpack(f"<{num_ids}I", data[i: i + num_ids * 4]))
+        i += num_ids * 4
+        for frame in range(num_frames):
+            commands_length, num_parts = unpack("<II", data[i: i + 8])
+            i += 8
+            trace.commands.append(data[i: i + commands_length])
+            i += commands_length
+            resp: List[bytes] = list()
+            for j in range(num_parts):
+                part_length = unpack("<I", data[i: i + 4])[0]
+                i += 4
+                resp.append(data[i: i + part_length])
+                i += part_length
+            trace.responses.append(resp)
+        return trace
+
+
+class TraceRecorder:
+    """
+    Record every `communicate()` call of every controller in this process to a `Trace`.
+
+    This temporarily replaces `Controller.communicate()` and `Controller.get_unique_id()` so that it must wrap the construction of the controller as well as its actions:
+
+    ```python
+    from magnebot import Arm
+    from transport_challenge import Transport
+    from transport_challenge.trace import TraceRecorder
+
+    with TraceRecorder(path="episode.trace") as recorder:
+        m = Transport(random_seed=0)
+        m.init_scene(scene="2a", layout=1)
+        m.pick_up(target=m.target_objects[0], arm=Arm.left)
+        m.end()
+    print(len(recorder.trace.commands))
+    ```
+    """
+
+    def __init__(self, path: Union[str, Path] = None):
+        """
+        :param path: If not None, save the trace to this path when recording stops.
+        """
+
+        """:field
+        The trace.
+        """
+        self.trace: Trace = Trace()
+        self._path: Optional[Union[str, Path]] = path
+        self._communicate: Optional[Callable] = None
+        self._get_unique_id: Optional[Callable] = None
+
+    def start(self) -> None:
+        """
+        Start recording.
+        """
+
+        self._communicate = Controller.communicate
+        self._get_unique_id = Controller.get_unique_id
+        communicate = self._communicate
+        get_unique_id = self._get_unique_id
+        trace = self.trace
+
+        def __communicate(controller: Controller, commands: Union[dict, List[dict]]) -> list:
+            if not isinstance(commands, list):
+                commands = [commands]
+            resp = communicate(controller, commands)
+            trace.commands.append(dumps(commands).encode("utf-8"))
+            trace.responses.append(list(resp))
+            return resp
+
+        def __get_unique_id() -> int:
+            object_id = get_unique_id()
+            trace.ids.append(object_id)
+            return object_id
+
+        Controller.communicate = __communicate
+        Controller.get_unique_id = staticmethod(__get_unique_id)
+
+    def stop(self) -> Trace:
+        """
+        Stop recording. If there is a path, save the trace.
+
+        :return: The trace.
+        """
+
+        if self._communicate is not None:
+            Controller.communicate = self._communicate
+            Controller.get_unique_id = staticmethod(self._get_unique_id)
+            self._communicate = None
+        if self._path is not None:
+            self.trace.save(self._path)
+        return self.trace
+
+    def __enter__(self) -> "TraceRecorder":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+
+class Divergence:
+    """
+    A frame in which the commands sent by the controller don't match the recorded commands.
+    """
+
+    def __init__(self, frame: int, expected: Optional[List[dict]], actual: List[dict]):
+        """
+        :param frame: The index of the `communicate()` call.
+        :param expected: The recorded commands. If None, the trace has ended.
+        :param actual: The commands that the controller sent.
+        """
+
+        """:field
+        The index of the `communicate()` call.
+        """
+        self.frame: int = frame
+        """:field
+        The recorded commands. If None, the trace has ended.
+        """
+        self.expected: Optional[List[dict]] = expected
+        """:field
+        The commands that the controller sent.
+        """
+        self.actual: List[dict] = actual
+
+    def __str__(self) -> str:
+        if self.expected is None:
+            return f"Frame {self.frame}: The trace ended but the controller sent: {dumps(self.actual)[:200]}"
+        return f"Frame {self.frame}: Expected {dumps(self.expected)[:200]} but got {dumps(self.actual)[:200]}"
+
+
+class ReplayBuild(FakeBuild):
+    """
+    A `FakeBuild` that replies to each `communicate()` call with the recorded response of a `Trace`. If the commands don't match the recorded commands, the divergence is recorded and the recorded response is sent anyway.
+    """
+
+    def __init__(self, trace: Trace, port: int = 1071):
+        """
+        :param trace: The trace.
+        :param port: The socket port.
+        """
+
+        super().__init__(port=port)
+        """:field
+        Every frame in which the commands didn't match the trace.
+        """
+        self.divergences: List[Divergence] = list()
+        self._trace: Trace = trace
+
+    def get_response(self, commands: List[dict]) -> List[bytes]:
+        i = self.frame - 1
+        if i >= len(self._trace.responses):
+            self.divergences.append(Divergence(frame=i, expected=None, actual=commands))
+            return super().get_response(commands=commands)
+        expected = loads(self._trace.commands[i].decode("utf-8"))
+        if expected != commands:
+            self.divergences.append(Divergence(frame=i, expected=expected, actual=commands))
+        return self._trace.responses[i]
+
+
+class TraceReplayer:
+    """
+    Replay a `Trace` without a build. A `ReplayBuild` runs on a localhost port and serves the recorded responses through the controller's usual `communicate()` path. Object IDs are generated in the same order as the recording.
+
+    The controller must be constructed and must call the same actions in the same order as when the trace was recorded. Use `divergences` to check whether the controller sent different commands.
+
+    ```python
+    from magnebot import Arm
+    from transport_challenge import Transport
+    from transport_challenge.trace import TraceReplayer
+
+    with TraceReplayer(path="episode.trace", port=1071) as replayer:
+        m = Transport(random_seed=0, port=1071)
+        m.init_scene(scene="2a", layout=1)
+        m.pick_up(target=m.target_objects[0], arm=Arm.left)
+        m.end()
+    assert len(replayer.divergences) == 0, replayer.divergences[0]
+    ```
+    """
+
+    def __init__(self, path: Union[str, Path] = None, trace: Trace = None, port: int = 1071):
+        """
+        :param path: The path to the trace file. Ignored if `trace` isn't None.
+        :param trace: The trace. If None, load the trace from `path`.
+        :param port: The socket port.
+        """
+
+        if trace is None:
+            trace = Trace.load(path)
+        """:field
+        The trace.
+        """
+        self.trace: Trace = trace
+        """:field
+        The replay build.
+        """
+        self.build: ReplayBuild = ReplayBuild(trace=trace, port=port)
+        """:field
+        Every frame in which the commands didn't match the trace.
+        """
+        self.divergences: List[Divergence] = self.build.divergences
+        self._thread: Optional[Thread] = None
+        self._get_unique_id: Optional[Callable] = None
+
+    def start(self) -> None:
+        """
+        Start the replay build and start serving recorded object IDs.
+        """
+
+        self._get_unique_id = Controller.get_unique_id
+        get_unique_id = self._get_unique_id
+        ids = iter(self.trace.ids)
+
+        def __get_unique_id() -> int:
+            object_id = next(ids, None)
+            # 0 is a valid recorded ID.
+            if object_id is None:
+                return get_unique_id()
+            return object_id
+
+        Controller.get_unique_id = staticmethod(__get_unique_id)
+        self._thread = self.build.launch_thread()
+
+    def stop(self) -> None:
+        """
+        Stop serving recorded object IDs and wait for the replay build to end.
+        """
+
+        if self._get_unique_id is not None:
+            Controller.get_unique_id = staticmethod(self._get_unique_id)
+            self._get_unique_id = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def __enter__(self) -> "TraceReplayer":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+
+def record_or_replay(path: Union[str, Path], episode: Callable[[], T], port: int = 1071, record: bool = False,
+                     replay: bool = True) -> Tuple[Optional[T], List[Divergence]]:
+    """
+    Record or replay a trace of an episode. The episode always starts with an empty container arm pose cache so that the controller sends the same commands when recording and replaying.
+
+    If `record == True` or if the trace file doesn't exist, this requires a build on the port: the episode is recorded and the trace is saved to `path`. Otherwise, if `replay == True`, the trace is replayed without a build. Otherwise, the episode doesn't run.
+
+    ```python
+    from magnebot import Arm
+    from transport_challenge import Transport
+    from transport_challenge.trace import record_or_replay
+
+    def episode() -> None:
+        m = Transport(random_seed=0, port=1071)
+        m.init_scene(scene="2a", layout=1)
+        m.pick_up(target=m.target_objects[0], arm=Arm.left)
+        m.end()
+
+    result, divergences = record_or_replay(path="episode.trace", episode=episode, port=1071)
+    assert len(divergences) == 0, divergences[0]
+    ```
+
+    :param path: The path to the trace file.
+    :param episode: A function that runs the episode. It must create a controller on `port` and call the same actions in the same order every time.
+    :param port: The socket port.
+    :param record: If True, record a new trace even if the trace file exists.
+    :param replay: If True and the episode isn't recorded, replay the trace.
+
+    :return: Tuple: The return value of `episode()` (None if the episode didn't run); the frames in which the replayed commands didn't match the trace (empty if the episode was recorded or didn't run).
+    """
+
+    path = Path(path)
+    recording = record or not path.exists()
+    if not recording and not replay:
+        return None, list()
+    cache_path = CONTAINER_ARM_POSE_CACHE.path
+    with TemporaryDirectory() as temp:
+        CONTAINER_ARM_POSE_CACHE.path = Path(temp).joinpath("container_arm_poses.json")
+        CONTAINER_ARM_POSE_CACHE.clear()
+        try:
+            if recording:
+                with TraceRecorder(path=path):
+                    return episode(), list()
+            with TraceReplayer(path=path, port=port) as replayer:
+                result = episode()
+            return result, replayer.divergences
+        finally:
+            CONTAINER_ARM_POSE_CACHE.path = cache_path
+            CONTAINER_ARM_POSE_CACHE.clear()
@@ -1,14 +1,27 @@
-from json import loads
-from csv import DictReader
 from typing import List, Dict, Tuple, Optional, Union
 import numpy as np
 from tdw.py_impact import ObjectInfo, AudioMaterial
-from tdw.librarian import ModelLibrarian
 from tdw.tdw_utils import TDWUtils
+from tdw.output_data import OutputData, Transforms
+from tdw.object_init_data import AudioInitData, TransformInitData
 from magnebot import Magnebot, Arm, ActionStatus, ArmJoint
 from magnebot.scene_state import SceneState
-from magnebot.paths import ROOM_MAPS_DIRECTORY, OCCUPANCY_MAPS_DIRECTORY, SCENE_BOUNDS_PATH, SPAWN_POSITIONS_PATH
-from transport_challenge.paths import TARGET_OBJECT_MATERIALS_PATH, TARGET_OBJECTS_PATH, CONTAINERS_PATH
+from magnebot.transform import Transform
+from magnebot.constants import OCCUPANCY_CELL_SIZE
+from transport_challenge.object_data import OBJECT_DATA
+from transport_challenge.material_templates import MATERIAL_TEMPLATES
+from transport_challenge.scene_cache import SCENE_CACHE, SceneAssets
+from transport_challenge.placement import get_occupancy_positions
+from transport_challenge.episode import Episode, get_episode
+from transport_challenge.object_role import ObjectRole
+from transport_challenge.object_registry import ObjectRegistry, ObjectIdView
+from transport_challenge.container_arm_pose_cache import CONTAINER_ARM_POSE_CACHE
+from transport_challenge.action_metrics import ActionMetricsBuffer, SocketTimer, measure_action
+from transport_challenge.image_writer import ImageWriter
+from transport_challenge.container_occupancy import ContainerOccupancy
+from transport_challenge.spatial_index import SpatialIndex
+from transport_challenge.visit_plan import VisitPlan, get_visit_plan
+from transport_challenge.lazy_scene_state import LazySceneState, TRANSFORM_DTYPE, get_object_positions, get_transforms
 
 
 class Transport(Magnebot):
@@ -77,18 +90,13 @@ class Transport(Magnebot):
     # The mass of a container.
     __CONTAINER_MASS = 1
 
-    # The model librarian.
-    __LIBRARIAN = ModelLibrarian()
-
     # The value of the torso prismatic joint while the Magnebot is holding a container.
     __TORSO_PRISMATIC_CONTAINER = 1.2
 
-    # Load a list of visual materials for target objects.
-    __TARGET_OBJECT_MATERIALS = TARGET_OBJECT_MATERIALS_PATH.read_text(encoding="utf-8").split("\n")
-
     def __init__(self, port: int = 1071, launch_build: bool = False, screen_width: int = 256, screen_height: int = 256,
                  debug: bool = False, auto_save_images: bool = False, images_directory: str = "images",
-                 random_seed: int = None, img_is_png: bool = True, skip_frames: int = 10):
+                 random_seed: int = None, img_is_png: bool = True, skip_frames: int = 10,
+                 relevant_objects_only: bool = False):
         """
         :param port: The socket port. [Read this](https://github.com/threedworld-mit/tdw/blob/master/Documentation/getting_started.md#command-line-arguments) for more information.
         :param launch_build: If True, the build will launch automatically on the default port (1071). If False, you will need to launch the build yourself (for example, from a Docker container).
@@ -100,19 +108,43 @@ class Transport(Magnebot):
         :param random_seed: The random seed used for setting the start position of the Magnebot, the goal room, and the target objects and containers.
         :param img_is_png: If True, the `img` pass images will be .png files. If False, the `img` pass images will be .jpg files, which are smaller; the build will run approximately 2% faster.
         :param skip_frames: The build will return output data this many frames per `communicate()` call. This will greatly speed up the simulation. If you want to render every frame, set this to 0.
+        :param relevant_objects_only: If True, the build sends per-frame transforms only for target objects and containers. See `refresh_furniture_transforms()`.
         """
 
+        # This must be set before `super().__init__()` because the Magnebot constructor calls `communicate()`.
+        """:field
+        [A ring buffer of the compute cost of the most recent actions](action_metrics.md): frames, `communicate()` calls, response bytes, socket vs. Python time, and time spent in IK, arm motion, and waiting for objects to stop moving.
+        """
+        self.action_metrics: ActionMetricsBuffer = ActionMetricsBuffer()
+        """:field
+        [An index of the objects in each container](container_occupancy.md), updated from trigger collision enter and exit events.
+        """
+        self.container_occupancy: ContainerOccupancy = ContainerOccupancy()
+        """:field
+        If True, the build sends per-frame transforms only for target objects and containers. The transforms of the furniture are captured when the scene is initialized and refreshed only by `refresh_furniture_transforms()`; they are included in `self.state` at the end of every action. This reduces the size of each response and the time needed to parse it.
+        """
+        self.relevant_objects_only: bool = relevant_objects_only
+        # The most recent response from the build.
+        self._resp: List[bytes] = list()
         super().__init__(port=port, launch_build=launch_build, screen_width=screen_width, screen_height=screen_height,
                          debug=debug, auto_save_images=auto_save_images, images_directory=images_directory,
                          random_seed=random_seed, img_is_png=img_is_png, skip_frames=skip_frames)
         """:field
-        The IDs of each target object in the scene.
+        [An index of every object in the scene](object_registry.md) with its role (container, target object, or furniture), model name, scale, and spawn cell.
         """
-        self.target_objects: List[int] = list()
+        self.object_registry: ObjectRegistry = ObjectRegistry()
         """:field
-        The IDs of each container in the scene.
+        The IDs of each target object in the scene. This is a read-only list-like view of `self.object_registry`.
         """
-        self.containers: List[int] = list()
+        self.target_objects: ObjectIdView = self.object_registry.get_view(ObjectRole.target_object)
+        """:field
+        The IDs of each container in the scene. This is a read-only list-like view of `self.object_registry`.
+        """
+        self.containers: ObjectIdView = self.object_registry.get_view(ObjectRole.container)
+        """:field
+        [Writes images to disk on background threads.](image_writer.md) If `auto_save_images == True`, images are queued at the end of each action and written while the simulation continues. Images are flushed to disk in `end()`.
+        """
+        self.image_writer: ImageWriter = ImageWriter()
         """:field
         The total number of actions taken by the Magnebot.
         """
@@ -135,24 +167,59 @@ class Transport(Magnebot):
         # Cached IK solution for resetting an arm holding a container.
         self._container_arm_reset_angles: Dict[Arm, np.array] = dict()
 
-        # Get all possible target objects. Key = name. Value = scale.
-        self._target_objects: Dict[str, float] = dict()
-        with open(str(TARGET_OBJECTS_PATH.resolve())) as csvfile:
-            reader = DictReader(csvfile)
-            for row in reader:
-                self._target_objects[row["name"]] = float(row["scale"])
-        self._target_object_names = list(self._target_objects.keys())
-
-    def init_scene(self, scene: str, layout: int, room: int = None, goal_room: int = None) -> ActionStatus:
+        # The scene state that was used to evaluate the goal zone. If this is `self.state`, nothing has changed.
+        self._goal_zone_state: Optional[SceneState] = None
+        # The IDs of the target objects as a numpy array, in the same order as `self.target_objects`.
+        self._target_object_ids: np.array = np.zeros(0, dtype=int)
+        # The object transforms of `self.state` as a structured array (see `lazy_scene_state.get_transforms()`).
+        self._state_transforms: np.array = np.zeros(0, dtype=TRANSFORM_DTYPE)
+        # The scene state that `self._state_transforms` belongs to. This is set in `_end_action()`.
+        self._state_transforms_state: Optional[SceneState] = None
+        # The IDs in `self._state_transforms` when `self._target_object_indices` was calculated.
+        self._state_transform_ids: np.array = np.zeros(0, dtype=int)
+        # The index of each target object in `self._state_transforms`.
+        self._target_object_indices: np.array = np.zeros(0, dtype=int)
+        # The position of each target object as an (n, 3) numpy array.
+        self._target_object_positions: np.array = np.zeros((0, 3))
+        # A boolean mask of target objects held by the Magnebot.
+        self._target_objects_held: np.array = np.zeros(0, dtype=bool)
+        # A boolean mask of target objects in the goal zone, on the floor, and not held by the Magnebot.
+        self._target_objects_in_goal_zone: np.array = np.zeros(0, dtype=bool)
+
+        # The cached assets of the current scene and layout. This is used to get the path planner.
+        self._scene_assets: Optional[SceneAssets] = None
+        # The `(scene, layout)` that is currently loaded. If None, the scene hasn't been initialized.
+        self._scene_key: Optional[Tuple[str, int]] = None
+        # The episode that `get_scene_init_commands()` will add to the scene. This is set in `init_scene()`.
+        self._episode: Optional[Episode] = None
+
+        # The most recent transforms of the furniture if `relevant_objects_only == True`. Key = The object ID.
+        self._furniture_transforms: Dict[int, Transform] = dict()
+
+        # Spatial indices of the target objects and containers for nearest-object queries.
+        self._target_object_index: SpatialIndex = SpatialIndex()
+        self._container_index: SpatialIndex = SpatialIndex()
+        # The scene state that was used to update the spatial indices. If this is `self.state`, nothing has changed.
+        self._spatial_index_state: Optional[SceneState] = None
+        # The IDs of the objects in each spatial index. If these aren't the IDs in the registry, the scene was reset.
+        self._target_object_index_ids: np.array = np.zeros(0, dtype=int)
+        self._container_index_ids: np.array = np.zeros(0, dtype=int)
+
+    @measure_action
+    def init_scene(self, scene: str = None, layout: int = None, room: int = None, goal_room: int = None,
+                   episode: Episode = None) -> ActionStatus:
         """
         This is the same function as `Magnebot.init_scene()` but it adds target objects and containers to the scene.
 
         When `init_scene()` is called, 8-12 target objects will be randomly placed on the floor of a randomly-selected room. Then, there is a 25% chance of adding one container per room.
 
+        The room maps, occupancy maps, spawn positions, scene bounds, and furniture layouts are loaded once per process and cached (see `transport_challenge.scene_cache.SCENE_CACHE`). If the scene and layout are already cached, `init_scene()` doesn't read any files. `self.occupancy_map` is the cached read-only array.
+
         :param scene: The name of an interior floorplan scene. Each number (1, 2, etc.) has a different shape, different rooms, etc. Each letter (a, b, c) is a cosmetically distinct variant with the same floorplan.
         :param layout: The furniture layout of the floorplan. Each number (0, 1, 2) will populate the floorplan with different furniture in different positions.
         :param room: The index of the room that the Magnebot will spawn in the center of. If None, the room will be chosen randomly.
         :param goal_room: The goal room. If None, this is chosen randomly. See field descriptions of `goal_room` and `goal_position` in this document.
+        :param episode: If not None, use this pre-generated [`Episode`](episode.md) instead of random values. `scene`, `layout`, `room`, and `goal_room` are ignored. See `transport_challenge.episode.get_episode()`.
 
         Possible [return values](https://github.com/alters-mit/magnebot/blob/main/doc/action_status.md):
 
@@ -161,21 +228,118 @@ class Transport(Magnebot):
         :return: An `ActionStatus` (always success).
         """
 
-        # Set the room of the goal.
-        rooms = np.unique(np.load(str(ROOM_MAPS_DIRECTORY.joinpath(f"{scene[0]}.npy").resolve())))
-        if goal_room is None:
-            self.goal_room = int(self._rng.choice(rooms))
-        else:
-            assert goal_room in rooms, f"Not a valid room: {goal_room}"
-            self.goal_room = goal_room
+        # Choose the goal room, the Magnebot's room, and the target objects and containers.
+        if episode is None:
+            episode = get_episode(scene=scene, layout=layout, room=room, goal_room=goal_room, rng=self._rng)
+        # Load the cached room map, occupancy map, spawn positions, and scene bounds.
+        assets = SCENE_CACHE.get(scene=episode.scene, layout=episode.layout)
+        self._set_goal_room(assets=assets, goal_room=episode.goal_room)
+        # `get_scene_init_commands()` adds the episode's objects and uses the cached occupancy map and scene bounds.
+        self._episode = episode
+        # This is the same as `Magnebot.init_scene()` but it doesn't read the occupancy map, scene bounds, and spawn
+        # positions from disk.
+        commands = self.get_scene_init_commands(scene=episode.scene, layout=episode.layout, audio=True)
+        # Spawn the Magnebot in the center of a room.
+        commands.extend(self._get_scene_init_commands(magnebot_position=assets.spawn_positions[str(episode.room)]))
+        resp = self.communicate(commands)
+        self._cache_static_data(resp=resp)
+        # Wait for the Magnebot to reset to its neutral position.
+        status = self._do_arm_motion()
+        self._end_action()
+        return status
 
-        # The goal position is the center of the room.
-        self.goal_position = TDWUtils.vector3_to_array(loads(SPAWN_POSITIONS_PATH.read_text())[scene[0]][str(layout)]
-                                                       [str(self.goal_room)])
-        if self._debug:
-            print(f"Goal position: {self.goal_position}")
-        return super().init_scene(scene=scene, layout=layout, room=room)
+    @measure_action
+    def reset_episode(self, room: int = None, goal_room: int = None, episode: Episode = None) -> ActionStatus:
+        """
+        Start a new episode without reloading the scene. This is much faster than `init_scene()` with the same scene and layout because the floorplan, the furniture, and the Magnebot stay loaded.
+
+        The target objects and containers are destroyed and new ones are added. The Magnebot drops any held objects and is teleported to the center of a room, and its arms, torso, and camera are reset. `action_cost`, `done`, and the cached container arm angles are reset.
+
+        For a given random seed, the goal room, the Magnebot's room, and the target objects and containers are the same as they would be after `init_scene()`. Furniture that was pushed during the previous episode isn't moved back.
+
+        ```python
+        from transport_challenge import Transport
+
+        m = Transport()
+        m.init_scene(scene="2a", layout=1)
+        # Your code here.
+        m.reset_episode()
+        ```
+
+        Possible [return values](https://github.com/alters-mit/magnebot/blob/main/doc/action_status.md):
+
+        - `success`
+
+        :param room: The index of the room that the Magnebot will spawn in the center of. If None, the room will be chosen randomly.
+        :param goal_room: The goal room. If None, this is chosen randomly.
+        :param episode: If not None, use this pre-generated [`Episode`](episode.md) instead of random values. `room` and `goal_room` are ignored. The episode must have the same scene and layout as the current scene.
+
+        :return: An `ActionStatus` (always success).
+        """
 
+        assert self._scene_key is not None, "Call init_scene() before reset_episode()."
+        if episode is None:
+            episode = get_episode(scene=self._scene_key[0], layout=self._scene_key[1], room=room,
+                                  goal_room=goal_room, rng=self._rng)
+        else:
+            assert (episode.scene, episode.layout) == self._scene_key, \
+                f"The episode's scene and layout {(episode.scene, episode.layout)} aren't loaded: {self._scene_key}"
+        assets = self._scene_assets
+        self._set_goal_room(assets=assets, goal_room=episode.goal_room)
+        commands = list()
+        # Drop any held objects.
+        for arm in self.state.held:
+            for object_id in self.state.held[arm]:
+                commands.append({"$type": "detach_from_magnet",
+                                 "arm": arm.name,
+                                 "object_id": int(object_id)})
+        # Destroy the target objects and containers.
+        for object_id in list(self.target_objects) + list(self.containers):
+            commands.append({"$type": "destroy_object",
+                             "id": int(object_id)})
+            self.object_registry.remove(object_id)
+            self.objects_static.pop(object_id, None)
+        self._trigger_events.clear()
+        self.colliding_objects.clear()
+        self._about_to_tip = False
+        # Add new target objects and containers. Every other object is already in the scene.
+        self._object_init_commands.clear()
+        self._add_episode_objects(episode=episode)
+        for object_id in self._object_init_commands:
+            commands.extend(self._object_init_commands[object_id])
+        # Teleport the Magnebot to the center of a room.
+        commands.extend([{"$type": "teleport_robot",
+                          "position": assets.spawn_positions[str(episode.room)]},
+                         {"$type": "set_immovable",
+                          "immovable": True}])
+        # Reset the arms, the torso, and the camera.
+        self._container_arm_reset_angles.clear()
+        for arm in [Arm.left, Arm.right]:
+            commands.extend(self._get_reset_arm_commands(arm=arm, reset_torso=True))
+        self.camera_rpy = np.array([0, 0, 0])
+        commands.append({"$type": "reset_sensor_container_rotation"})
+        self._stop_wheels(state=self.state)
+        # Request the static data of the new objects.
+        commands.extend([{"$type": "send_static_robots",
+                          "frequency": "once"},
+                         {"$type": "send_segmentation_colors",
+                          "frequency": "once"},
+                         {"$type": "send_rigidbodies",
+                          "frequency": "once"},
+                         {"$type": "send_bounds",
+                          "frequency": "once"}])
+        # Get the transforms of every object for this frame. The new target objects and containers have new IDs.
+        if self.relevant_objects_only:
+            commands.append({"$type": "send_transforms",
+                             "frequency": "always"})
+        resp = self.communicate(commands)
+        self._cache_static_data(resp=resp)
+        # Wait for the Magnebot to reset to its neutral position.
+        status = self._do_arm_motion()
+        self._end_action()
+        return status
+
+    @measure_action
     def pick_up(self, target: int, arm: Arm) -> ActionStatus:
         """
         Grasp an object and lift it up. This combines the actions `grasp()` and `reset_arm()`.
@@ -210,11 +374,12 @@ class Transport(Magnebot):
             return grasp_status
         return reset_status
 
+    @measure_action
     def reset_arm(self, arm: Arm, reset_torso: bool = True) -> ActionStatus:
         """
         This is the same as `Magnebot.reset_arm()` unless the arm is holding a container.
 
-        If the arm is holding a container, it will try to align the bottom of the container with the floor. This will be somewhat slow the first time the Magnebot does this for this held container.
+        If the arm is holding a container, it will try to align the bottom of the container with the floor. This will be somewhat slow the first time the Magnebot does this for this container model, arm, and torso height. The leveled arm angles are cached on disk (see `transport_challenge.container_arm_pose_cache.CONTAINER_ARM_POSE_CACHE`) so subsequent resets, including in later episodes and processes, immediately move the arm to the leveled angles.
 
         Possible [return values](https://github.com/alters-mit/magnebot/blob/main/doc/action_status.md):
 
@@ -229,14 +394,19 @@ class Transport(Magnebot):
 
         self.action_cost += 1
 
+        # The value of the torso prismatic joint after the arm is reset.
+        if reset_torso:
+            torso_prismatic = Magnebot._DEFAULT_TORSO_Y
+        else:
+            torso_prismatic = self._get_torso_prismatic()
         # Use cached angles to reset an arm holding a container.
-        if arm in self._container_arm_reset_angles:
+        if self._load_container_arm_reset_angles(arm=arm, torso_prismatic=torso_prismatic):
             return super().reset_arm(arm=arm, reset_torso=reset_torso)
 
         status = super().reset_arm(arm=arm, reset_torso=reset_torso)
         for object_id in self.state.held[arm]:
             # If the arm is holding a container, orient the container to be level with the floor.
-            if object_id in self.containers:
+            if self.object_registry.is_container(object_id):
                 rot = self.state.object_transforms[object_id].rotation
                 # Source: https://answers.unity.com/questions/416169/finding-pitchrollyaw-from-quaternions.html
                 x_rot = -np.rad2deg(np.arctan2(2 * rot[0] * rot[3] - 2 * rot[1] * rot[2],
@@ -273,11 +443,15 @@ class Transport(Magnebot):
                 # Cache the arm angles so we can next time immediately reset to this position.
                 self._container_arm_reset_angles[arm] = np.array([np.rad2deg(a) for a in
                                                                   self._get_initial_angles(arm=arm)[1:-1]])
+                CONTAINER_ARM_POSE_CACHE.set(arm=arm, model_name=self.object_registry.get(object_id).model_name,
+                                             torso_prismatic=torso_prismatic,
+                                             angles=self._container_arm_reset_angles[arm])
 
                 return status
         return status
 
-    def put_in(self) -> ActionStatus:
+    @measure_action
+    def put_in(self, fused: bool = False) -> ActionStatus:
         """
         Put an object in a container. In order to put an object in a container:
 
@@ -286,15 +460,36 @@ class Transport(Magnebot):
 
         This is a multistep action, combining many motions and may require more time than other actions.
 
+        If `fused == True`, the action requires fewer frames and `communicate()` calls (see `self.action_metrics`):
+
+        - The state at the end of each arm motion is reused instead of requesting a new state.
+        - The elbow of the other arm is tucked in while the container arm moves.
+        - If the leveled container arm angles are already cached (see `reset_arm()`), both arms are reset at the same time.
+
         Possible [return values](https://github.com/alters-mit/magnebot/blob/main/doc/action_status.md):
 
         - `success`
         - `not_holding` (If the Magnebot isn't holding a container or target object.)
         - `not_in` (If the target object didn't land in the container.)
 
+        :param fused: If True, use fewer frames and `communicate()` calls. The possible return values are the same.
+
         :return: An `ActionStatus` indicating if the target object is in the container and if not, why.
         """
 
+        # The state at the end of the most recent arm motion.
+        motion_states: List[SceneState] = [self.state]
+
+        def __record_state(s: SceneState) -> bool:
+            """
+            :param s: The scene state.
+
+            :return: False. This is a conditional for `_do_arm_motion()` that records the most recent state.
+            """
+
+            motion_states[0] = s
+            return False
+
         def __object_in_container(s: SceneState) -> bool:
             """
             :param s: The scene state.
@@ -306,8 +501,17 @@ class Transport(Magnebot):
             magnet_id = self.magnebot_static.magnets[object_arm]
 
             # Is the target object colliding with the surface of the container?
-            return container_id in self._trigger_events and (magnet_id in self._trigger_events[container_id] or
-                                                             object_id in self._trigger_events[container_id])
+            return self.container_occupancy.contains(container_id=container_id, object_id=magnet_id) or \
+                self.container_occupancy.contains(container_id=container_id, object_id=object_id)
+
+        def __object_dropped_in_container(s: SceneState) -> bool:
+            """
+            :param s: The scene state.
+
+            :return: True if the dropped target object is in the container.
+            """
+
+            return self.container_occupancy.contains(container_id=container_id, object_id=object_id)
 
         # Get the arm holding each object.
         container_arm, container_id = self._get_container_arm()
@@ -319,7 +523,7 @@ class Transport(Magnebot):
         object_arm = Arm.left if container_arm == Arm.right else Arm.right
         object_id = None
         for o_id in self.state.held[object_arm]:
-            if o_id in self.target_objects:
+            if self.object_registry.is_target_object(o_id):
                 object_id = o_id
         if object_id is None:
             if self._debug:
@@ -338,14 +542,23 @@ class Transport(Magnebot):
         self._next_frame_commands.append({"$type": "set_revolute_target",
                                           "joint_id": elbow_id,
                                           "target": 115})
-        state = SceneState(resp=self.communicate([]))
+        if fused:
+            # The Magnebot hasn't moved since the end of the previous action.
+            # The elbow will move at the same time as the container arm.
+            state = self.state
+        else:
+            state = LazySceneState(resp=self.communicate([]))
         # Bring the container approximately to center.
         ct = {"x": 0.1 * (-1 if container_arm is Arm.right else 1), "y": 0.4, "z": 0.5}
         self._start_ik(target=ct,
                        arm=container_arm, absolute=False, allow_column=False, state=state,
                        fixed_torso_prismatic=Transport.__TORSO_PRISMATIC_CONTAINER, do_prismatic_first=False)
-        self._do_arm_motion()
-        state = SceneState(resp=self.communicate([]))
+        if fused:
+            self._do_arm_motion(conditional=__record_state)
+            state = motion_states[0]
+        else:
+            self._do_arm_motion()
+            state = LazySceneState(resp=self.communicate([]))
         # Move the target object to be over the container.
         target = np.copy(state.object_transforms[container_id].position)
         target[1] += 0.5
@@ -360,7 +573,11 @@ class Transport(Magnebot):
         self._next_frame_commands.extend([{"$type": "set_spherical_target",
                                            "joint_id": wrist_id,
                                            "target": {"x": -45, "y": 0, "z": 0}}])
-        self._do_arm_motion(conditional=__object_in_container, joint_ids=[wrist_id])
+        if fused:
+            self._do_arm_motion(conditional=lambda s: __record_state(s) or __object_in_container(s),
+                                joint_ids=[wrist_id])
+        else:
+            self._do_arm_motion(conditional=__object_in_container, joint_ids=[wrist_id])
         # Drop the object.
         self._append_drop_commands(object_id=object_id, arm=object_arm)
         # Set the detection mode to discrete. This will make physics less buggy.
@@ -368,12 +585,27 @@ class Transport(Magnebot):
                                           "id": int(object_id),
                                           "mode": "discrete"})
         # Wait for the object to fall (hopefully into the container).
-        self._wait_until_objects_stop(object_ids=[object_id], state=SceneState(self.communicate([])))
+        if fused:
+            # The drop commands are sent on the first frame of `_wait_until_objects_stop()`.
+            self._wait_until_objects_stop(object_ids=[object_id], state=motion_states[0],
+                                          conditional=__object_dropped_in_container)
+        else:
+            self._wait_until_objects_stop(object_ids=[object_id], state=LazySceneState(self.communicate([])),
+                                          conditional=__object_dropped_in_container)
 
         # Reset the arms.
-        self.reset_arm(arm=object_arm, reset_torso=False)
-        self.reset_arm(arm=container_arm, reset_torso=True)
-        self.action_cost -= 1
+        if fused and self._load_container_arm_reset_angles(arm=container_arm,
+                                                           torso_prismatic=Magnebot._DEFAULT_TORSO_Y):
+            # Reset both arms at the same time.
+            self._next_frame_commands.extend(self._get_reset_arm_commands(arm=object_arm, reset_torso=False))
+            self._next_frame_commands.extend(self._get_reset_arm_commands(arm=container_arm, reset_torso=True))
+            self._do_arm_motion()
+        else:
+            self.reset_arm(arm=object_arm, reset_torso=False)
+            self.reset_arm(arm=container_arm, reset_torso=True)
+            # Resetting the arms doesn't add to the action cost of this action.
+            self.action_cost -= 2
+        self.action_cost += 1
 
         in_container = self._get_objects_in_container(container_id=container_id)
         # If the object isn't in in the container, set the detection mode to the default.
@@ -389,13 +621,64 @@ class Transport(Magnebot):
                 print(f"Object {object_id} isn't in container {container_id}")
             return ActionStatus.not_in
 
+    @measure_action
+    def put_in_many(self, object_ids: List[int]) -> Dict[int, ActionStatus]:
+        """
+        Pick up target objects one at a time and put each of them in a container. The Magnebot must be holding a container with one magnet. The other magnet will pick up each target object and drop it in the container.
+
+        This requires fewer frames than calling `pick_up()` and `put_in()` for each object because the container arm stays at its leveled pose (see `reset_arm()`) throughout instead of moving to the center and resetting for every object. If the other magnet can't reach over the container, that object is put in the container with `put_in(fused=True)`.
+
+        The Magnebot doesn't move or turn. Each target object should already be within reach.
+
+        Possible [return values](https://github.com/alters-mit/magnebot/blob/main/doc/action_status.md) per object:
+
+        - `success`
+        - `not_holding` (If the Magnebot isn't holding a container.)
+        - `cannot_reach`, `failed_to_grasp`, or `failed_to_bend` (If the Magnebot failed to pick up the object; see `pick_up()`.)
+        - `not_in` (If the target object didn't land in the container.)
+
+        :param object_ids: The IDs of the target objects, in the order that they will be put in the container.
+
+        :return: A dictionary. Key = The ID of the target object. Value = An `ActionStatus` indicating if the target object is in the container and if not, why.
+        """
+
+        container_arm, container_id = self._get_container_arm()
+        if container_arm is None:
+            if self._debug:
+                print("Magnebot isn't holding a container.")
+            return {int(object_id): ActionStatus.not_holding for object_id in object_ids}
+        object_arm = Arm.left if container_arm == Arm.right else Arm.right
+        # Level the container. After this, the container arm doesn't move.
+        if not self._load_container_arm_reset_angles(arm=container_arm, torso_prismatic=Magnebot._DEFAULT_TORSO_Y) or \
+                not self._is_at_container_arm_reset_angles(arm=container_arm):
+            self.reset_arm(arm=container_arm, reset_torso=True)
+            # Resetting the arm doesn't add to the action cost of this action.
+            self.action_cost -= 1
+        statuses: Dict[int, ActionStatus] = dict()
+        for object_id in object_ids:
+            object_id = int(object_id)
+            if not self.object_registry.is_target_object(object_id):
+                if self._debug:
+                    print(f"{object_id} isn't a target object.")
+                statuses[object_id] = ActionStatus.failed_to_grasp
+                continue
+            status = self.pick_up(target=object_id, arm=object_arm)
+            # The magnet might be holding the object even if the arm failed to reset all the way.
+            if object_id not in self.state.held[object_arm]:
+                statuses[object_id] = status
+                continue
+            statuses[object_id] = self._put_in_leveled_container(object_id=object_id, object_arm=object_arm,
+                                                                 container_id=container_id)
+        return statuses
+
+    @measure_action
     def pour_out(self) -> ActionStatus:
         """
         Pour out all of the objects in a container held by one of the Magnebot's magnets.
 
         The Magnebot will extend the arm holding the container and then flip its elbow and wrist.
 
-        The action ends when any objects that were in the container stop moving.
+        The action ends when the container is empty or when any objects that were in the container stop moving.
 
         Possible [return values](https://github.com/alters-mit/magnebot/blob/main/doc/action_status.md):
 
@@ -412,6 +695,16 @@ class Transport(Magnebot):
             return ActionStatus.not_holding
         # Get all of the objects currently in the container.
         in_container_0 = self._get_objects_in_container(container_id=container_id)
+
+        def __is_empty(s: SceneState) -> bool:
+            """
+            :param s: The scene state.
+
+            :return: True if the container is empty.
+            """
+
+            return self.container_occupancy.is_empty(container_id=container_id)
+
         self._start_action()
         self._next_frame_commands.append({"$type": "set_immovable",
                                           "immovable": True})
@@ -441,9 +734,12 @@ class Transport(Magnebot):
                                           {"$type": "set_revolute_target",
                                            "joint_id": elbow_id,
                                            "target": 35}])
-        self._do_arm_motion(joint_ids=[wrist_id, elbow_id])
+        # Stop flipping the container as soon as it's empty.
+        self._do_arm_motion(conditional=__is_empty, joint_ids=[wrist_id, elbow_id])
         # Wait for the objects to fall out (by this point, they likely already have).
-        self._wait_until_objects_stop(in_container_0, state=SceneState(self.communicate([])))
+        if not self.container_occupancy.is_empty(container_id=container_id):
+            self._wait_until_objects_stop(in_container_0, state=LazySceneState(self.communicate([])),
+                                          conditional=__is_empty)
         self._next_frame_commands.extend(self._get_reset_arm_commands(arm=container_arm, reset_torso=False))
         self._do_arm_motion()
         in_container_1 = self._get_objects_in_container(container_id=container_id)
@@ -466,22 +762,164 @@ class Transport(Magnebot):
         :return: A list of IDs of all of the target objects currently in the goal zone.
         """
 
-        objects: List[int] = list()
+        self._update_goal_zone()
+        return self._target_object_ids[self._target_objects_in_goal_zone].tolist()
 
-        # Objects that are still being held by the Magnebot don't count.
-        held: List[int] = list()
-        for arm in self.state.held:
-            for object_id in self.state.held[arm]:
-                if object_id in self.target_objects:
-                    held.append(object_id)
-        # The object must be in the goal zone and on the floor.
-        for object_id in self.target_objects:
-            if self.state.object_transforms[object_id].position[1] <= 0.1 and \
-                    np.linalg.norm(self.state.object_transforms[object_id].position - self.goal_position) <= \
-                    Transport.GOAL_ZONE_RADIUS:
-                objects.append(object_id)
-        return objects
+    def get_target_object_states(self) -> Tuple[np.array, np.array, np.array]:
+        """
+        :return: Tuple: The position of each target object as an `(n, 3)` numpy array; a boolean array of whether the Magnebot is holding each target object; a boolean array of whether each target object is in the goal zone. The arrays are in the same order as `self.target_objects` and are copies.
+        """
+
+        self._update_goal_zone()
+        return np.copy(self._target_object_positions), np.copy(self._target_objects_held), \
+            np.copy(self._target_objects_in_goal_zone)
+
+    def get_occupancy_cell(self, position: np.array) -> Tuple[int, int]:
+        """
+        This is the inverse of `get_occupancy_position()`. The cell might be outside of `self.occupancy_map`.
+
+        :param position: A worldspace position as a numpy array.
+
+        :return: Tuple: The `(i, j)` indices of the nearest cell of the occupancy map.
+        """
+
+        return int(np.rint((position[0] - self._scene_bounds["x_min"]) / OCCUPANCY_CELL_SIZE)), \
+            int(np.rint((position[2] - self._scene_bounds["z_min"]) / OCCUPANCY_CELL_SIZE))
+
+    def get_path(self, target: Union[int, Dict[str, float]]) -> List[Dict[str, float]]:
+        """
+        Plan a path from the Magnebot to a target object or position on the occupancy map. The path avoids occupied cells and is smoothed so that it has as few waypoints as possible.
+
+        The path planner and the distance fields to the spawn position of each room (including the goal position) are cached per scene and layout, so paths to those positions are nearly instant.
+
+        ```python
+        from tdw.tdw_utils import TDWUtils
+        from transport_challenge import Transport
+
+        m = Transport()
+        m.init_scene(scene="2a", layout=1)
+        for waypoint in m.get_path(target=TDWUtils.array_to_vector3(m.goal_position)):
+            m.move_to(target=waypoint)
+        ```
+
+        :param target: Either the ID of an object or a position as an `(x, y, z)` dictionary.
 
+        :return: A list of waypoints as `(x, y, z)` dictionaries. The last waypoint is the target position. If there is no path, the list is empty. If the scene doesn't have an occupancy map, the only waypoint is the target position.
+        """
+
+        # Object IDs from the registry are numpy integers.
+        if isinstance(target, (int, np.integer)):
+            destination = self.state.object_transforms[int(target)].position
+        elif isinstance(target, dict):
+            destination = TDWUtils.vector3_to_array(target)
+        else:
+            raise Exception(f"Invalid target: {target}")
+        if self._scene_assets is None:
+            return [TDWUtils.array_to_vector3(destination)]
+        path = self._scene_assets.get_path_planner().get_path(origin=self.state.magnebot_transform.position,
+                                                              destination=destination)
+        return [TDWUtils.array_to_vector3(waypoint) for waypoint in path]
+
+    def get_visit_plan(self, capacity: int = 4) -> VisitPlan:
+        """
+        Plan the order in which to pick up a container, put target objects in it, and pour them out in the goal zone so that the total path distance is short. This is fast enough to re-plan after every action.
+
+        Path distances are geodesic distances on the occupancy map (see `get_path()`). The distance fields of the target objects, containers, and goal position are cached.
+
+        Target objects that are in the goal zone, held by the Magnebot, or in a container held by the Magnebot aren't in the plan. Target objects held by the Magnebot or in the held container count towards the container's capacity in the first trip.
+
+        ```python
+        from tdw.tdw_utils import TDWUtils
+        from magnebot import Arm
+        from transport_challenge import Transport
+
+        m = Transport()
+        m.init_scene(scene="2a", layout=1)
+        plan = m.get_visit_plan()
+        if plan.container is not None:
+            m.move_to(target=plan.container)
+            m.pick_up(target=plan.container, arm=Arm.right)
+        for trip in plan.trips:
+            for object_id in trip:
+                m.move_to(target=object_id)
+                m.pick_up(target=object_id, arm=Arm.left)
+                m.put_in()
+            for waypoint in m.get_path(target=TDWUtils.array_to_vector3(m.goal_position)):
+                m.move_to(target=waypoint)
+            m.pour_out()
+        ```
+
+        :param capacity: The maximum number of target objects in a container per trip.
+
+        :return: A [`VisitPlan`](visit_plan.md).
+        """
+
+        self._update_goal_zone()
+        container_arm, held_container_id = self._get_container_arm()
+        held = np.concatenate([self.state.held[arm] for arm in self.state.held])
+        in_container = list() if container_arm is None else \
+            self._get_objects_in_container(container_id=held_container_id)
+        # Target objects that are held by the Magnebot or are in the held container.
+        loaded = np.isin(self._target_object_ids, held) | np.isin(self._target_object_ids, in_container)
+        target_mask = ~self._target_objects_in_goal_zone & ~loaded
+        target_ids = self._target_object_ids[target_mask]
+        container_ids = np.array([object_id for object_id in self.containers if object_id not in held], dtype=int)
+        positions = np.concatenate([self.state.magnebot_transform.position.reshape(1, 3),
+                                    self._target_object_positions[target_mask],
+                                    np.array([self.state.object_transforms[object_id].position
+                                              for object_id in container_ids]).reshape(-1, 3),
+                                    self.goal_position.reshape(1, 3)])
+        if self._scene_assets is None:
+            # There isn't an occupancy map. Use straight-line distances.
+            distances = np.linalg.norm(positions[:, np.newaxis, [0, 2]] - positions[np.newaxis, :, [0, 2]], axis=2)
+        else:
+            # Only the distance fields of the target objects, containers, and goal are needed.
+            distances = np.zeros((len(positions), len(positions)))
+            distances[:, 1:] = self._scene_assets.get_path_planner().get_distances(origins=positions,
+                                                                                   destinations=positions[1:])
+            distances[1:, 0] = distances[0, 1:]
+        return get_visit_plan(distances=distances, target_ids=target_ids, container_ids=container_ids,
+                              holding_container=container_arm is not None, capacity=capacity,
+                              load=int(np.count_nonzero(loaded & ~self._target_objects_in_goal_zone)))
+
+    def nearest_target_objects(self, k: int = 1, exclude_held: bool = True) -> List[int]:
+        """
+        :param k: The maximum number of target objects.
+        :param exclude_held: If True, ignore target objects held by the Magnebot.
+
+        :return: A list of IDs of the `k` target objects nearest to the Magnebot on the `(x, z)` plane, sorted by distance.
+        """
+
+        self._update_spatial_index()
+        exclude = self._target_object_ids[self._target_objects_held] if exclude_held else None
+        return self._target_object_index.nearest(position=self.state.magnebot_transform.position, k=k,
+                                                 exclude=exclude).tolist()
+
+    def nearest_container(self) -> Optional[int]:
+        """
+        :return: The ID of the container nearest to the Magnebot on the `(x, z)` plane, ignoring containers held by the Magnebot. If there are no such containers, returns None.
+        """
+
+        self._update_spatial_index()
+        held = np.concatenate([self.state.held[arm] for arm in self.state.held])
+        nearest = self._container_index.nearest(position=self.state.magnebot_transform.position, k=1, exclude=held)
+        return int(nearest[0]) if len(nearest) > 0 else None
+
+    def refresh_furniture_transforms(self) -> None:
+        """
+        If `self.relevant_objects_only == True`, request the transforms of every object for one frame and update the cached transforms of the furniture in `self.state`. Otherwise, this doesn't do anything.
+
+        This advances the simulation by one `communicate()` call. It isn't an action and doesn't increment `action_cost`.
+        """
+
+        if not self.relevant_objects_only:
+            return
+        resp = self.communicate({"$type": "send_transforms",
+                                 "frequency": "always"})
+        self._subscribe_to_relevant_objects(resp=resp)
+        self.state.object_transforms.update(self._furniture_transforms)
+
+    @measure_action
     def drop(self, target: int, arm: Arm, wait_for_objects: bool = True) -> ActionStatus:
         status = super().drop(target=target, arm=arm, wait_for_objects=wait_for_objects)
         if status == ActionStatus.success:
@@ -491,110 +929,210 @@ class Transport(Magnebot):
         self.action_cost += 1
         return status
 
+    @measure_action
     def turn_by(self, angle: float, aligned_at: float = 3) -> ActionStatus:
         self.action_cost += 1
         return super().turn_by(angle=angle, aligned_at=aligned_at)
 
+    @measure_action
     def turn_to(self, target: Union[int, Dict[str, float]], aligned_at: float = 3) -> ActionStatus:
         self.action_cost += 1
         return super().turn_to(target=target, aligned_at=aligned_at)
 
+    @measure_action
     def move_by(self, distance: float, arrived_at: float = 0.3) -> ActionStatus:
         self.action_cost += 1
         return super().move_by(distance=distance, arrived_at=arrived_at)
 
+    @measure_action
     def reach_for(self, target: Dict[str, float], arm: Arm, absolute: bool = True, arrived_at: float = 0.125) -> ActionStatus:
         self.action_cost += 1
         return super().reach_for(target=target, arm=arm, absolute=absolute, arrived_at=arrived_at)
 
+    @measure_action
     def grasp(self, target: int, arm: Arm) -> ActionStatus:
         self.action_cost += 1
         return super().grasp(target=target, arm=arm)
 
+    @measure_action
     def reset_position(self) -> ActionStatus:
         self.action_cost += 1
         return super().reset_position()
 
+    @measure_action
+    def move_to(self, target: Union[int, Dict[str, float]], arrived_at: float = 0.3,
+                aligned_at: float = 3) -> ActionStatus:
+        # The action cost is incremented by `turn_to()` and `move_by()`.
+        return super().move_to(target=target, arrived_at=arrived_at, aligned_at=aligned_at)
+
+    @measure_action
+    def rotate_camera(self, roll: float = 0, pitch: float = 0, yaw: float = 0) -> ActionStatus:
+        return super().rotate_camera(roll=roll, pitch=pitch, yaw=yaw)
+
+    @measure_action
+    def reset_camera(self) -> ActionStatus:
+        return super().reset_camera()
+
+    @measure_action
+    def add_camera(self, position: Dict[str, float], roll: float = 0, pitch: float = 0, yaw: float = 0,
+                   look_at: bool = True, follow: bool = False, camera_id: str = "c") -> ActionStatus:
+        return super().add_camera(position=position, roll=roll, pitch=pitch, yaw=yaw, look_at=look_at, follow=follow,
+                                  camera_id=camera_id)
+
+    def communicate(self, commands: Union[dict, List[dict]]) -> List[bytes]:
+        # Measure the time spent waiting on the socket.
+        if not isinstance(self.socket, SocketTimer):
+            self.socket = SocketTimer(self.socket)
+        socket_time = self.socket.time
+        resp = super().communicate(commands=commands)
+        self.action_metrics.add_communicate(socket_time=self.socket.time - socket_time, response=resp)
+        self.container_occupancy.update(resp=resp)
+        self._resp = resp
+        return resp
+
+    def end(self) -> None:
+        if self.action_metrics.openmetrics_path is not None:
+            self.action_metrics.write_openmetrics(path=self.action_metrics.openmetrics_path)
+        super().end()
+        # Write any queued images.
+        self.image_writer.close()
+
     def get_scene_init_commands(self, scene: str, layout: int, audio: bool) -> List[dict]:
-        # Clear the list of target objects and containers.
-        self.target_objects.clear()
-        self.containers.clear()
-        commands = super().get_scene_init_commands(scene=scene, layout=layout, audio=audio)
-
-        # Load the map of the rooms in the scene, the occupancy map, and the scene bounds.
-        room_map = np.load(str(ROOM_MAPS_DIRECTORY.joinpath(f"{scene[0]}.npy").resolve()))
-        self.occupancy_map = np.load(str(OCCUPANCY_MAPS_DIRECTORY.joinpath(f"{scene[0]}_{layout}.npy").resolve()))
-        self._scene_bounds = loads(SCENE_BOUNDS_PATH.read_text())[scene[0]]
-
-        # Sort all free positions on the occupancy map by room.
-        rooms: Dict[int, List[Tuple[int, int]]] = dict()
-        for ix, iy in np.ndindex(room_map.shape):
-            room_index = room_map[ix][iy]
-            if room_index not in rooms:
-                rooms[room_index] = list()
-            if self.occupancy_map[ix][iy] == 0:
-                rooms[room_index].append((ix, iy))
-        # Choose a random room.
-        target_room_index = self._rng.choice(np.array(list(rooms.keys())))
-        target_room_positions: np.array = np.array(rooms[target_room_index])
-        used_target_object_positions: List[Tuple[int, int]] = list()
+        # Clear the registry of target objects, containers, and furniture, and the commands to add the objects of the
+        # previous scene.
+        self.object_registry.clear()
+        self._object_init_commands.clear()
+        # Get the cached occupancy map, scene bounds, and furniture.
+        assets = SCENE_CACHE.get(scene=scene, layout=layout)
+        # This is the same as `FloorplanController.get_scene_init_commands()` but it uses the cached furniture.
+        commands = [self.get_add_scene(scene_name=f"floorplan_{scene}"),
+                    {"$type": "set_aperture",
+                     "aperture": 8.0},
+                    {"$type": "set_focus_distance",
+                     "focus_distance": 2.25},
+                    {"$type": "set_post_exposure",
+                     "post_exposure": 0.4},
+                    {"$type": "set_ambient_occlusion_intensity",
+                     "intensity": 0.175},
+                    {"$type": "set_ambient_occlusion_thickness_modifier",
+                     "thickness": 3.5}]
+        for o in assets.furniture:
+            object_id, object_commands = AudioInitData(**o).get_commands() if audio else \
+                TransformInitData(**o).get_commands()
+            commands.extend(object_commands)
+        # Register the furniture.
+        for command in commands:
+            if command["$type"] == "add_object":
+                self.object_registry.add(object_id=command["id"], role=ObjectRole.furniture,
+                                         model_name=command["name"])
+            elif command["$type"] == "scale_object":
+                self.object_registry.get(command["id"]).scale = command["scale_factor"]
+
+        self._scene_assets = assets
+        self._scene_key = (scene, int(layout))
+        self.occupancy_map = assets.occupancy_map
+        self._scene_bounds = assets.scene_bounds
+        # Use the episode from `init_scene()`. If there isn't one, generate the target objects and containers here.
+        episode = self._episode
+        self._episode = None
+        if episode is None or (episode.scene, episode.layout) != self._scene_key:
+            episode = get_episode(scene=scene, layout=layout, rng=self._rng)
+        self._add_episode_objects(episode=episode)
+        return commands
+
+    def _add_episode_objects(self, episode: Episode) -> None:
+        """
+        Add the target objects and containers of an episode. This sets `self._object_init_commands` for each new object.
+
+        :param episode: The episode.
+        """
+
+        # Get the (x, z) coordinates of each cell.
+        target_positions = get_occupancy_positions(cells=episode.target_object_cells, scene_bounds=self._scene_bounds)
+        container_positions = get_occupancy_positions(cells=episode.container_cells, scene_bounds=self._scene_bounds)
 
         # Add target objects to the room.
-        for i in range(self._rng.randint(8, 12)):
-            got_position = False
-            ix, iy = -1, -1
-            # Get a position where there isn't a target object.
-            while not got_position:
-                ix, iy = target_room_positions[self._rng.randint(0, len(target_room_positions))]
-                got_position = True
-                for utop in used_target_object_positions:
-                    if utop[0] == ix and utop[1] == iy:
-                        got_position = False
-            used_target_object_positions.append((ix, iy))
-            # Get the (x, z) coordinates for this position.
-            x, z = self.get_occupancy_position(ix, iy)
-            self._add_target_object(model_name=self._rng.choice(self._target_object_names),
-                                    position={"x": x, "y": 0, "z": z})
+        for i in range(len(episode.target_object_models)):
+            x, z = target_positions[i]
+            self._add_target_object(model_name=episode.target_object_models[i],
+                                    position={"x": float(x), "y": 0, "z": float(z)},
+                                    cell=episode.target_object_cells[i],
+                                    rotation=float(episode.target_object_rotations[i]),
+                                    material=episode.target_object_materials[i])
 
         # Add containers throughout the scene.
-        containers = CONTAINERS_PATH.read_text(encoding="utf-8").split("\n")
-        for room_index in list(rooms.keys()):
-            # Maybe don't add a container in this room.
-            if self._rng.random() < 0.25:
-                continue
-            # Get a random position in the room.
-            room_positions: np.array = np.array(rooms[room_index])
-            got_position = False
-            ix, iy = -1, -1
-            # Get a position where there isn't a target object.
-            while not got_position:
-                ix, iy = room_positions[self._rng.randint(0, len(room_positions))]
-                got_position = True
-                for utop in used_target_object_positions:
-                    if utop[0] == ix and utop[1] == iy:
-                        got_position = False
-            # Get the (x, z) coordinates for this position.
-            x, z = self.get_occupancy_position(ix, iy)
-            container_name = self._rng.choice(containers)
-            self._add_container(model_name=container_name,
-                                position={"x": x, "y": 0, "z": z},
-                                rotation={"x": 0, "y": self._rng.uniform(-179, 179), "z": 0})
-        return commands
+        for i in range(len(episode.container_models)):
+            x, z = container_positions[i]
+            self._add_container(model_name=episode.container_models[i],
+                                position={"x": float(x), "y": 0, "z": float(z)},
+                                rotation={"x": 0, "y": float(episode.container_rotations[i]), "z": 0},
+                                cell=episode.container_cells[i])
+
+    def _set_goal_room(self, assets: SceneAssets, goal_room: int) -> None:
+        """
+        Set `self.goal_room` and `self.goal_position`.
+
+        :param assets: The cached assets of the scene.
+        :param goal_room: The goal room.
+        """
+
+        self.goal_room = goal_room
+        # The goal position is the center of the room.
+        self.goal_position = TDWUtils.vector3_to_array(assets.spawn_positions[str(self.goal_room)])
+        if self._debug:
+            print(f"Goal position: {self.goal_position}")
 
     def _cache_static_data(self, resp: List[bytes]) -> None:
         # Reset the action counter and challenge status.
         self.action_cost = 0
         self.done = False
+        self._goal_zone_state = None
+        self._target_object_ids = np.zeros(0, dtype=int)
+        self._spatial_index_state = None
+        # The Magnebot isn't holding a container at the start of an episode.
+        self._container_arm_reset_angles.clear()
+        # Forget the occupants of the previous scene's containers. The initial trigger events are in `resp`.
+        self.container_occupancy.clear()
+        self.container_occupancy.update(resp=resp)
         super()._cache_static_data(resp=resp)
+        self._subscribe_to_relevant_objects(resp=resp)
+
+    def _subscribe_to_relevant_objects(self, resp: List[bytes]) -> None:
+        """
+        If `self.relevant_objects_only == True`, cache the transforms of the furniture and then request per-frame transforms of only the target objects and containers, starting with the next frame.
+
+        :param resp: A response that includes the transforms of every object.
+        """
+
+        if not self.relevant_objects_only:
+            return
+        furniture = set(self.object_registry.get_ids(ObjectRole.furniture).tolist())
+        self._furniture_transforms.clear()
+        for i in range(len(resp) - 1):
+            if OutputData.get_data_type_id(resp[i]) == "tran":
+                transforms = Transforms(resp[i])
+                for j in range(transforms.get_num()):
+                    object_id = transforms.get_id(j)
+                    if object_id in furniture:
+                        self._furniture_transforms[object_id] = Transform(
+                            position=np.array(transforms.get_position(j)),
+                            rotation=np.array(transforms.get_rotation(j)),
+                            forward=np.array(transforms.get_forward(j)))
+        # This replaces the subscription to the transforms of every object.
+        self._next_frame_commands.append({"$type": "send_transforms",
+                                          "frequency": "always",
+                                          "ids": [int(object_id) for object_id in
+                                                  list(self.target_objects) + list(self.containers)]})
 
     def _add_container(self, model_name: str, position: Dict[str, float] = None,
-                       rotation: Dict[str, float] = None) -> int:
+                       rotation: Dict[str, float] = None, cell: np.array = None) -> int:
         """
         Add a container. Cache the ID.
 
         :param model_name: The name of the container.
         :param position: The initial position of the container.
         :param rotation: The initial rotation of the container.
+        :param cell: The `(i, j)` occupancy map cell of the container. Can be None.
 
         :return: The ID of the container.
         """
@@ -604,7 +1142,8 @@ class Transport(Magnebot):
                                      scale=Transport.__CONTAINER_SCALE,
                                      audio=self._OBJECT_AUDIO[model_name],
                                      model_name=model_name)
-        self.containers.append(object_id)
+        self.object_registry.add(object_id=object_id, role=ObjectRole.container, model_name=model_name,
+                                 scale=Transport.__CONTAINER_SCALE, cell=cell)
         # Set a light mass for each container.
         self._object_init_commands[object_id].append({"$type": "set_mass",
                                                       "id": object_id,
@@ -616,17 +1155,21 @@ class Transport(Magnebot):
                                                        "shape": "cube",
                                                        "enter": True,
                                                        "stay": True,
-                                                       "exit": False,
+                                                       "exit": True,
                                                        "position": {"x": 0, "y": 0.1525, "z": 0},
                                                        "scale": {"x": 0.457, "y": 0.305, "z": 0.457}}])
         return object_id
 
-    def _add_target_object(self, model_name: str, position: Dict[str, float]) -> int:
+    def _add_target_object(self, model_name: str, position: Dict[str, float], cell: np.array = None,
+                           rotation: float = None, material: str = None) -> int:
         """
         Add a targt object. Cache  the ID.
 
         :param model_name: The name of the target object.
         :param position: The initial position of the target object.
+        :param cell: The `(i, j)` occupancy map cell of the target object. Can be None.
+        :param rotation: The rotation around the y axis in degrees. If None, this is random.
+        :param material: The visual material. If None, this is random.
 
         :return: The ID of the target object.
         """
@@ -634,31 +1177,170 @@ class Transport(Magnebot):
         audio = ObjectInfo(name=model_name, mass=Transport.TARGET_OBJECT_MASS,
                            material=AudioMaterial.ceramic, resonance=0.6, amp=0.01, library="models_core.json",
                            bounciness=0.5)
-        scale = self._target_objects[model_name]
+        scale = OBJECT_DATA.get_target_objects()[model_name]
+        if rotation is None:
+            rotation = self._rng.uniform(-179, 179)
         # Add the object.
         object_id = self._add_object(position=position,
-                                     rotation={"x": 0, "y": self._rng.uniform(-179, 179), "z": 0},
+                                     rotation={"x": 0, "y": rotation, "z": 0},
                                      scale={"x": scale, "y": scale, "z": scale},
                                      audio=audio,
                                      model_name=model_name)
-        self.target_objects.append(object_id)
+        self.object_registry.add(object_id=object_id, role=ObjectRole.target_object, model_name=model_name,
+                                 scale={"x": scale, "y": scale, "z": scale}, cell=cell)
         # Set a random visual material for each target object.
-        visual_material = self._rng.choice(Transport.__TARGET_OBJECT_MATERIALS)
-        substructure = Transport.__LIBRARIAN.get_record(model_name).substructure
-        self._object_init_commands[object_id].extend(TDWUtils.set_visual_material(substructure=substructure,
-                                                                                  material=visual_material,
-                                                                                  object_id=object_id,
-                                                                                  c=self,
-                                                                                  quality="low"))
+        if material is None:
+            material = self._rng.choice(OBJECT_DATA.get_target_object_materials())
+        self._object_init_commands[object_id].extend(MATERIAL_TEMPLATES.get_commands(model_name=model_name,
+                                                                                     material=material,
+                                                                                     object_id=object_id))
         return object_id
 
     def _get_reset_arm_commands(self, arm: Arm, reset_torso: bool) -> List[dict]:
         if arm in self._container_arm_reset_angles:
-            self._append_ik_commands(angles=self._container_arm_reset_angles[arm], arm=arm)
+            # The first angle is the column. Rotating the column doesn't change whether the container is level,
+            # so reset it the same way as `Magnebot._get_reset_arm_commands()`: to 0 if `reset_torso == True`,
+            # and otherwise, leave it where it is.
+            angles = np.copy(self._container_arm_reset_angles[arm])
+            if reset_torso:
+                angles[0] = 0
+            else:
+                angles[0] = self.state.joint_angles[self.magnebot_static.arm_joints[ArmJoint.column]][0]
+            self._append_ik_commands(angles=angles, arm=arm)
+            # The cached angles don't include the torso prismatic joint.
+            if reset_torso:
+                return [{"$type": "set_prismatic_target",
+                         "joint_id": self.magnebot_static.arm_joints[ArmJoint.torso],
+                         "target": Magnebot._DEFAULT_TORSO_Y}]
             return list()
         else:
             return super()._get_reset_arm_commands(arm=arm, reset_torso=reset_torso)
 
+    def _get_torso_prismatic(self) -> float:
+        """
+        :return: The current value of the torso prismatic joint, rounded to the nearest key of `Magnebot._TORSO_Y`.
+        """
+
+        # `SceneState.joint_angles` converts every joint position to degrees, including the torso prismatic joint.
+        torso_prismatic = np.radians(self.state.joint_angles[self.magnebot_static.arm_joints[ArmJoint.torso]][0])
+        return min(Magnebot._TORSO_Y.keys(), key=lambda k: abs(k - torso_prismatic))
+
+    def _load_container_arm_reset_angles(self, arm: Arm, torso_prismatic: float) -> bool:
+        """
+        If the arm is holding a container and there aren't cached arm angles for this episode, try to load the leveled arm angles from `CONTAINER_ARM_POSE_CACHE`.
+
+        :param arm: The arm.
+        :param torso_prismatic: The value of the torso prismatic joint after the arm is reset.
+
+        :return: True if there are cached arm angles for this arm.
+        """
+
+        if arm in self._container_arm_reset_angles:
+            return True
+        for object_id in self.state.held[arm]:
+            if self.object_registry.is_container(object_id):
+                angles = CONTAINER_ARM_POSE_CACHE.get(arm=arm,
+                                                      model_name=self.object_registry.get(object_id).model_name,
+                                                      torso_prismatic=torso_prismatic)
+                if angles is not None:
+                    self._container_arm_reset_angles[arm] = angles
+                    return True
+        return False
+
+    def _is_at_container_arm_reset_angles(self, arm: Arm) -> bool:
+        """
+        :param arm: The arm.
+
+        :return: True if there are cached arm angles for this arm (see `_load_container_arm_reset_angles()`) and the arm and torso are already at those angles.
+        """
+
+        if arm not in self._container_arm_reset_angles:
+            return False
+        if self._get_torso_prismatic() != Magnebot._DEFAULT_TORSO_Y:
+            return False
+        angles = np.concatenate([self.state.joint_angles[self.magnebot_static.arm_joints[joint]]
+                                 for joint in Magnebot._JOINT_ORDER[arm]])
+        # The column is reset to 0 along with the torso (see `_get_reset_arm_commands()`).
+        target = np.copy(self._container_arm_reset_angles[arm])
+        target[0] = 0
+        return len(angles) == len(target) and bool(np.allclose(angles, target, atol=1))
+
+    def _put_in_leveled_container(self, object_id: int, object_arm: Arm, container_id: int) -> ActionStatus:
+        """
+        Put a held target object in a container without moving the container arm. See `put_in_many()`.
+
+        :param object_id: The ID of the target object.
+        :param object_arm: The arm holding the target object.
+        :param container_id: The ID of the container.
+
+        :return: An `ActionStatus` indicating if the target object is in the container and if not, why.
+        """
+
+        # The state at the end of the most recent arm motion.
+        motion_states: List[SceneState] = [self.state]
+        magnet_id = self.magnebot_static.magnets[object_arm]
+
+        def __object_in_container(s: SceneState) -> bool:
+            """
+            :param s: The scene state.
+
+            :return: True if the target object is on the surface of the container or collides with an object in the container. This also records the most recent state.
+            """
+
+            motion_states[0] = s
+            return self.container_occupancy.contains(container_id=container_id, object_id=magnet_id) or \
+                self.container_occupancy.contains(container_id=container_id, object_id=object_id)
+
+        self._start_action()
+        self._next_frame_commands.append({"$type": "set_immovable",
+                                          "immovable": True})
+        # Move the target object to be over the container. Don't move the torso so that the container stays still.
+        # The torso is at its default height because both arms were reset with `reset_torso=True`.
+        target = np.copy(self.state.object_transforms[container_id].position)
+        target[1] += 0.5
+        status = self._start_ik(target=TDWUtils.array_to_vector3(target), arm=object_arm, allow_column=False,
+                                state=self.state, absolute=True, fixed_torso_prismatic=Magnebot._DEFAULT_TORSO_Y,
+                                object_id=object_id)
+        if status != ActionStatus.success:
+            if self._debug:
+                print(f"Can't reach over container {container_id} at its leveled pose. Trying put_in() instead.")
+            self._end_action()
+            return self.put_in(fused=True)
+        # Get the ID of the wrist.
+        if object_arm == Arm.right:
+            wrist_id = self.magnebot_static.arm_joints[ArmJoint.wrist_right]
+        else:
+            wrist_id = self.magnebot_static.arm_joints[ArmJoint.wrist_left]
+        # Move the wrist down for a better angle.
+        self._next_frame_commands.extend([{"$type": "set_spherical_target",
+                                           "joint_id": wrist_id,
+                                           "target": {"x": -45, "y": 0, "z": 0}}])
+        self._do_arm_motion(conditional=__object_in_container, joint_ids=[wrist_id])
+        # Drop the object.
+        self._append_drop_commands(object_id=object_id, arm=object_arm)
+        self._next_frame_commands.append({"$type": "set_object_collision_detection_mode",
+                                          "id": int(object_id),
+                                          "mode": "discrete"})
+        # Wait for the object to fall into the container.
+        self._wait_until_objects_stop(object_ids=[object_id], state=motion_states[0],
+                                      conditional=lambda s: self.container_occupancy.contains(
+                                          container_id=container_id, object_id=object_id))
+        self.action_cost += 1
+        in_container = self.container_occupancy.contains(container_id=container_id, object_id=object_id)
+        if not in_container:
+            self._next_frame_commands.append({"$type": "set_object_collision_detection_mode",
+                                              "id": int(object_id),
+                                              "mode": "continuous_dynamic"})
+        # Move the object arm out of the way of the next target object. This ends the action.
+        self.reset_arm(arm=object_arm, reset_torso=False)
+        self.action_cost -= 1
+        if in_container:
+            return ActionStatus.success
+        else:
+            if self._debug:
+                print(f"Object {object_id} isn't in container {container_id}")
+            return ActionStatus.not_in
+
     def _get_container_arm(self) -> Tuple[Arm, int]:
         """
         :return: Tuple: The arm holding a container, if any; the container ID.
@@ -669,7 +1351,7 @@ class Transport(Magnebot):
         # Get an arm holding a container.
         for arm in self.state.held:
             for o_id in self.state.held[arm]:
-                if container_arm is None and o_id in self.containers:
+                if container_arm is None and self.object_registry.is_container(o_id):
                     container_id = o_id
                     container_arm = arm
         return container_arm, container_id
@@ -681,22 +1363,186 @@ class Transport(Magnebot):
         :return: A list of objects in the container.
         """
 
-        if container_id not in self._trigger_events:
-            return list()
-        else:
-            return self._trigger_events[container_id]
+        return list(self.container_occupancy.get(container_id=container_id))
 
     def _is_challenge_done(self) -> bool:
         """
         :return: True if all of the objects have been transported to the goal zone.
         """
 
-        return len(self.get_target_objects_in_goal_zone()) == len(self.target_objects)
+        self._update_goal_zone()
+        return bool(np.all(self._target_objects_in_goal_zone))
+
+    def _update_goal_zone(self) -> None:
+        """
+        Update the positions of the target objects and which target objects are in the goal zone.
+        The goal zone mask is recalculated only if target objects moved or the held objects changed.
+        """
+
+        # Nothing has changed since the last update.
+        if self._goal_zone_state is self.state:
+            return
+        self._goal_zone_state = self.state
+        # The target objects changed (for example, because the scene was reset).
+        target_object_ids = self.object_registry.get_ids(ObjectRole.target_object)
+        if not np.array_equal(self._target_object_ids, target_object_ids):
+            self._target_object_ids = target_object_ids
+            self._target_object_positions = np.full((len(self._target_object_ids), 3), np.nan)
+            self._target_objects_held = np.zeros(len(self._target_object_ids), dtype=bool)
+            self._state_transform_ids = np.zeros(0, dtype=int)
+        if self._state_transforms_state is self.state:
+            # Recalculate the index of each target object only if the order of the transforms changed.
+            if not np.array_equal(self._state_transform_ids, self._state_transforms["id"]):
+                self._state_transform_ids = np.copy(self._state_transforms["id"])
+                indices = {object_id: i for i, object_id in enumerate(self._state_transform_ids.tolist())}
+                self._target_object_indices = np.array([indices[object_id] for object_id in
+                                                        self._target_object_ids.tolist()], dtype=int)
+            positions = self._state_transforms["position"][self._target_object_indices].astype(float)
+        else:
+            # `self.state` wasn't set by `_end_action()`.
+            positions = get_object_positions(state=self.state, object_ids=self._target_object_ids).astype(float)
+        held = np.isin(self._target_object_ids, np.concatenate([self.state.held[arm] for arm in self.state.held]))
+        if np.array_equal(positions, self._target_object_positions) and \
+                np.array_equal(held, self._target_objects_held):
+            return
+        self._target_object_positions = positions
+        self._target_objects_held = held
+        # The object must be in the goal zone and on the floor. Objects that are still being held don't count.
+        self._target_objects_in_goal_zone = (positions[:, 1] <= 0.1) & \
+                                            (np.sum((positions - self.goal_position) ** 2, axis=1) <=
+                                             Transport.GOAL_ZONE_RADIUS ** 2) & \
+                                            np.logical_not(held)
+
+    def _update_spatial_index(self) -> None:
+        """
+        Update the positions of the target objects and containers in the spatial indices.
+        The indices are updated only if the state changed since the previous update.
+        """
+
+        # Nothing has changed since the last update.
+        if self._spatial_index_state is self.state:
+            return
+        self._spatial_index_state = self.state
+        # This updates the cached positions of the target objects.
+        self._update_goal_zone()
+        container_ids = self.object_registry.get_ids(ObjectRole.container)
+        container_positions = np.array([self.state.object_transforms[object_id].position
+                                        for object_id in container_ids], dtype=float).reshape(-1, 3)
+        # The objects changed (for example, because the scene was reset). Align the grids to the occupancy map.
+        if not np.array_equal(self._target_object_index_ids, self._target_object_ids) or \
+                not np.array_equal(self._container_index_ids, container_ids):
+            origin = None if self._scene_bounds is None else \
+                np.array([self._scene_bounds["x_min"], self._scene_bounds["z_min"]])
+            self._target_object_index_ids = self._target_object_ids
+            self._container_index_ids = container_ids
+            self._target_object_index.set_objects(object_ids=self._target_object_ids,
+                                                  positions=self._target_object_positions, origin=origin)
+            self._container_index.set_objects(object_ids=container_ids, positions=container_positions, origin=origin)
+        else:
+            self._target_object_index.update(positions=self._target_object_positions)
+            self._container_index.update(positions=container_positions)
 
     def _end_action(self) -> None:
+        # Queue the images here instead of letting the Magnebot save them on this thread.
+        auto_save_images = self.auto_save_images
+        self.auto_save_images = False
         super()._end_action()
+        self.auto_save_images = auto_save_images
+        # `self.state` was created from the most recent response.
+        self._state_transforms = np.zeros(0, dtype=TRANSFORM_DTYPE)
+        for i in range(len(self._resp) - 1):
+            if OutputData.get_data_type_id(self._resp[i]) == "tran":
+                self._state_transforms = get_transforms(buffer=self._resp[i])
+                break
+        self._state_transforms_state = self.state
+        # Add the cached transforms of the furniture.
+        if self.relevant_objects_only:
+            for object_id in self._furniture_transforms:
+                if object_id not in self.state.object_transforms:
+                    self.state.object_transforms[object_id] = self._furniture_transforms[object_id]
+        if self.auto_save_images:
+            self.image_writer.save_scene_state(state=self.state, output_directory=self.images_directory)
         self.done = self._is_challenge_done()
 
+    def _start_ik(self, target: Dict[str, float], arm: Arm, absolute: bool = True, arrived_at: float = 0.125,
+                  state: SceneState = None, allow_column: bool = True, fixed_torso_prismatic: float = None,
+                  object_id: int = None, do_prismatic_first: bool = False,
+                  orientation_mode: str = None, target_orientation: np.array = None) -> ActionStatus:
+        with self.action_metrics.section("ik_time"):
+            return super()._start_ik(target=target, arm=arm, absolute=absolute, arrived_at=arrived_at, state=state,
+                                     allow_column=allow_column, fixed_torso_prismatic=fixed_torso_prismatic,
+                                     object_id=object_id, do_prismatic_first=do_prismatic_first,
+                                     orientation_mode=orientation_mode, target_orientation=target_orientation)
+
+    def _do_arm_motion(self, conditional=None, joint_ids: List[int] = None, non_moving: float = 0.001) -> ActionStatus:
+        """
+        Wait until the arms have stopped moving. This is the same as `Magnebot._do_arm_motion()` but each frame is a `LazySceneState` that only decodes the angles of `joint_ids`.
+
+        :param conditional: a conditional function (returns bool) that can stop the arm motion and has a SceneState parameter.
+        :param joint_ids: The joint IDs to listen for. If None, listen for all joint IDs.
+        :param non_moving: If a joint has less than this many angles since the last frame, we consider it to be non-moving.
+
+        :return: An `ActionStatus` indicating if the arms stopped moving and if not, why.
+        """
+
+        with self.action_metrics.section("arm_motion_time"):
+            state_0 = LazySceneState(self.communicate([]))
+            if joint_ids is None:
+                joint_ids = list(self.magnebot_static.arm_joints.values())
+            # Continue the motion. Per frame, check if the movement is done.
+            attempts = 0
+            moving = True
+            while moving and attempts < 200:
+                state_1 = LazySceneState(self.communicate([]))
+                # Check if the action should stop here because of a conditional. If so, stop arm motion.
+                if conditional is not None and conditional(state_1):
+                    moving = False
+                    state_0 = state_1
+                    break
+                moving = False
+                for a_id in joint_ids:
+                    if np.any(np.abs(state_0.joint_angles[a_id] - state_1.joint_angles[a_id]) > non_moving):
+                        moving = True
+                        break
+                state_0 = state_1
+                attempts += 1
+            self._stop_joints(state=state_0, joint_ids=joint_ids)
+            if moving:
+                return ActionStatus.failed_to_bend
+            else:
+                return ActionStatus.success
+
+    def _wait_until_objects_stop(self, object_ids: List[int], state: SceneState = None, conditional=None) -> bool:
+        """
+        Wait until all objects in the list stop moving.
+
+        :param object_ids: A list of object IDs.
+        :param state: The state to use. If None, use `self.state`
+        :param conditional: An optional conditional function that accepts the current `SceneState`. If it returns True, stop waiting.
+
+        :return: True if the objects stopped moving (or `conditional` returned True) after 200 frames and they're all above floor level.
+        """
+
+        with self.action_metrics.section("wait_time"):
+            if conditional is None:
+                return super()._wait_until_objects_stop(object_ids=object_ids, state=state)
+            positions_0 = get_object_positions(state=self.state if state is None else state, object_ids=object_ids)
+            moving = True
+            # Set a maximum number of frames to prevent an infinite loop.
+            num_frames = 0
+            while moving and num_frames < 200:
+                state_1 = LazySceneState(resp=self.communicate([]))
+                if conditional(state_1):
+                    return True
+                positions_1 = get_object_positions(state=state_1, object_ids=object_ids)
+                # Stop if an object somehow fell below the floor.
+                if np.any(positions_1[:, 1] < -1):
+                    return False
+                moving = bool(np.any(np.linalg.norm(positions_0 - positions_1, axis=1) > 0.01))
+                num_frames += 1
+                positions_0 = positions_1
+            return not moving
+
     def _get_bounds_sides(self, target: int) -> Tuple[List[np.array], List[bytes]]:
         sides, resp = super()._get_bounds_sides(target=target)
         # Set the y value to the highest point.
@@ -706,7 +1552,7 @@ class Transport(Magnebot):
                 max_y = s[1]
         sides = [np.array((s[0], max_y, s[2])) for s in sides]
         # Don't try to pick up the top or bottom of a container.
-        if target in self.containers:
+        if self.object_registry.is_container(target):
             sides = sides[:-2]
 
         return sides, resp
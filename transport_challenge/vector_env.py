@@ -0,0 +1,360 @@
+from io import BytesIO
+from itertools import count
+from multiprocessing import Process, Pipe
+from multiprocessing.connection import Connection
+from multiprocessing.sharedctypes import RawArray
+from typing import List, Dict, Optional, Callable, Iterable, Iterator, Tuple
+import numpy as np
+from PIL import Image
+from transport_challenge.sweep import EpisodeSpec, run_episode
+
+
+class ObservationLayout:
+    """
+    The names, shapes, and data types of the observation arrays of one environment.
+
+    Every array of every environment is stored in a shared memory buffer. `VectorEnv` stacks the arrays of all environments along a new first axis.
+
+    | Name | Shape | Data type | Description |
+    | --- | --- | --- | --- |
+    | `"magnebot_position"` | `(3,)` | `float32` | The position of the Magnebot. |
+    | `"magnebot_rotation"` | `(4,)` | `float32` | The rotation of the Magnebot as a quaternion. |
+    | `"goal_position"` | `(3,)` | `float32` | The center of the goal zone. |
+    | `"target_object_positions"` | `(max_target_objects, 3)` | `float32` | The positions of the target objects. Unused rows are NaN. |
+    | `"target_objects_held"` | `(max_target_objects,)` | `bool` | True for each target object held by the Magnebot. |
+    | `"target_objects_in_goal_zone"` | `(max_target_objects,)` | `bool` | True for each target object in the goal zone. |
+    | `"occupancy"` | `(2 * occupancy_radius + 1, 2 * occupancy_radius + 1)` | `int8` | The occupancy map centered on the Magnebot's cell. Cells outside of the map are -1. |
+    | `"image"` | `(screen_height, screen_width, 3)` | `uint8` | The image pass of the Magnebot's camera. Only if `image_pass` isn't None. |
+    """
+
+    def __init__(self, max_target_objects: int = 12, occupancy_radius: int = 8, image_pass: str = None,
+                 screen_width: int = 256, screen_height: int = 256):
+        """
+        :param max_target_objects: The maximum number of target objects. Additional target objects aren't observed.
+        :param occupancy_radius: The radius of the occupancy map crop in cells.
+        :param image_pass: The image pass: `"img"`, `"id"`, or `"depth"`. If None, there is no image observation.
+        :param screen_width: The width of the image in pixels.
+        :param screen_height: The height of the image in pixels.
+        """
+
+        """:field
+        The maximum number of target objects. Additional target objects aren't observed.
+        """
+        self.max_target_objects: int = max_target_objects
+        """:field
+        The radius of the occupancy map crop in cells.
+        """
+        self.occupancy_radius: int = occupancy_radius
+        """:field
+        The image pass. If None, there is no image observation.
+        """
+        self.image_pass: Optional[str] = image_pass
+        occupancy = 2 * occupancy_radius + 1
+        """:field
+        Key = The name of the array. Value = Tuple: The shape of the array, the data type.
+        """
+        self.arrays: Dict[str, Tuple[Tuple[int, ...], np.dtype]] = {
+            "magnebot_position": ((3,), np.dtype(np.float32)),
+            "magnebot_rotation": ((4,), np.dtype(np.float32)),
+            "goal_position": ((3,), np.dtype(np.float32)),
+            "target_object_positions": ((max_target_objects, 3), np.dtype(np.float32)),
+            "target_objects_held": ((max_target_objects,), np.dtype(np.bool_)),
+            "target_objects_in_goal_zone": ((max_target_objects,), np.dtype(np.bool_)),
+            "occupancy": ((occupancy, occupancy), np.dtype(np.int8))}
+        if image_pass is not None:
+            self.arrays["image"] = ((screen_height, screen_width, 3), np.dtype(np.uint8))
+
+    def allocate(self, num_envs: int) -> Dict[str, RawArray]:
+        """
+        :param num_envs: The number of environments.
+
+        :return: A dictionary of shared memory buffers. Key = The name of the array. Value = A buffer large enough for the arrays of every environment.
+        """
+
+        return {name: RawArray("b", num_envs * int(np.prod(shape)) * dtype.itemsize)
+                for name, (shape, dtype) in self.arrays.items()}
+
+    def get_arrays(self, buffers: Dict[str, RawArray], num_envs: int) -> Dict[str, np.array]:
+        """
+        :param buffers: The shared memory buffers.
+        :param num_envs: The number of environments.
+
+        :return: A dictionary of stacked arrays of shape `(num_envs, ...)`. These are views of the shared memory buffers, not copies.
+        """
+
+        return {name: np.frombuffer(buffers[name], dtype=dtype).reshape((num_envs,) + shape)
+                for name, (shape, dtype) in self.arrays.items()}
+
+
+def write_observation(controller, observation: Dict[str, np.array], layout: ObservationLayout) -> None:
+    """
+    Write the current observation of a controller.
+
+    :param controller: The controller. This is usually a `Transport` controller. It must have `get_target_object_states()` and `get_occupancy_cell()` functions.
+    :param observation: The observation arrays of the environment. These are written in place.
+    :param layout: The observation layout.
+    """
+
+    state = controller.state
+    observation["magnebot_position"][:] = state.magnebot_transform.position
+    observation["magnebot_rotation"][:] = state.magnebot_transform.rotation
+    observation["goal_position"][:] = controller.goal_position
+    positions, held, in_goal_zone = controller.get_target_object_states()
+    n = min(len(positions), layout.max_target_objects)
+    observation["target_object_positions"][:] = np.nan
+    observation["target_object_positions"][:n] = positions[:n]
+    observation["target_objects_held"][:] = False
+    observation["target_objects_held"][:n] = held[:n]
+    observation["target_objects_in_goal_zone"][:] = False
+    observation["target_objects_in_goal_zone"][:n] = in_goal_zone[:n]
+    # Crop the occupancy map around the Magnebot's cell.
+    occupancy = observation["occupancy"]
+    occupancy[:] = -1
+    r = layout.occupancy_radius
+    i, j = controller.get_occupancy_cell(position=state.magnebot_transform.position)
+    w, h = controller.occupancy_map.shape
+    i0, i1 = max(i - r, 0), min(i + r + 1, w)
+    j0, j1 = max(j - r, 0), min(j + r + 1, h)
+    if i0 < i1 and j0 < j1:
+        occupancy[i0 - i + r:i1 - i + r, j0 - j + r:j1 - j + r] = controller.occupancy_map[i0:i1, j0:j1]
+    if layout.image_pass is not None:
+        image = state.images.get(layout.image_pass)
+        if image is None:
+            observation["image"][:] = 0
+        # The img and id passes are encoded images. The depth pass is already shaped.
+        elif image.ndim == 1:
+            observation["image"][:] = np.asarray(Image.open(BytesIO(image)).convert("RGB"))
+        else:
+            observation["image"][:] = image
+
+
+def _run_env_worker(index: int, port: int, controller_type: type, controller_kwargs: dict,
+                    layout: ObservationLayout, buffers: Dict[str, RawArray], num_envs: int,
+                    connection: Connection) -> None:
+    """
+    Run an environment in a worker process until the worker receives a `close` message.
+
+    Each message is a tuple: `(command, argument)` where `command` is `"reset"` (the argument is an `EpisodeSpec`), `"step"` (the argument is a tuple: the name of the action, keyword arguments), or `"close"`. The worker writes the observation to the shared memory buffers and replies with a tuple: `(error, result)` where `result` is a tuple: the return value of the action, the action cost, whether the challenge is done.
+
+    :param index: The index of the environment.
+    :param port: The socket port of this environment's build.
+    :param controller_type: The type of controller.
+    :param controller_kwargs: Keyword arguments for the controller's constructor.
+    :param layout: The observation layout.
+    :param buffers: The shared memory buffers.
+    :param num_envs: The number of environments.
+    :param connection: The worker's end of the pipe.
+    """
+
+    observation = {name: array[index] for name, array in layout.get_arrays(buffers=buffers, num_envs=num_envs).items()}
+    controller = None
+    while True:
+        command, argument = connection.recv()
+        if command == "close":
+            break
+        try:
+            if command == "reset":
+                if controller is None:
+                    controller = controller_type(port=port, random_seed=argument.random_seed, **controller_kwargs)
+                run_episode(controller=controller, spec=argument)
+                result = None
+            else:
+                action, kwargs = argument
+                result = getattr(controller, action)(**kwargs)
+            write_observation(controller=controller, observation=observation, layout=layout)
+        except Exception as e:
+            connection.send((repr(e), None))
+            continue
+        connection.send((None, (result, int(controller.action_cost), bool(controller.done))))
+    if controller is not None:
+        controller.end()
+    connection.close()
+
+
+class VectorEnv:
+    """
+    Step many Transport Challenge environments in lockstep. Each environment has its own controller in its own worker process and its own build on its own port.
+
+    Each call to `step()` sends one action to each environment. The actions run in parallel and `step()` returns when every environment has finished its action. Observations are written by the worker processes to shared memory buffers and are returned as stacked NumPy arrays (see `ObservationLayout`), so that a policy can run one batched forward pass per step.
+
+    When an environment's episode ends, either because the challenge is done or because the action cost reached `max_action_cost`, the environment is automatically reset to the next episode and the observation is the first observation of the new episode.
+
+    ```python
+    from transport_challenge.vector_env import VectorEnv
+
+    env = VectorEnv(num_envs=4, port=1071, max_action_cost=200)
+    observations = env.reset()
+    for i in range(100):
+        actions = [("move_by", {"distance": 0.5}) for _ in range(env.num_envs)]
+        observations, dones, infos = env.step(actions)
+        print(observations["magnebot_position"])
+    env.close()
+    ```
+
+    The observation arrays are overwritten by each call to `reset()` and `step()`. Copy them if you need to keep them.
+    """
+
+    """:class_var
+    The names of the actions that can be sent to `step()`.
+    """
+    ACTIONS: List[str] = ["turn_by", "turn_to", "move_by", "move_to", "reset_position", "reach_for", "grasp", "drop",
+                          "reset_arm", "rotate_camera", "reset_camera", "pick_up", "put_in", "put_in_many",
+                          "pour_out"]
+
+    def __init__(self, num_envs: int = 1, port: int = 1071, specs: Iterable[EpisodeSpec] = None,
+                 controller_type: type = None, controller_kwargs: dict = None, max_action_cost: int = None,
+                 layout: ObservationLayout = None, build_launcher: Callable[[int], object] = None):
+        """
+        :param num_envs: The number of environments. Environment `i` uses port `port + i`.
+        :param port: The socket port of the first environment.
+        :param specs: The episodes. Each reset takes the next episode. If None, episodes are in scene `2a`, layout 1, with random seeds 0, 1, 2, ...
+        :param controller_type: The type of controller. It must accept `port` and `random_seed` constructor parameters. If None, this is `Transport`.
+        :param controller_kwargs: Additional keyword arguments for the controller's constructor, for example `launch_build`. If `layout` has an image pass, `screen_width` and `screen_height` must match the layout.
+        :param max_action_cost: If not None, an episode ends when its action cost is greater than or equal to this value.
+        :param layout: The observation layout. If None, use the default layout without images.
+        :param build_launcher: A function that launches a build for a port and returns a process with a `terminate()` function. If None, builds are managed externally (or by `launch_build`).
+        """
+
+        if controller_type is None:
+            from transport_challenge.transport_controller import Transport
+            controller_type = Transport
+        if controller_kwargs is None:
+            controller_kwargs = dict()
+        if layout is None:
+            layout = ObservationLayout()
+        if specs is None:
+            specs = (EpisodeSpec(scene="2a", layout=1, random_seed=i) for i in count())
+        """:field
+        The number of environments.
+        """
+        self.num_envs: int = num_envs
+        """:field
+        If not None, an episode ends when its action cost is greater than or equal to this value.
+        """
+        self.max_action_cost: Optional[int] = max_action_cost
+        """:field
+        The observation layout.
+        """
+        self.layout: ObservationLayout = layout
+        self._buffers: Dict[str, RawArray] = layout.allocate(num_envs=num_envs)
+        """:field
+        The stacked observation arrays. Key = The name of the array. Value = An array of shape `(num_envs, ...)`. These are views of shared memory buffers that are overwritten by `reset()` and `step()`.
+        """
+        self.observations: Dict[str, np.array] = layout.get_arrays(buffers=self._buffers, num_envs=num_envs)
+        """:field
+        The current episode of each environment.
+        """
+        self.episodes: List[Optional[EpisodeSpec]] = [None for _ in range(num_envs)]
+        """:field
+        The action cost of the current episode of each environment.
+        """
+        self.action_costs: np.array = np.zeros(num_envs, dtype=int)
+        self._specs: Iterator[EpisodeSpec] = iter(specs)
+        self._connections: List[Connection] = list()
+        self._processes: List[Process] = list()
+        self._builds: list = list()
+        for i in range(num_envs):
+            if build_launcher is not None:
+                self._builds.append(build_launcher(port + i))
+            parent_connection, child_connection = Pipe()
+            process = Process(target=_run_env_worker, args=(i, port + i, controller_type, controller_kwargs, layout,
+                                                            self._buffers, num_envs, child_connection), daemon=True)
+            process.start()
+            self._connections.append(parent_connection)
+            self._processes.append(process)
+
+    def reset(self) -> Dict[str, np.array]:
+        """
+        Start the next episode in every environment.
+
+        :return: The stacked observation arrays.
+        """
+
+        self._reset(list(range(self.num_envs)))
+        return self.observations
+
+    def step(self, actions: List[Tuple[str, dict]]) -> Tuple[Dict[str, np.array], np.array, List[dict]]:
+        """
+        Send one action to each environment and wait for every action to end. Environments whose episodes ended are reset.
+
+        :param actions: One action per environment. Each action is a tuple: the name of the action (see `VectorEnv.ACTIONS`), a dictionary of keyword arguments.
+
+        :return: Tuple: The stacked observation arrays; a boolean array of whether each environment's episode ended; a list of info dictionaries, one per environment. Each info dictionary has the return value of the action (`"status"`), the action cost and whether the challenge was done (`"action_cost"` and `"success"`), and the episode (`"episode"`). These values refer to the episode that the action was in, even if the environment was then reset.
+        """
+
+        if len(actions) != self.num_envs:
+            raise ValueError(f"Expected {self.num_envs} actions but got {len(actions)}")
+        for action, kwargs in actions:
+            if action not in VectorEnv.ACTIONS:
+                raise ValueError(f"Invalid action: {action}")
+        for connection, action in zip(self._connections, actions):
+            connection.send(("step", action))
+        infos: List[dict] = list()
+        for i, (status, action_cost, success) in enumerate(self._receive(list(range(self.num_envs)))):
+            self.action_costs[i] = action_cost
+            infos.append({"status": status, "action_cost": action_cost, "success": success,
+                          "episode": self.episodes[i]})
+        dones = np.array([info["success"] or (self.max_action_cost is not None and
+                                              info["action_cost"] >= self.max_action_cost) for info in infos],
+                         dtype=bool)
+        if np.any(dones):
+            self._reset([i for i in range(self.num_envs) if dones[i]])
+        return self.observations, dones, infos
+
+    def close(self) -> None:
+        """
+        End every environment and stop the worker processes and builds.
+        """
+
+        for connection, process in zip(self._connections, self._processes):
+            if process.is_alive():
+                connection.send(("close", None))
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        for build in self._builds:
+            if build is not None:
+                build.terminate()
+        self._connections.clear()
+        self._processes.clear()
+        self._builds.clear()
+
+    def _reset(self, indices: List[int]) -> None:
+        """
+        Start the next episode in each of the environments.
+
+        :param indices: The indices of the environments.
+        """
+
+        for i in indices:
+            self.episodes[i] = next(self._specs)
+            self.action_costs[i] = 0
+            self._connections[i].send(("reset", self.episodes[i]))
+        self._receive(indices)
+
+    def _receive(self, indices: List[int]) -> list:
+        """
+        Receive a reply from each of the environments. If any environment raised an exception, this raises an exception after every reply has been received so that no reply is left in a pipe.
+
+        :param indices: The indices of the environments.
+
+        :return: A list of tuples, one per environment: The return value of the environment's most recent action, the action cost, whether the challenge is done.
+        """
+
+        results = list()
+        errors = list()
+        for i in indices:
+            error, result = self._connections[i].recv()
+            if error is not None:
+                errors.append(f"Environment {i} raised an exception: {error}")
+            results.append(result)
+        if len(errors) > 0:
+            raise RuntimeError("\n".join(errors))
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,202 @@
+from typing import List, Optional, Tuple
+import numpy as np
+
+
+class VisitPlan:
+    """
+    An order in which the Magnebot should visit target objects, a container, and the goal zone. See `get_visit_plan()` and `Transport.get_visit_plan()`.
+
+    To follow the plan:
+
+    1. If `container` isn't None, pick up that container.
+    2. For each trip in `trips`, pick up each target object and put it in the container. At the end of each trip, go to the goal zone and pour out the container.
+    """
+
+    def __init__(self, container: Optional[int], trips: List[List[int]], distance: float, unreachable: List[int]):
+        """
+        :param container: If not None, the Magnebot needs to pick up this container before the first trip.
+        :param trips: A list of trips. Each trip is a list of target object IDs.
+        :param distance: The total path distance of the plan in meters.
+        :param unreachable: The IDs of target objects that aren't in the plan because they can't be reached.
+        """
+
+        """:field
+        If not None, the Magnebot needs to pick up this container before the first trip.
+        """
+        self.container: Optional[int] = container
+        """:field
+        A list of trips. Each trip is a list of target object IDs in the order that they should be put in the container. At the end of each trip, the Magnebot should go to the goal zone and pour out the container.
+        """
+        self.trips: List[List[int]] = trips
+        """:field
+        The total path distance of the plan in meters.
+        """
+        self.distance: float = distance
+        """:field
+        The IDs of target objects that aren't in the plan because they can't be reached.
+        """
+        self.unreachable: List[int] = unreachable
+
+    def get_order(self) -> List[int]:
+        """
+        :return: The IDs of every target object in the plan, in the order that they should be visited.
+        """
+
+        return [object_id for trip in self.trips for object_id in trip]
+
+
+def get_visit_plan(distances: np.array, target_ids: np.array, container_ids: np.array, holding_container: bool,
+                   capacity: int = 4, load: int = 0, max_passes: int = 20) -> VisitPlan:
+    """
+    Plan the order in which to visit target objects, a container, and the goal zone so that the total path distance is short.
+
+    The target objects are ordered as a single tour with nearest insertion and then improved with 2-opt. The tour is split into trips that each end at the goal zone; the split is optimal for the tour and respects the container's capacity.
+
+    :param distances: An `(n, n)` numpy array of the distance between each node. The nodes are, in order: the Magnebot; each target object; each container; the goal position. Unreachable nodes are `inf`.
+    :param target_ids: The IDs of the target objects, in the same order as `distances`.
+    :param container_ids: The IDs of the containers, in the same order as `distances`.
+    :param holding_container: If True, the Magnebot is already holding a container.
+    :param capacity: The maximum number of target objects in the container per trip.
+    :param load: The number of target objects that are already in the container.
+    :param max_passes: The maximum number of 2-opt passes.
+
+    :return: A `VisitPlan`.
+    """
+
+    num_targets = len(target_ids)
+    goal = len(distances) - 1
+    containers = np.arange(1 + num_targets, 1 + num_targets + len(container_ids))
+    # The cost of the first leg from the Magnebot to each target object, including picking up a container.
+    # The index of the container is -1 if the Magnebot is already holding a container.
+    if holding_container:
+        first_legs = distances[0, 1:1 + num_targets]
+        first_containers = np.full(num_targets, -1)
+    elif len(containers) > 0:
+        via = distances[0, containers][:, np.newaxis] + distances[np.ix_(containers, np.arange(1, 1 + num_targets))]
+        first_containers = np.argmin(via, axis=0)
+        first_legs = via[first_containers, np.arange(num_targets)]
+    else:
+        first_legs = np.full(num_targets, np.inf)
+        first_containers = np.full(num_targets, -1)
+    # Ignore target objects that can't be reached from the Magnebot or can't be brought to the goal.
+    reachable = np.isfinite(first_legs) & np.isfinite(distances[1:1 + num_targets, goal])
+    unreachable = [int(object_id) for object_id in np.asarray(target_ids)[~reachable]]
+    nodes = (np.flatnonzero(reachable) + 1).tolist()
+    if len(nodes) == 0:
+        return VisitPlan(container=None, trips=list(), distance=0, unreachable=unreachable)
+    d = distances.tolist()
+    first = first_legs.tolist()
+    # If the container is full, go to the goal zone first.
+    first_capacity = capacity - load
+    initial_cost = 0.0
+    if first_capacity <= 0:
+        initial_cost = d[0][goal]
+        first = [d[goal][i] for i in range(1, 1 + num_targets)]
+        first_capacity = capacity
+    order = _get_nearest_insertion_order(nodes=nodes, d=d, first=first, goal=goal)
+    cost, splits = _split(order=order, d=d, first=first, goal=goal, capacity=capacity, first_capacity=first_capacity)
+    # 2-opt: Reverse a section of the tour if that makes the plan shorter.
+    for p in range(max_passes):
+        improved = False
+        for i in range(len(order) - 1):
+            for j in range(i + 1, len(order)):
+                candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                candidate_cost, candidate_splits = _split(order=candidate, d=d, first=first, goal=goal,
+                                                          capacity=capacity, first_capacity=first_capacity)
+                if candidate_cost < cost - 1e-9:
+                    order = candidate
+                    cost = candidate_cost
+                    splits = candidate_splits
+                    improved = True
+        if not improved:
+            break
+    trips = list()
+    for start, end in splits:
+        trips.append([int(target_ids[node - 1]) for node in order[start:end]])
+    container: Optional[int] = None
+    if not holding_container:
+        container = int(container_ids[first_containers[order[0] - 1]])
+    return VisitPlan(container=container, trips=trips, distance=float(initial_cost + cost), unreachable=unreachable)
+
+
+def _get_nearest_insertion_order(nodes: List[int], d: List[List[float]], first: List[float],
+                                 goal: int) -> List[int]:
+    """
+    :param nodes: The indices of the target objects in the distance matrix.
+    :param d: The distance matrix.
+    :param first: The cost of the first leg from the Magnebot to each target object.
+    :param goal: The index of the goal position in the distance matrix.
+
+    :return: A tour of the target objects from the Magnebot to the goal, built with nearest insertion.
+    """
+
+    unvisited = list(nodes)
+    order: List[int] = list()
+    # The distance from each unvisited node to the nearest node in the tour (or the Magnebot).
+    nearest = {node: first[node - 1] for node in unvisited}
+    while len(unvisited) > 0:
+        node = min(unvisited, key=lambda n: nearest[n])
+        unvisited.remove(node)
+        # Insert the node where it adds the least distance.
+        best_index = 0
+        best_cost = np.inf
+        for index in range(len(order) + 1):
+            a = first[node - 1] if index == 0 else d[order[index - 1]][node]
+            if index == len(order):
+                b = d[node][goal]
+                ab = 0 if len(order) == 0 else d[order[-1]][goal]
+            else:
+                b = d[node][order[index]]
+                ab = first[order[0] - 1] if index == 0 else d[order[index - 1]][order[index]]
+            insertion_cost = a + b - ab
+            if insertion_cost < best_cost:
+                best_cost = insertion_cost
+                best_index = index
+        order.insert(best_index, node)
+        for other in unvisited:
+            if d[node][other] < nearest[other]:
+                nearest[other] = d[node][other]
+    return order
+
+
+def _split(order: List[int], d: List[List[float]], first: List[float], goal: int, capacity: int,
+           first_capacity: int) -> Tuple[float, List[Tuple[int, int]]]:
+    """
+    Split a tour into trips that end at the goal.
+
+    :param order: The tour of target objects.
+    :param d: The distance matrix.
+    :param first: The cost of the first leg from the Magnebot to each target object.
+    :param goal: The index of the goal position in the distance matrix.
+    :param capacity: The maximum number of target objects per trip.
+    :param first_capacity: The maximum number of target objects in the first trip.
+
+    :return: Tuple: The total distance; the `(start, end)` indices in `order` of each trip.
+    """
+
+    n = len(order)
+    # The cumulative distance along the tour.
+    prefix = [0.0] * n
+    for k in range(1, n):
+        prefix[k] = prefix[k - 1] + d[order[k - 1]][order[k]]
+    best = [0.0] + [np.inf] * n
+    previous = [0] * (n + 1)
+    for end in range(1, n + 1):
+        to_goal = prefix[end - 1] + d[order[end - 1]][goal]
+        for start in range(max(0, end - capacity), end):
+            if start == 0:
+                if end > first_capacity:
+                    continue
+                trip = first[order[0] - 1] + to_goal
+            else:
+                trip = d[goal][order[start]] + to_goal - prefix[start]
+            cost = best[start] + trip
+            if cost < best[end]:
+                best[end] = cost
+                previous[end] = start
+    splits = list()
+    end = n
+    while end > 0:
+        splits.append((previous[end], end))
+        end = previous[end]
+    return best[n], splits[::-1]
@@ -3,6 +3,8 @@ from py_md_doc import PyMdDoc
 
 
 if __name__ == "__main__":
-    md = PyMdDoc(input_directory=Path("../transport_challenge"), files=["transport_controller.py"],
+    md = PyMdDoc(input_directory=Path("../transport_challenge"),
+                 files=["transport_controller.py", "object_registry.py", "action_metrics.py", "image_writer.py",
+                        "container_occupancy.py", "visit_plan.py", "episode.py", "object_role.py"],
                  metadata_path=Path("doc_metadata.json"))
     md.get_docs(output_directory=Path("../doc"))